@@ -38,6 +38,8 @@ class CharacterCmdSet(default_cmds.CharacterCmdSet):
         # any commands you add below will overload the default ones.
         #
         self.add(mycommands.CmdRoll)
+        self.add(mycommands.CmdRest)
+        self.add(mycommands.CmdMap)
         self.add(sittables.CmdNoSitStand)
 
 
@@ -2,6 +2,8 @@ from commands.command import Command
 from evennia import CmdSet
 from typeclasses import rules
 from typeclasses.enums import Ability
+from typeclasses.rest import rest
+from typeclasses.zonemap import DEFAULT_MAP_SIZE, ZONE_MAPS
 
 
 class CmdEcho(Command):
@@ -76,6 +78,61 @@ class CmdRoll(Command):
         self.caller.msg(f"Resultado: {resultado}, Calidad: {calidad}")
 
 
+class CmdRest(Command):
+    """
+    Rest to recover your health and refresh your rune stones.
+
+    Usage:
+      rest
+
+    """
+
+    key = "rest"
+
+    def func(self):
+        location = self.caller.location
+        combathandler = location.ndb.combathandler if location else None
+        if combathandler and combathandler.id:
+            self.caller.msg("You can't rest in the middle of a fight!")
+            return
+        rest(self.caller)
+
+
+class CmdMap(Command):
+    """
+    Show a map of the area around you.
+
+    Usage:
+      map [<size>]
+
+    The size is the width and height of the map (default 21), from 5 to 61.
+    The map is centered on you, so even sizes are rounded up to the next odd one.
+
+    """
+
+    key = "map"
+    min_size = 5
+    max_size = 61
+
+    def func(self):
+        caller = self.caller
+        if caller.account and caller.account.uses_screenreader():
+            caller.msg("The map is not available when using a screenreader.")
+            return
+        if not caller.location:
+            caller.msg("There is nothing to map here.")
+            return
+        args = self.args.strip()
+        if args and not args.isdigit():
+            caller.msg("Usage: map [<size>]")
+            return
+        size = int(args) if args else DEFAULT_MAP_SIZE
+        # the map needs a middle row and column for the caller
+        size |= 1
+        size = max(self.min_size, min(self.max_size, size))
+        caller.msg(ZONE_MAPS.render(caller.location, size=size))
+
+
 class MyCmdSet(CmdSet):
 
     def at_cmdset_creation(self):
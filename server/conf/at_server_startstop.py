@@ -30,7 +30,26 @@ def at_server_start():
     This is called every time the server starts up, regardless of
     how it was shut down.
     """
-    pass
+    from django.conf import settings
+    from evennia.utils.utils import delay
+    from typeclasses.prefetch import prefetch_recently_active
+    from typeclasses.rooms import migrate_echo_tickers
+    from typeclasses.singletons import SINGLETONS
+    from typeclasses.worldgraph import WORLD_GRAPH
+
+    # fetch shared objects like bare hands once, so they never need a db lookup later
+    SINGLETONS.load()
+
+    # map out all exits, so finding paths never needs the database
+    WORLD_GRAPH.load()
+
+    # warm the caches for characters likely to log in soon
+    if settings.PREFETCH_RECENTLY_ACTIVE_DAYS:
+        prefetch_recently_active(settings.PREFETCH_RECENTLY_ACTIVE_DAYS)
+
+    # the tickers are only restored after this hook, so wait for them before
+    # moving old echoing rooms over to the ambient scheduler
+    delay(0, migrate_echo_tickers)
 
 
 def at_server_stop():
@@ -39,6 +39,65 @@ MAX_NR_CHARACTERS = 10
 AUTO_PUPPET_ON_LOGIN = False
 BASE_BATCHPROCESS_PATHS += ["evadventure.batchscripts"]
 
+# At server start, load the Attributes and Tags of all characters puppeted within this
+# many days, so they are cached before their players log in. 0 disables it.
+PREFETCH_RECENTLY_ACTIVE_DAYS = 0
+
+# modules with NPC templates (see typeclasses/npc_templates.py)
+NPC_TEMPLATE_MODULES = ["world.npc_templates"]
+
+# where to find random tables, as {source: JSON/CSV file or python path to a module}
+# (see typeclasses/tables.py)
+RANDOM_TABLE_SOURCES = {
+    "chargen": "world/tables/chargen.json",
+    "knave": "typeclasses.random_tables",
+}
+
+# Rooms with at least this many characters and NPCs in them go into crowd mode, where
+# arrivals, departures and ambient messages are gathered for CROWD_WINDOW seconds and
+# sent as one message (see typeclasses/rooms.py). 0 disables it. Rooms can override
+# the threshold with their `crowd_threshold` Attribute.
+CROWD_THRESHOLD = 20
+CROWD_WINDOW = 2
+
+GLOBAL_SCRIPTS = {
+    # trims the pool of used-up consumables waiting to be reused
+    "consumable_pool_cleanup": {
+        "typeclass": "typeclasses.recycling.ConsumablePoolScript",
+        "repeats": -1,
+        "interval": 60 * 60,
+        "desc": "Trims the pool of recycled consumables",
+    },
+    # heals the wounded a little at a time when out of combat
+    "regeneration": {
+        "typeclass": "typeclasses.regeneration.RegenerationScript",
+        "repeats": -1,
+        "interval": 10,
+        "desc": "Regenerates the HP of the wounded",
+    },
+    # steps NPC behavior in rooms near players
+    "behavior": {
+        "typeclass": "typeclasses.behavior.BehaviorScript",
+        "repeats": -1,
+        "interval": 5,
+        "desc": "Steps NPC behavior near players",
+    },
+    # ambient effects (like room echoes) in rooms with players in them
+    "ambient": {
+        "typeclass": "typeclasses.ambient.AmbientScript",
+        "repeats": -1,
+        "interval": 10,
+        "desc": "Ticks ambient effects in occupied rooms",
+    },
+    # deletes dungeon instances nobody has been in for a while
+    "instance_cleanup": {
+        "typeclass": "typeclasses.instancing.InstanceScript",
+        "repeats": -1,
+        "interval": 5 * 60,
+        "desc": "Deletes idle dungeon instances",
+    },
+}
+
 
 ######################################################################
 # Settings given in secret_settings.py override those in this file.
@@ -0,0 +1,103 @@
+from unittest.mock import patch
+
+from evennia import create_object
+from evennia.utils.test_resources import EvenniaTest
+
+from typeclasses.ambient import AMBIENT, RandomStream
+from typeclasses.behavior import BEHAVIOR
+from typeclasses.characters import Character
+from typeclasses.regeneration import REGENERATION
+from typeclasses.rooms import EchoingRoom
+
+
+class TestAmbientScheduler(EvenniaTest):
+    def setUp(self):
+        super().setUp()
+        # the services are global, so don't let state from other tests leak in or out
+        AMBIENT._occupied = {}
+        REGENERATION.reset()
+        self.addCleanup(self._reset_services)
+        self.cave = create_object(EchoingRoom, key="Cave")
+        self.hall = create_object(EchoingRoom, key="Hall")
+        self.hero = create_object(Character, key="Hero", location=self.room1)
+        self.hero.sessions.add(self.session)
+
+    def _reset_services(self):
+        AMBIENT._occupied = None
+        BEHAVIOR._players = None
+        BEHAVIOR.active_rooms = {}
+        REGENERATION.reset()
+
+    def test_occupied(self):
+        with patch.object(EchoingRoom, "at_ambient_start", autospec=True) as mock_start:
+            self.hero.move_to(self.cave, quiet=True)
+            self.assertEqual(AMBIENT.occupied, {self.cave.id: (self.cave, {self.hero.id})})
+            mock_start.assert_called_once_with(self.cave)
+
+            self.hero.move_to(self.hall, quiet=True)
+            self.assertEqual(list(AMBIENT.occupied), [self.hall.id])
+
+            # rooms without ambient effects are not tracked
+            self.hero.move_to(self.room1, quiet=True)
+            self.assertEqual(AMBIENT.occupied, {})
+
+            self.hero.move_to(self.cave, quiet=True)
+            with patch.object(Character, "msg"):
+                self.hero.at_pre_unpuppet()
+                self.assertEqual(AMBIENT.occupied, {})
+                self.hero.at_post_puppet()
+            self.assertEqual(list(AMBIENT.occupied), [self.cave.id])
+            self.assertEqual(mock_start.call_count, 4)
+
+    def test_tick(self):
+        self.hero.move_to(self.cave, quiet=True)
+        with patch.object(EchoingRoom, "at_ambient_tick", autospec=True) as mock_tick:
+            AMBIENT.tick()
+        # only the occupied room is ticked
+        mock_tick.assert_called_once()
+        self.assertEqual(mock_tick.call_args[0][0], self.cave)
+
+    def test_deleted_room_dropped(self):
+        AMBIENT.character_arrived(self.hall, self.hero)
+        self.hall.delete()
+        with patch.object(EchoingRoom, "at_ambient_tick", autospec=True) as mock_tick:
+            AMBIENT.tick()
+        mock_tick.assert_not_called()
+        self.assertEqual(AMBIENT.occupied, {})
+
+
+class TestEchoingRoomAmbient(EvenniaTest):
+    def setUp(self):
+        super().setUp()
+        self.cave = create_object(EchoingRoom, key="Cave")
+        self.cave.echoes = ["Water drips.", "Something skitters."]
+        self.cave.echo_rate = 60
+        self.cave.echo_chance = 1
+        self.cave.is_echoing = True
+
+    def test_echo_rate(self):
+        rng = RandomStream(batch_size=4, seed=1)
+        self.cave.at_ambient_start()
+        with patch.object(EchoingRoom, "msg_ambient") as mock_msg:
+            # the first tick only starts counting
+            for now in (100, 130, 159, 160, 200, 219, 220):
+                self.cave.at_ambient_tick(now, rng)
+        self.assertEqual(mock_msg.call_count, 2)
+        for call in mock_msg.call_args_list:
+            self.assertIn(call.args[0], self.cave.echoes)
+
+    def test_not_echoing(self):
+        self.cave.is_echoing = False
+        self.cave.at_ambient_start()
+        with patch.object(EchoingRoom, "msg_ambient") as mock_msg:
+            for now in (100, 160, 220):
+                self.cave.at_ambient_tick(now, RandomStream(seed=1))
+        mock_msg.assert_not_called()
+
+    def test_random_stream(self):
+        # the same seed gives the same numbers, across batches
+        first, second = RandomStream(batch_size=3, seed=5), RandomStream(batch_size=3, seed=5)
+        numbers = [first.random() for _ in range(7)]
+        self.assertEqual(numbers, [second.random() for _ in range(7)])
+        self.assertTrue(all(0 <= number < 1 for number in numbers))
+        self.assertIn(first.choice(self.cave.echoes), self.cave.echoes)
@@ -0,0 +1,58 @@
+import random
+
+from evennia.prototypes.prototypes import create_prototype
+from evennia.utils.test_resources import EvenniaTest
+
+from typeclasses.characters import Character
+from typeclasses.charfactory import create_characters, roll_sheets
+from typeclasses.enums import WieldLocation
+from typeclasses.tables import TABLES
+
+
+class TestCharFactory(EvenniaTest):
+    def setUp(self):
+        super().setUp()
+        create_prototype({"prototype_key": "test_sword", "key": "sword", "typeclass": "typeclasses.objects.Weapon"})
+        create_prototype({"prototype_key": "test_ration", "key": "ration", "typeclass": "typeclasses.objects.Object"})
+
+    def _sheets(self, count):
+        sheets = roll_sheets(count, rng=random.Random(1))
+        for sheet in sheets:
+            sheet.weapon = "test_sword"
+            sheet.armor = sheet.helmet = sheet.shield = None
+            sheet.backpack = ["test_ration", "test_ration"]
+        return sheets
+
+    def test_roll_sheets(self):
+        sheets = roll_sheets(50)
+        self.assertEqual(len(sheets), 50)
+        for sheet in sheets:
+            self.assertIn(sheet.name, TABLES.get("chargen.name").results)
+            self.assertTrue(1 <= sheet.strength <= 6)
+            self.assertTrue(5 <= sheet.hp_max <= 8)
+
+    def test_create_characters(self):
+        sheets = self._sheets(4)
+        characters = create_characters(sheets, accounts=[None, self.account, None, None])
+        self.assertEqual([char.key for char in characters], [sheet.name for sheet in sheets])
+        for char, sheet in zip(characters, sheets):
+            self.assertEqual(char.strength, sheet.strength)
+            self.assertEqual(char.hp_max, sheet.hp_max)
+            self.assertEqual(char.db.desc, sheet.desc)
+            # everyone has their own gear, equipped
+            sword = char.equipment.slots[WieldLocation.MAIN_HAND]
+            self.assertEqual(sword.location, char)
+            self.assertEqual(len(char.equipment.slots[WieldLocation.BACKPACK]), 2)
+            self.assertEqual(len(char.contents), 3)
+        self.assertEqual(len({char.equipment.slots[WieldLocation.MAIN_HAND].id for char in characters}), 4)
+        self.assertIn(characters[1], self.account.characters.all())
+        self.assertIn(f"pid({self.account.id})", characters[1].locks.get("puppet"))
+        # the account's locks replace the template's, like locks.add would
+        lockdefs = characters[1].db_lock_storage.split(";")
+        access_types = [lockdef.split(":", 1)[0] for lockdef in lockdefs]
+        self.assertEqual(len(access_types), len(set(access_types)))
+        for lockdef in Character.lockstring.format(
+            character_id=characters[1].id, account_id=self.account.id
+        ).split(";"):
+            self.assertIn(lockdef.strip(), lockdefs)
+        self.assertNotIn(characters[2], self.account.characters.all())
@@ -0,0 +1,53 @@
+from unittest import mock
+
+from evennia import create_object
+from evennia.utils.test_resources import EvenniaTest
+
+from typeclasses.characters import Character
+from typeclasses.combat_turnbased import TurnbasedCombatHandler
+from typeclasses.npc import NPC
+from typeclasses.regeneration import REGENERATION
+
+
+class TestTurnbasedCombatDefeat(EvenniaTest):
+    def setUp(self):
+        super().setUp()
+        REGENERATION.reset()
+        self.addCleanup(REGENERATION.reset)
+        self.character = create_object(Character, key="Hero", location=self.room1)
+        self.npc = create_object(NPC, key="Rat", location=self.room1)
+        # a second enemy keeps the combat going when the first one is defeated
+        self.npc2 = create_object(NPC, key="Other rat", location=self.room1)
+        self.combathandler = TurnbasedCombatHandler.get_or_create_combathandler(self.room1)
+        self.combathandler.add_combatant(self.character)
+        self.combathandler.add_combatant(self.npc)
+        self.combathandler.add_combatant(self.npc2)
+
+    def tearDown(self):
+        if self.combathandler.id:
+            self.combathandler.delete()
+        super().tearDown()
+
+    @mock.patch.object(TurnbasedCombatHandler, "msg")
+    def test_defeated_by_setting_hp(self, mock_msg):
+        with mock.patch.object(self.npc, "at_defeat") as mock_at_defeat:
+            self.npc.hp = 0
+            self.assertEqual(self.combathandler.ndb.newly_defeated, [self.npc])
+            self.combathandler.check_stop_combat()
+            mock_at_defeat.assert_called_once()
+        self.assertNotIn(self.npc, self.combathandler.combatants)
+        self.assertIn(self.npc, self.combathandler.defeated_combatants)
+
+    def test_add_defeated_combatant(self):
+        other = create_object(NPC, key="Dead rat", location=self.room1)
+        other.hp = 0
+        self.combathandler.add_combatant(other)
+        self.assertEqual(self.combathandler.ndb.newly_defeated, [other])
+
+    def test_defeated_queue_restored_on_start(self):
+        self.npc.hp = 0
+        # a reload loses the queue and the health subscriptions
+        self.combathandler.ndb.newly_defeated = None
+        self.npc.health.unsubscribe(self.combathandler.at_combatant_health_change)
+        self.combathandler.at_start()
+        self.assertEqual(self.combathandler.ndb.newly_defeated, [self.npc])
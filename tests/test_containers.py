@@ -0,0 +1,88 @@
+from evennia import create_object
+from evennia.typeclasses.attributes import Attribute
+from evennia.utils.test_resources import EvenniaTest
+
+from typeclasses.characters import Character
+from typeclasses.containers import ContainerHandler
+
+
+class TestContainers(EvenniaTest):
+    def setUp(self):
+        super().setUp()
+        self.hero = create_object(Character, key="Hero", location=self.room1)
+        self.bag = self._make("typeclasses.containers.Container", "bag", location=self.hero)
+        self.pouch = self._make("typeclasses.containers.Container", "pouch", location=self.hero)
+        self.pouch.capacity = 5
+
+    def _make(self, typeclass, key, size=None, location=None):
+        obj = create_object(typeclass, key=key)
+        if size is not None:
+            obj.size = size
+        if location:
+            self.assertTrue(obj.move_to(location, quiet=True))
+        return obj
+
+    def _stored(self, container):
+        return Attribute.objects.get(
+            objectdb=container, db_key=ContainerHandler.save_attribute, db_category="inventory"
+        ).value
+
+    def test_roll_up(self):
+        equipment = self.hero.equipment
+        # CON 1 + 20, plus the capacity of both containers
+        self.assertEqual(equipment.max_slots, 21 + 10 + 5)
+        self.assertEqual(equipment.count_slots(), 2)
+
+        rocks = [self._make("typeclasses.objects.Object", "rock", location=self.bag) for _ in range(3)]
+        self.assertEqual(self.bag.storage.used_slots, 3)
+        self.assertEqual(equipment.count_slots(), 5)
+        self.assertEqual(
+            self._stored(self.bag),
+            {"version": ContainerHandler.save_format_version, "items": [rock.id for rock in rocks], "used": 3},
+        )
+
+        # taking one out keeps it counted, now in the backpack
+        rocks[0].move_to(self.hero, quiet=True)
+        self.assertEqual(self.bag.storage.used_slots, 2)
+        self.assertEqual(equipment.count_slots(), 5)
+        self.assertEqual(self._stored(self.bag)["items"], [rock.id for rock in rocks[1:]])
+
+        # an item in the bag growing is recounted
+        rocks[1].size = 3
+        self.assertEqual(self.bag.storage.used_slots, 4)
+        self.assertEqual(equipment.count_slots(), 7)
+
+        # a container dropped takes its contents and capacity with it
+        self.bag.move_to(self.room1, quiet=True)
+        self.assertEqual(equipment.max_slots, 21 + 5)
+        self.assertEqual(equipment.count_slots(), 2)
+        # ... which the counts from scratch agree with
+        equipment.invalidate(recount=True)
+        self.assertEqual((equipment.max_slots, equipment.count_slots()), (26, 2))
+
+    def test_move_between_bags(self):
+        equipment = self.hero.equipment
+        rock = self._make("typeclasses.objects.Object", "rock", size=4, location=self.bag)
+        self.assertEqual(equipment.count_slots(), 6)
+        self.assertTrue(rock.move_to(self.pouch, quiet=True))
+        self.assertEqual((self.bag.storage.used_slots, self.pouch.storage.used_slots), (0, 4))
+        self.assertEqual(self.bag.storage.items, [])
+        self.assertEqual(self.pouch.storage.items, [rock])
+        self.assertEqual(equipment.count_slots(), 6)
+        # too big for what's left in the pouch
+        boulder = self._make("typeclasses.objects.Object", "boulder", size=2, location=self.bag)
+        self.assertFalse(boulder.move_to(self.pouch, quiet=True))
+        self.assertEqual(boulder.location, self.bag)
+
+    def test_take_out_of_own_bag_at_capacity(self):
+        equipment = self.hero.equipment
+        rock = self._make("typeclasses.objects.Object", "rock", size=10, location=self.bag)
+        self._make("typeclasses.objects.Object", "boulder", size=24, location=self.hero)
+        self.assertEqual(equipment.count_slots(), equipment.max_slots)
+        # the rock is already carried, so it fits
+        self.assertTrue(rock.move_to(self.hero, quiet=True))
+        self.assertEqual(rock.location, self.hero)
+        self.assertEqual(equipment.count_slots(), equipment.max_slots)
+        # but anything else doesn't
+        pebble = self._make("typeclasses.objects.Object", "pebble", location=self.room1)
+        self.assertFalse(pebble.move_to(self.hero, quiet=True))
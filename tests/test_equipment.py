@@ -0,0 +1,88 @@
+from evennia import create_object
+from evennia.objects.models import ObjectDB
+from evennia.typeclasses.attributes import Attribute
+from evennia.utils.idmapper.models import flush_cache
+from evennia.utils.test_resources import EvenniaTest
+
+from typeclasses.characters import Character
+from typeclasses.enums import WieldLocation
+from typeclasses.equipment import EquipmentHandler
+
+
+class TestEquipment(EvenniaTest):
+    def setUp(self):
+        super().setUp()
+        self.hero = create_object(Character, key="Hero", location=self.room1)
+
+    def _reload(self, character):
+        """Forget the equipment, as after a server restart"""
+        character.attributes.reset_cache()
+        character.__dict__.pop("equipment", None)
+
+    def _stored(self, character):
+        return Attribute.objects.get(
+            objectdb=character, db_key=EquipmentHandler.save_attribute, db_category="inventory"
+        ).value
+
+    def test_load_old_format(self):
+        sword = create_object("typeclasses.objects.Weapon", key="sword")
+        helmet = create_object("typeclasses.objects.EvAdventureHelmet", key="helmet")
+        rations = [create_object("typeclasses.objects.Consumable", key="ration") for _ in range(2)]
+        # before the stored format was versioned, the objects themselves were stored
+        self.hero.attributes.add(
+            EquipmentHandler.save_attribute,
+            {
+                WieldLocation.MAIN_HAND: sword,
+                WieldLocation.OFF_HAND: None,
+                WieldLocation.TWO_HANDS: None,
+                WieldLocation.BODY: None,
+                WieldLocation.HEAD: helmet,
+                WieldLocation.BACKPACK: rations,
+            },
+            category="inventory",
+        )
+        self._reload(self.hero)
+        slots = self.hero.equipment.slots
+        self.assertEqual(slots[WieldLocation.MAIN_HAND], sword)
+        self.assertEqual(slots[WieldLocation.HEAD], helmet)
+        self.assertEqual(slots[WieldLocation.BACKPACK], rations)
+        # converted to dbrefs on load
+        stored = self._stored(self.hero)
+        self.assertEqual(stored["version"], EquipmentHandler.save_format_version)
+        self.assertEqual(stored["slots"][WieldLocation.MAIN_HAND.value], sword.id)
+        self.assertEqual(stored["slots"][WieldLocation.BODY.value], None)
+        self.assertEqual(stored["slots"][WieldLocation.BACKPACK.value], [ration.id for ration in rations])
+
+    def test_backpack_loaded_in_one_query(self):
+        rations = [
+            create_object("typeclasses.objects.Consumable", key=f"ration{i}", location=self.hero)
+            for i in range(5)
+        ]
+        dbids = [ration.id for ration in rations]
+        hero_id = self.hero.id
+        flush_cache()
+        hero = ObjectDB.objects.get(id=hero_id)
+        hero.equipment.slots.get_dbrefs(WieldLocation.MAIN_HAND)
+        with self.assertNumQueries(1):
+            backpack = hero.equipment.slots[WieldLocation.BACKPACK]
+        self.assertEqual([obj.id for obj in backpack], dbids)
+
+    def test_backpack_queries(self):
+        sword = create_object("typeclasses.objects.Weapon", key="sword", location=self.hero)
+        helmet = create_object("typeclasses.objects.EvAdventureHelmet", key="helmet", location=self.hero)
+        ration = create_object("typeclasses.objects.Consumable", key="ration", location=self.hero)
+        stone = create_object("typeclasses.objects.RuneStone", key="stone", location=self.hero)
+        rock = create_object("typeclasses.objects.Object", key="rock", location=self.hero)
+        equipment = self.hero.equipment
+        self.assertEqual(equipment.get_wieldable_objects_from_backpack(), [sword, stone])
+        self.assertEqual(equipment.get_wearable_objects_from_backpack(), [helmet])
+        self.assertEqual(equipment.get_usable_objects_from_backpack(), [ration, stone])
+
+        # items leaving the backpack drop out
+        equipment.move(sword)
+        self.assertEqual(equipment.get_wieldable_objects_from_backpack(), [stone])
+        # and changing an item's obj_type is picked up
+        rock.tags.add("consumable", category="obj_type")
+        self.assertEqual(equipment.get_usable_objects_from_backpack(), [ration, stone, rock])
+        rock.tags.remove("consumable", category="obj_type")
+        self.assertEqual(equipment.get_usable_objects_from_backpack(), [ration, stone])
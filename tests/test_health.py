@@ -0,0 +1,67 @@
+from evennia import create_object
+from evennia.utils.test_resources import EvenniaTest
+
+from typeclasses.characters import Character
+from typeclasses.npc import NPC
+from typeclasses.regeneration import REGENERATION
+
+
+class TestHealth(EvenniaTest):
+    def setUp(self):
+        super().setUp()
+        # the service is global, so don't let wounded from other tests leak in or out
+        REGENERATION.reset()
+        self.addCleanup(REGENERATION.reset)
+        self.character = create_object(Character, key="Hero", location=self.room1)
+        self.events = []
+        self.character.health.subscribe(
+            lambda obj, event, amount, **kwargs: self.events.append((event, amount))
+        )
+
+    def test_damage_and_heal(self):
+        self.character.hp_max = 10
+        self.character.hp = 10
+        self.character.at_damage(4)
+        self.assertEqual(self.character.hp, 6)
+        self.assertEqual(self.character.heal(10, quiet=True), 4)
+        self.assertEqual(self.character.hp, 10)
+        self.assertEqual(self.events, [("damage", 4), ("heal", 4)])
+
+    def test_defeated(self):
+        self.character.hp = 3
+        self.character.at_damage(5)
+        self.character.at_damage(1)
+        self.assertEqual(self.events, [("damage", 5), ("defeated", 5), ("damage", 1)])
+
+    def test_defeated_when_set(self):
+        self.character.hp = 3
+        self.character.hp = 0
+        self.character.hp = -1
+        self.assertEqual(self.events, [("defeated", 3)])
+
+    def test_write_behind(self):
+        self.character.hp = 5
+        # not written yet
+        self.assertIsNone(self.character.attributes.get("hp"))
+        self.character.save_health()
+        self.assertEqual(self.character.attributes.get("hp"), 5)
+
+    def test_npc_starts_at_full_health(self):
+        npc = create_object(NPC, key="TestNPC", attributes=[("hit_dice", 2)])
+        self.assertEqual(npc.hp, 8)
+
+    def test_regeneration(self):
+        self.character.hp_max = 10
+        self.character.hp = 10
+        self.assertNotIn(self.character.id, REGENERATION.wounded)
+        self.character.at_damage(3)
+        self.assertIn(self.character.id, REGENERATION.wounded)
+        REGENERATION.tick()
+        self.assertEqual(self.character.hp, 8)
+        self.assertEqual(self.events[-1], ("heal", 1))
+        REGENERATION.tick()
+        REGENERATION.tick()
+        self.assertEqual(self.character.hp, 10)
+        self.assertNotIn(self.character.id, REGENERATION.wounded)
+        # saved on reaching full health
+        self.assertEqual(self.character.attributes.get("hp"), 10)
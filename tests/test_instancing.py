@@ -0,0 +1,75 @@
+from unittest.mock import patch
+
+from evennia import create_object
+from evennia.objects.models import ObjectDB
+from evennia.utils.test_resources import EvenniaTest
+
+from typeclasses import instancing
+from typeclasses.instancing import INSTANCES
+from typeclasses.rooms import InstanceRoom, Room
+from typeclasses.worldgraph import WORLD_GRAPH
+
+
+class TestInstancing(EvenniaTest):
+    def setUp(self):
+        super().setUp()
+        INSTANCES.last_active = {}
+        WORLD_GRAPH.load()
+        self.hall = create_object(Room, key="Hall")
+        self.crypt = create_object(Room, key="Crypt")
+        for room in (self.hall, self.crypt):
+            room.tags.add("tomb", category=instancing.TEMPLATE_TAG_CATEGORY)
+        self.hall.db.desc = "A dusty hall."
+        self.down = create_object(
+            "typeclasses.exits.Exit", key="down", aliases=["d"], location=self.hall, destination=self.crypt
+        )
+        self.out = create_object(
+            "typeclasses.exits.Exit", key="out", location=self.hall, destination=self.room1
+        )
+        self.statue = create_object("typeclasses.objects.Object", key="statue", location=self.hall)
+
+    def test_create_instance(self):
+        hall, crypt = INSTANCES.create_instance("tomb")
+        self.assertIsInstance(hall, InstanceRoom)
+        self.assertEqual(hall.template, self.hall)
+        self.assertEqual(hall.instance_key, crypt.instance_key)
+        # exits are remapped inside the instance, and lead out to the same place
+        exits = {exit.key: exit for exit in hall.exits}
+        self.assertEqual(exits["down"].destination, crypt)
+        self.assertEqual(exits["out"].destination, self.room1)
+        self.assertIn("d", exits["down"].aliases.all())
+        self.assertEqual(WORLD_GRAPH.path(hall, crypt), [exits["down"].id])
+
+        # nothing is copied until written
+        self.assertFalse(hall.db_attributes.exists())
+        self.assertEqual(hall.db.desc, "A dusty hall.")
+        hall.db.desc = "A ransacked hall."
+        self.assertEqual(hall.db.desc, "A ransacked hall.")
+        self.assertEqual(self.hall.db.desc, "A dusty hall.")
+        hall.attributes.remove("desc")
+        self.assertEqual(hall.db.desc, "A dusty hall.")
+
+        # template items are scenery
+        self.assertIn(self.statue, hall.contents_get(content_type="object"))
+        self.assertNotIn(self.statue, hall.contents)
+        self.assertIn("statue", hall.return_appearance(self.char1))
+
+        with self.assertRaises(KeyError):
+            INSTANCES.create_instance("pyramid")
+
+    def test_cleanup(self):
+        hall, crypt = INSTANCES.create_instance("tomb")
+        instance_key = hall.instance_key
+        self.char1.move_to(crypt, quiet=True)
+        bones = create_object("typeclasses.objects.Object", key="bones", location=crypt)
+        dbids = [hall.id, crypt.id, bones.id]
+        self.assertEqual(INSTANCES.cleanup(), [])
+
+        self.char1.move_to(self.room1, quiet=True)
+        self.assertEqual(INSTANCES.cleanup(), [])
+        with patch.object(instancing, "IDLE_TIMEOUT", 0):
+            self.assertEqual(INSTANCES.cleanup(), [instance_key])
+        self.assertFalse(ObjectDB.objects.filter(id__in=dbids).exists())
+        self.assertNotIn(instance_key, INSTANCES.get_instance_keys())
+        # the template is untouched
+        self.assertTrue(self.hall.pk and self.down.pk and self.statue.pk)
@@ -0,0 +1,41 @@
+from evennia import create_object
+from evennia.objects.models import ObjectDB
+from evennia.utils.test_resources import EvenniaTest
+
+from typeclasses.npc import NPC
+from typeclasses.prefetch import LAST_PUPPETED_ATTRIBUTE, prefetch, prefetch_character
+
+
+class TestPrefetch(EvenniaTest):
+    def test_cache_stays_complete(self):
+        prefetch_character(self.char1)
+        self.char1.at_post_puppet()
+        self.addCleanup(self.char1.at_pre_unpuppet)
+        key, category = LAST_PUPPETED_ATTRIBUTE
+        # stamping the puppet time writes an Attribute, which must not make us query
+        # again for Attributes we know the character doesn't have
+        with self.assertNumQueries(0):
+            self.assertTrue(self.char1.attributes.has(key, category=category))
+            self.assertIsNone(self.char1.attributes.get("no_such_attribute"))
+
+        self.char1.db.mood = "cheerful"
+        self.char1.attributes.remove("mood")
+        with self.assertNumQueries(0):
+            self.assertIsNone(self.char1.db.mood)
+
+    def test_all_handlers_primed(self):
+        npc = create_object(NPC, key="Rat", location=self.room1)
+        npc.tags.add("vermin", category="kind")
+        npc.aliases.add("rodent")
+        npc.nicks.add("r", "rat")
+        # forget what was cached while setting things up
+        npc = ObjectDB.objects.get(id=npc.id)
+        for name in ("attributes", "nicks", "tags", "aliases", "permissions"):
+            npc.__dict__.pop(name, None)
+        prefetch([npc])
+        with self.assertNumQueries(0):
+            self.assertEqual(npc.tags.get(category="kind"), "vermin")
+            self.assertEqual(npc.aliases.all(), ["rodent"])
+            self.assertEqual(npc.permissions.all(), [])
+            self.assertEqual(npc.nicks.get("r"), "rat")
+            self.assertIsNone(npc.attributes.get("no_such_attribute"))
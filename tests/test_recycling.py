@@ -0,0 +1,54 @@
+from unittest.mock import patch
+
+from evennia import create_object
+from evennia.prototypes.prototypes import create_prototype
+from evennia.utils.test_resources import EvenniaTest
+
+from typeclasses.objects import Consumable
+from typeclasses.recycling import CONSUMABLE_POOL, POOL_TAG, POOL_TAG_CATEGORY
+from typeclasses.spawner import bulk_spawn
+
+
+class TestRecycling(EvenniaTest):
+    def setUp(self):
+        super().setUp()
+        CONSUMABLE_POOL.load()
+        create_prototype(
+            {
+                "prototype_key": "test_ration",
+                "key": "ration",
+                "typeclass": "typeclasses.objects.Consumable",
+                "aliases": ["food"],
+                "tags": [("edible", "diet")],
+                "attrs": [("uses", 1)],
+            }
+        )
+        self.crate = create_object("typeclasses.objects.Object", key="crate", location=self.room1)
+
+    def test_recycle_and_reuse(self):
+        ration = bulk_spawn({"test_ration": 1}, location=self.room1)[0]
+        ration.tags.add("cursed", category="curse")
+        ration.aliases.add("hardtack")
+        ration.db.uses = 0
+        ration.db.owner = "bob"
+        uses_attr_id = ration.attributes.get("uses", return_obj=True).id
+        self.assertTrue(CONSUMABLE_POOL.recycle(ration))
+        self.assertTrue(ration.tags.has(POOL_TAG, category=POOL_TAG_CATEGORY))
+        self.assertIsNone(ration.location)
+
+        with patch.object(Consumable, "at_object_creation") as at_object_creation:
+            reused = bulk_spawn({"test_ration": 1}, location=self.crate)[0]
+        at_object_creation.assert_not_called()
+        self.assertEqual(reused, ration)
+        self.assertEqual(reused.location, self.crate)
+        # tags from its previous life are gone, the prototype's and creation-time ones are back
+        self.assertFalse(reused.tags.has("cursed", category="curse"))
+        self.assertFalse(reused.tags.has(POOL_TAG, category=POOL_TAG_CATEGORY))
+        self.assertTrue(reused.tags.has("edible", category="diet"))
+        self.assertTrue(reused.tags.has("test_ration", category="from_prototype"))
+        self.assertTrue(reused.tags.has("consumable", category="obj_type"))
+        self.assertEqual(reused.aliases.all(), ["food"])
+        self.assertEqual(reused.db.uses, 1)
+        self.assertIsNone(reused.db.owner)
+        # the Attribute rows are reused
+        self.assertEqual(reused.attributes.get("uses", return_obj=True).id, uses_attr_id)
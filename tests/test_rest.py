@@ -0,0 +1,31 @@
+from evennia import create_object
+from evennia.utils.test_resources import EvenniaTest
+
+from typeclasses.characters import Character
+from typeclasses.rest import get_refreshable_items, rest
+
+
+class TestRest(EvenniaTest):
+    def setUp(self):
+        super().setUp()
+        self.hero = create_object(Character, key="hero", location=self.room1)
+        self.bag = create_object("typeclasses.containers.Container", key="bag", location=self.hero)
+        self.pouch = create_object("typeclasses.containers.Container", key="pouch", location=self.bag)
+        self.box = create_object("typeclasses.containers.Container", key="box", location=self.pouch)
+        self.stones = [
+            create_object("typeclasses.objects.RuneStone", key="stone", location=location)
+            for location in (self.hero, self.bag, self.box)
+        ]
+        self.other = create_object("typeclasses.objects.RuneStone", key="stone", location=self.room1)
+
+    def test_get_refreshable_items(self):
+        # found however deeply they are nested, but only magic items
+        self.assertEqual(set(get_refreshable_items([self.hero])), set(self.stones))
+        self.assertEqual(get_refreshable_items([]), [])
+
+    def test_rest(self):
+        for stone in self.stones + [self.other]:
+            stone.uses = 0
+        rest(self.hero)
+        self.assertEqual([stone.uses for stone in self.stones], [1, 1, 1])
+        self.assertEqual(self.other.uses, 0)
@@ -0,0 +1,112 @@
+from unittest.mock import patch
+
+from evennia import TICKER_HANDLER, create_object
+from evennia.utils.test_resources import EvenniaTest
+
+from typeclasses.characters import Character
+from typeclasses.npc import NPC
+from typeclasses.rooms import EchoingRoom, Room, migrate_echo_tickers
+
+
+class TestContentIndex(EvenniaTest):
+    def setUp(self):
+        super().setUp()
+        self.room = create_object(Room, key="Hub")
+        self.hero = create_object(Character, key="Hero", location=self.room)
+        self.goblin = create_object(NPC, key="Goblin", location=self.room)
+        self.rock = create_object("typeclasses.objects.Object", key="rock", location=self.room)
+        self.exit = create_object(
+            "typeclasses.exits.Exit", key="north", location=self.room, destination=self.room1
+        )
+
+    def test_index(self):
+        index = self.room.content_index
+        self.assertEqual(index.characters, [self.hero])
+        self.assertEqual(index.npcs, [self.goblin])
+        self.assertEqual(index.items, [self.rock])
+        self.assertEqual(index.exits, [self.exit])
+        self.assertEqual(index.mapping["Goblin"], self.goblin)
+        self.assertEqual(index.listener_count, 2)
+
+        self.goblin.move_to(self.room1, quiet=True)
+        self.assertEqual(index.npcs, [])
+        self.assertEqual(index.listener_count, 1)
+        self.assertNotIn("Goblin", index.mapping)
+        # moved without hooks
+        self.rock.location = self.room1
+        self.assertEqual(index.items, [])
+
+    def test_msg_contents(self):
+        mapping = self.room.content_index.mapping
+        with patch.object(Character, "msg") as hero_msg, patch.object(NPC, "msg") as goblin_msg:
+            self.room.msg_contents(
+                "$You() $conj(hit) $you(Hero). {Hero} staggers.",
+                from_obj=self.goblin,
+                mapping=mapping,
+            )
+        self.assertEqual(hero_msg.call_args[1]["text"][0], "Goblin hits you. Hero staggers.")
+        self.assertEqual(goblin_msg.call_args[1]["text"][0], "You hit Hero. Hero staggers.")
+        # the shared mapping is left alone
+        self.assertNotIn("you", mapping)
+
+    def test_msg_contents_puppeted_object(self):
+        # someone puppeting a rock still hears what goes on around it
+        self.rock.sessions.add(self.session)
+        with patch.object(self.rock, "msg") as rock_msg, patch.object(self.exit, "msg") as exit_msg:
+            self.room.msg_contents("The ground shakes.")
+        self.assertEqual(rock_msg.call_args[1]["text"][0], "The ground shakes.")
+        exit_msg.assert_not_called()
+
+
+class TestCrowdMode(EvenniaTest):
+    def setUp(self):
+        super().setUp()
+        self.hub = create_object(Room, key="Hub")
+        self.hub.crowd_threshold = 4
+        self.north = create_object(
+            "typeclasses.exits.Exit", key="north", location=self.hub, destination=self.room1
+        )
+        create_object("typeclasses.exits.Exit", key="south", location=self.room1, destination=self.hub)
+        self.locals = [create_object(Character, key=f"Local{i}", location=self.hub) for i in range(3)]
+        self.visitors = [create_object(Character, key=f"Visitor{i}", location=self.room1) for i in range(5)]
+
+    def test_crowd_mode(self):
+        self.assertFalse(self.hub.is_crowded())
+        with patch("typeclasses.rooms.delay") as mock_delay, patch.object(Character, "msg") as mock_msg:
+            for visitor in self.visitors:
+                visitor.move_to(self.hub, move_type="traverse")
+            self.assertTrue(self.hub.is_crowded())
+            self.visitors[0].move_to(self.room1, move_type="traverse")
+            self.hub.msg_ambient("A bell rings.")
+            # the first arrival was sent as usual, the rest are gathered up
+            mock_delay.assert_called_once()
+            mock_msg.reset_mock()
+            self.hub.send_crowd_messages()
+
+        messages = [call.kwargs["text"][0] for call in mock_msg.call_args_list]
+        # one message for each of the 3 locals and 4 remaining visitors
+        self.assertEqual(len(messages), 7)
+        self.assertIn(
+            "4 people arrive from the north.\nVisitor0 leaves to the north.\nA bell rings.",
+            messages,
+        )
+        # the visitors aren't told about themselves
+        self.assertIn(
+            "Visitor2, Visitor3, and Visitor4 arrive from the north.\nVisitor0 leaves to the north.\n"
+            "A bell rings.",
+            messages,
+        )
+        self.assertIsNone(self.hub.ndb.crowd_events)
+
+
+class TestEchoingRoom(EvenniaTest):
+    def test_migrate_echo_tickers(self):
+        cave = create_object(EchoingRoom, key="Cave")
+        quiet = create_object(EchoingRoom, key="Quiet cave")
+        # how echoing rooms were started before the ambient scheduler
+        TICKER_HANDLER.add(cave.echo_rate, cave.send_echo)
+        self.assertEqual(migrate_echo_tickers(), 1)
+        self.assertTrue(cave.is_echoing)
+        self.assertFalse(quiet.is_echoing)
+        self.assertFalse([sub for sub in TICKER_HANDLER.all_display() if sub[0] in (cave, quiet)])
+        self.assertEqual(migrate_echo_tickers(), 0)
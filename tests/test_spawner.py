@@ -0,0 +1,35 @@
+from unittest.mock import patch
+
+from django.db import connection
+from evennia import create_object
+from evennia.prototypes.prototypes import create_prototype
+from evennia.utils.test_resources import EvenniaTest
+
+from typeclasses.characters import Character
+from typeclasses.enums import WieldLocation
+from typeclasses.spawner import bulk_spawn
+
+
+class TestBulkSpawn(EvenniaTest):
+    def setUp(self):
+        super().setUp()
+        create_prototype({"prototype_key": "test_sword", "key": "sword", "typeclass": "typeclasses.objects.Weapon"})
+        create_prototype({"prototype_key": "test_ration", "key": "ration", "typeclass": "typeclasses.objects.Object"})
+        self.carrier = create_object(Character, key="carrier", location=self.room1)
+
+    def test_bulk_spawn_into_carrier(self):
+        objs = bulk_spawn([("test_sword", 2), ("test_ration", 3)], location=self.carrier)
+        self.assertEqual([obj.key for obj in objs], ["sword"] * 2 + ["ration"] * 3)
+        # every object is received, including the first one of each prototype
+        backpack = self.carrier.equipment.slots[WieldLocation.BACKPACK]
+        for obj in objs:
+            self.assertIn(obj, backpack)
+            self.assertEqual(obj.location, self.carrier)
+
+    def test_bulk_spawn_without_returned_ids(self):
+        with patch.object(type(connection.features), "can_return_rows_from_bulk_insert", False):
+            objs = bulk_spawn({"test_ration": 3}, location=self.carrier)
+        self.assertEqual(len(set(objs)), 3)
+        backpack = self.carrier.equipment.slots[WieldLocation.BACKPACK]
+        for obj in objs:
+            self.assertIn(obj, backpack)
@@ -0,0 +1,74 @@
+from evennia import create_object
+from evennia.typeclasses.attributes import Attribute
+from evennia.utils.test_resources import EvenniaTest
+
+from typeclasses.characters import Character
+from typeclasses.stats import StatsHandler, make_stats_block, pack_stats
+
+
+class TestStats(EvenniaTest):
+    def setUp(self):
+        super().setUp()
+        # a character from before stats blocks, with one Attribute per stat
+        self.legacy = create_object(Character, key="legacy", location=self.room1)
+        self.legacy.attributes.batch_add(("strength", 3), ("xp", 120), ("charclass", "Wizard"))
+
+    def _stats_attribute(self, character):
+        return Attribute.objects.get(
+            objectdb=character,
+            db_key=StatsHandler.save_attribute,
+            db_category=StatsHandler.save_category,
+        )
+
+    def _reload(self, character):
+        """Forget everything cached, as after a server restart"""
+        character.attributes.reset_cache()
+        character.__dict__.pop("stats", None)
+
+    def test_pack_stats(self):
+        self.assertFalse(self.legacy.stats.packed)
+        self.assertTrue(pack_stats(self.legacy))
+        self.assertTrue(self.legacy.stats.packed)
+        self.assertEqual(
+            self._stats_attribute(self.legacy).value,
+            make_stats_block(strength=3, xp=120, charclass="Wizard"),
+        )
+        # the per-stat Attributes are gone
+        self.assertFalse(
+            Attribute.objects.filter(
+                objectdb=self.legacy, db_key__in=("strength", "xp", "charclass")
+            ).exists()
+        )
+        self._reload(self.legacy)
+        self.assertEqual(
+            (self.legacy.strength, self.legacy.xp, self.legacy.charclass, self.legacy.dexterity),
+            (3, 120, "Wizard", 1),
+        )
+
+    def test_pack_stats_twice(self):
+        self.assertTrue(pack_stats(self.legacy))
+        block = self._stats_attribute(self.legacy).value
+        self.assertFalse(pack_stats(self.legacy))
+        self.assertEqual(self._stats_attribute(self.legacy).value, block)
+        self.assertEqual(
+            Attribute.objects.filter(
+                objectdb=self.legacy, db_category=StatsHandler.save_category
+            ).count(),
+            1,
+        )
+
+    def test_stat_property_write(self):
+        pack_stats(self.legacy)
+        self.legacy.coins = 50
+        self.legacy.strength = "4"
+        self._reload(self.legacy)
+        self.assertEqual((self.legacy.coins, self.legacy.strength), (50, 4))
+        self.assertEqual(self._stats_attribute(self.legacy).value[1], 4)
+
+        # without a stats block, the stat is stored in its own Attribute
+        other = create_object(Character, key="other", location=self.room1)
+        other.coins = 7
+        self._reload(other)
+        self.assertFalse(other.stats.packed)
+        self.assertEqual(other.coins, 7)
+        self.assertEqual(other.attributes.get("coins"), 7)
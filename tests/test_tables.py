@@ -0,0 +1,62 @@
+import os
+import random
+import tempfile
+from collections import Counter
+
+from evennia.utils.test_resources import EvenniaTest
+
+from typeclasses.chargen import TemporaryCharacterSheet
+from typeclasses.tables import TABLES, AliasSampler, Table, TableRegistry
+
+
+class TestTables(EvenniaTest):
+    def test_alias_sampler(self):
+        sampler = AliasSampler([1, 2, 7])
+        rng = random.Random(1)
+        counts = Counter(sampler.sample(rng.random()) for _ in range(10000))
+        self.assertAlmostEqual(counts[0] / 10000, 0.1, delta=0.02)
+        self.assertAlmostEqual(counts[2] / 10000, 0.7, delta=0.02)
+
+    def test_table(self):
+        table = Table("alignment", [("1-5", "law"), ("6-15", "neutrality"), ("16-20", "chaos")])
+        self.assertEqual(table.lookup(6), "neutrality")
+        with self.assertRaises(ValueError):
+            table.lookup(21)
+        self.assertIn(table.roll(), ("law", "neutrality", "chaos"))
+        counts = Counter(table.roll_many(10000, rng=random.Random(1)))
+        self.assertAlmostEqual(counts["neutrality"] / 10000, 0.5, delta=0.02)
+
+        weighted = Table("loot", [{"weight": 9, "result": "rat"}, {"weight": 1, "result": "gem"}])
+        self.assertAlmostEqual(weighted.roll_many(10000).count("rat") / 10000, 0.9, delta=0.02)
+
+        with self.assertRaises(ValueError):
+            Table("gappy", [("1-5", "law"), ("7-20", "chaos")])
+        with self.assertRaises(ValueError):
+            Table("overlapping", [("1-5", "law"), ("5-20", "chaos")])
+        with self.assertRaises(ValueError):
+            Table("empty", [])
+
+    def test_registry(self):
+        self.assertIn(TABLES.roll("chargen.physique"), TABLES.get("chargen.physique").results)
+        self.assertEqual(len(TABLES.get("chargen.name")), 282)
+        self.assertEqual(TABLES.get("knave.reactions").lookup(12), "Helpful")
+        with self.assertRaises(KeyError):
+            TABLES.get("chargen.nonexistent")
+        sheet = TemporaryCharacterSheet()
+        self.assertIn(sheet.name, TABLES.get("chargen.name").results)
+
+    def test_file_sources(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "weather.csv")
+            with open(path, "w") as csvfile:
+                csvfile.write("roll,result\n1-3,sun\n4-6,rain\n")
+            registry = TableRegistry({"weather": path})
+            # nothing is parsed until used
+            self.assertEqual(registry._loaded, {})
+            self.assertEqual(registry.get("weather").lookup(5), "rain")
+
+            with open(path, "w") as csvfile:
+                csvfile.write("weight,result\n1,snow\n")
+            os.utime(path, (0, 0))
+            self.assertEqual(registry.reload_changed(), ["weather"])
+            self.assertEqual(registry.roll("weather"), "snow")
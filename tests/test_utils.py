@@ -26,4 +26,18 @@ Quality: |w3|n, Uses: |winfinite|n
 Attacks using |wstrength|n against |warmor|n
 Damage roll: |w1d6|n
 """.strip()
-)
\ No newline at end of file
+)
+
+    def test_get_obj_stats_cache(self):
+        obj = create.create_object(
+            key="testobj",
+            attributes=(("desc", "A test object"),)
+        )
+        result = utils.get_obj_stats(obj)
+        # unchanged object gives the same cached string
+        self.assertIs(utils.get_obj_stats(obj), result)
+        # changing a displayed Attribute or the key updates the cached string
+        obj.db.desc = "A changed object"
+        self.assertIn("A changed object", utils.get_obj_stats(obj))
+        obj.key = "renamed"
+        self.assertIn("renamed", utils.get_obj_stats(obj))
@@ -0,0 +1,66 @@
+from evennia import create_object
+from evennia.utils.test_resources import EvenniaTest
+
+from typeclasses.rooms import Room
+from typeclasses.worldgraph import WORLD_GRAPH
+from typeclasses.zonemap import ZONE_MAPS
+
+
+class TestWorldGraph(EvenniaTest):
+    def setUp(self):
+        super().setUp()
+        self.rooms = [create_object(Room, key=f"room{i}") for i in range(5)]
+        WORLD_GRAPH.load()
+        # a one-way corridor room0 -> room4
+        self.exits = [
+            create_object("typeclasses.exits.Exit", key="east", location=room, destination=nxt)
+            for room, nxt in zip(self.rooms, self.rooms[1:])
+        ]
+
+    def test_path(self):
+        rooms, exits = self.rooms, self.exits
+        self.assertEqual(WORLD_GRAPH.path(rooms[0], rooms[2]), [exits[0].id, exits[1].id])
+        self.assertEqual(WORLD_GRAPH.distance(rooms[0], rooms[4]), 4)
+        self.assertIsNone(WORLD_GRAPH.distance(rooms[4], rooms[0]))
+        self.assertEqual(
+            WORLD_GRAPH.within(rooms[1], 2), {rooms[1].id: 0, rooms[2].id: 1, rooms[3].id: 2}
+        )
+
+    def test_exit_changes(self):
+        rooms, exits = self.rooms, self.exits
+        self.assertEqual(WORLD_GRAPH.distance(rooms[0], rooms[4]), 4)
+        exits[0].destination = rooms[3]
+        self.assertEqual(WORLD_GRAPH.distance(rooms[0], rooms[4]), 2)
+        exits[3].delete()
+        self.assertIsNone(WORLD_GRAPH.distance(rooms[0], rooms[4]))
+
+    def test_minimap_cache(self):
+        looker = create_object("typeclasses.characters.Character", key="Looker", location=self.rooms[1])
+        header = self.rooms[1].get_display_header(looker)
+        self.assertIs(self.rooms[1].get_display_header(looker), header)
+        create_object(
+            "typeclasses.exits.Exit", key="north", location=self.rooms[1], destination=self.rooms[0]
+        )
+        self.assertNotEqual(self.rooms[1].get_display_header(looker), header)
+        self.assertIn("||", self.rooms[1].get_display_header(looker))
+
+    def test_zone_map(self):
+        # room1 also leads north to room0, which is already west of it on the map
+        create_object(
+            "typeclasses.exits.Exit", key="north", location=self.rooms[1], destination=self.rooms[0]
+        )
+        layout = ZONE_MAPS.get_layout(self.rooms[0])
+        self.assertEqual(layout.coords[self.rooms[4].id], (4, 0))
+        self.assertIs(ZONE_MAPS.get_layout(self.rooms[2]), layout)
+        self.assertEqual(
+            ZONE_MAPS.render(self.rooms[2], size=5),
+            "\n".join(
+                [
+                    "     ",
+                    "|B|||n    ",
+                    "|bo|n|B-|n|w@|n|B-|n|bo|n",
+                    "     ",
+                    "     ",
+                ]
+            ),
+        )
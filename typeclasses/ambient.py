@@ -0,0 +1,121 @@
+"""
+Ambient effects
+
+Rooms with ambient effects (like the random messages of an `EchoingRoom`) only need
+to do anything while someone is there to notice. `AMBIENT` keeps the set of such
+rooms that have puppeted characters in them, updated by the rooms' arrival and
+departure hooks and by puppeting/unpuppeting. A single `AmbientScript` ticks only
+those rooms, by calling their `at_ambient_tick(now, rng)` hook - the rest of the world
+costs nothing. A room becoming occupied has its `at_ambient_start()` hook called, if it
+has one.
+
+The random numbers the rooms need are drawn from a `RandomStream`, which generates
+them in bulk.
+
+"""
+
+import random
+import time
+
+from .behavior import BEHAVIOR
+from .scripts import Script
+
+# seconds between ambient ticks
+AMBIENT_INTERVAL = 10
+
+
+class RandomStream:
+    """
+    Random numbers in [0, 1), generated in bulk.
+
+    """
+
+    def __init__(self, batch_size=1024, seed=None):
+        self.batch_size = batch_size
+        self._random = random.Random(seed)
+        self._batch = []
+
+    def random(self):
+        """Get the next random number"""
+        if not self._batch:
+            rand = self._random.random
+            self._batch = [rand() for _ in range(self.batch_size)]
+        return self._batch.pop()
+
+    def choice(self, seq):
+        """Pick a random element from a non-empty sequence"""
+        return seq[int(self.random() * len(seq))]
+
+
+class AmbientScheduler:
+    """
+    Tracks the occupied rooms having ambient effects and ticks them.
+
+    """
+
+    def __init__(self):
+        # {room_id: (room, {character_id, ...})}, loaded on first use
+        self._occupied = None
+        self.rng = RandomStream()
+
+    @property
+    def occupied(self):
+        if self._occupied is None:
+            # after a reload, find where everyone is
+            self._occupied = {}
+            for character in BEHAVIOR.players.values():
+                self.character_arrived(character.location, character)
+        return self._occupied
+
+    def character_arrived(self, room, character):
+        """
+        Called when a puppeted character arrives in a room (or is puppeted there).
+
+        """
+        if room and hasattr(room, "at_ambient_tick"):
+            if room.id not in self.occupied:
+                self.occupied[room.id] = (room, set())
+                if hasattr(room, "at_ambient_start"):
+                    room.at_ambient_start()
+            self.occupied[room.id][1].add(character.id)
+
+    def character_left(self, room, character):
+        """
+        Called when a puppeted character leaves a room (or is unpuppeted there).
+
+        """
+        if room and room.id in self.occupied:
+            _, occupants = self.occupied[room.id]
+            occupants.discard(character.id)
+            if not occupants:
+                del self.occupied[room.id]
+
+    def tick(self):
+        """Tick the occupied rooms"""
+        now = time.time()
+        for room_id, (room, _) in list(self.occupied.items()):
+            if room.pk:
+                room.at_ambient_tick(now, self.rng)
+            else:
+                # deleted
+                del self.occupied[room_id]
+
+
+AMBIENT = AmbientScheduler()
+
+
+class AmbientScript(Script):
+    """
+    Global script ticking the ambient effects of occupied rooms. Set up in
+    `settings.GLOBAL_SCRIPTS`.
+
+    """
+
+    def at_script_creation(self):
+        self.key = "ambient"
+        self.desc = "Ticks ambient effects in occupied rooms"
+        self.interval = AMBIENT_INTERVAL
+        self.persistent = True
+
+    def at_repeat(self):
+        AMBIENT.tick()
@@ -0,0 +1,149 @@
+"""
+NPC behavior
+
+Mobs have a small state machine ("idle", "wander", "aggro", "flee", see `Mob` in
+`typeclasses/npc.py`) which is stepped by a single `BehaviorScheduler` - not by a
+ticker per mob.
+
+The world holds far more mobs than players, and a mob nobody sees might as well be
+frozen. So the scheduler only ticks the *active* rooms: those with a puppeted
+character in them, plus all other rooms of their zone (the `zone` Tag of the room,
+if it has one). The set of active rooms is worked out from the puppeted characters
+on every tick, so the work done depends on how many players there are and where,
+not on the size of the world.
+
+When a room becomes active again, its `at_occupied` hook is called with the time it
+was frozen, letting its mobs catch up in one go (see `Mob.at_behavior_catch_up`).
+When it becomes inactive, `at_vacated` is called.
+
+The ticking is done by `BehaviorScript`, set up in `settings.GLOBAL_SCRIPTS`.
+
+"""
+
+import time
+
+from evennia.objects.models import ObjectDB
+from evennia.utils import logger
+
+from .scripts import Script
+
+# seconds between behavior ticks
+BEHAVIOR_INTERVAL = 5
+ZONE_TAG_CATEGORY = "zone"
+
+
+class BehaviorScheduler:
+    """
+    Steps the behavior of everything in rooms near players.
+
+    """
+
+    def __init__(self):
+        # {dbid: character}, loaded on first use
+        self._players = None
+        # {dbid: room} of the rooms ticked last time
+        self.active_rooms = {}
+        # {zone: [rooms]}, for the zones of the active rooms
+        self._zones = {}
+
+    @property
+    def players(self):
+        """The puppeted characters"""
+        if self._players is None:
+            # after a reload nobody is re-puppeted, so find those who still are
+            self._players = {
+                obj.id: obj
+                for obj in ObjectDB.objects.filter(db_account__isnull=False)
+                if obj.sessions.count()
+            }
+        return self._players
+
+    def add_player(self, character):
+        """Called when `character` is puppeted"""
+        self.players[character.id] = character
+
+    def remove_player(self, character):
+        """Called when `character` is unpuppeted"""
+        self.players.pop(character.id, None)
+
+    def _zone_rooms(self, zone):
+        """All rooms in a zone, loaded once while the zone is active"""
+        if zone not in self._zones:
+            self._zones[zone] = list(
+                ObjectDB.objects.filter(
+                    db_tags__db_key=zone, db_tags__db_category=ZONE_TAG_CATEGORY
+                )
+            )
+        return self._zones[zone]
+
+    def get_active_rooms(self):
+        """
+        Find the rooms that should be ticked.
+
+        Returns:
+            dict: `{dbid: room}`.
+
+        """
+        active = {}
+        zones = set()
+        for player in self.players.values():
+            room = player.location
+            if room and room.id not in active:
+                active[room.id] = room
+                zone = room.tags.get(category=ZONE_TAG_CATEGORY)
+                if zone:
+                    zones.add(zone)
+        # forget the rooms of zones nobody is in any more
+        self._zones = {zone: rooms for zone, rooms in self._zones.items() if zone in zones}
+        for zone in zones:
+            for room in self._zone_rooms(zone):
+                active.setdefault(room.id, room)
+        return active
+
+    def tick(self):
+        """
+        Step the behavior of everything in the active rooms.
+
+        """
+        active = self.get_active_rooms()
+        now = time.time()
+        for dbid, room in self.active_rooms.items():
+            if dbid not in active and room.pk:
+                self._call(room, "at_vacated", now)
+        for dbid, room in active.items():
+            if dbid not in self.active_rooms:
+                self._call(room, "at_occupied", now)
+        self.active_rooms = active
+
+        for room in active.values():
+            # mobs may wander off while we go through the room
+            for obj in list(room.contents):
+                self._call(obj, "at_behavior_tick")
+
+    def _call(self, obj, hookname, *args):
+        """Call a hook, if it exists, without letting one broken object stop the tick"""
+        hook = getattr(obj, hookname, None)
+        if hook:
+            try:
+                hook(*args)
+            except Exception:
+                logger.log_trace(f"Error in {hookname} of {obj}.")
+
+
+BEHAVIOR = BehaviorScheduler()
+
+
+class BehaviorScript(Script):
+    """
+    Global script ticking the behavior scheduler. Set up in `settings.GLOBAL_SCRIPTS`.
+
+    """
+
+    def at_script_creation(self):
+        self.key = "behavior"
+        self.desc = "Steps NPC behavior near players"
+        self.interval = BEHAVIOR_INTERVAL
+        self.persistent = True
+
+    def at_repeat(self):
+        BEHAVIOR.tick()
@@ -11,15 +11,46 @@ creation commands.
 from evennia.objects.objects import DefaultCharacter
 from evennia.utils import lazy_property
 
+from .ambient import AMBIENT
+from .behavior import BEHAVIOR
+from .contentindex import notify_renamed
 from .equipment import EquipmentHandler, EquipmentError
+from .health import HealthHandler
 from .objects import ObjectParent
-from evennia import AttributeProperty, logger
+from .prefetch import prefetch_character, stamp_puppeted
+from .stats import StatProperty, StatsHandler
+from evennia import logger
 from .rules import dice
 
 
-class LivingMixin(AttributeProperty):
+class LivingMixin:
     # makes it easy for mobs to know to attack PCs
     is_pc = False
+    # HP regained per regeneration tick when out of combat (see typeclasses/regeneration.py)
+    hp_regen = 1
+
+    @lazy_property
+    def health(self):
+        return HealthHandler(self)
+
+    @property
+    def hp(self):
+        """Current health (kept in memory by the health handler)"""
+        return self.health.hp
+
+    @hp.setter
+    def hp(self, value):
+        self.health.set(value)
+
+    def at_rename(self, oldname, newname):
+        """Our room knows us by key"""
+        super().at_rename(oldname, newname)
+        notify_renamed(self)
+
+    def save_health(self):
+        """Write any pending HP change to the database (if the handler was used)"""
+        if "health" in self.__dict__:
+            self.health.save()
 
     @property
     def hurt_level(self):
@@ -45,16 +76,23 @@ class LivingMixin(AttributeProperty):
             return "|RCollapsed!|n"
 
 
-    def heal(self, hp):
+    def heal(self, hp, quiet=False):
         """
         Heal hp amount of health, not allowing to exceed our max hp
 
+        Args:
+            hp (int): How much to heal.
+            quiet (bool): Don't message about it (for callers summarizing on their own).
+
+        Returns:
+            int: How much we actually healed.
+
         """
-        damage = self.hp_max - self.hp
-        healed = min(damage, hp)
-        self.hp += healed
+        healed = self.health.heal(hp)
 
-        self.msg(f"You heal for {healed} HP.")
+        if not quiet:
+            self.msg(f"You heal for {healed} HP.")
+        return healed
 
 
     def at_pay(self, amount):
@@ -71,7 +109,7 @@ class LivingMixin(AttributeProperty):
 
     def at_damage(self, damage, attacker=None):
         """Called when attacked and taking damage."""
-        self.hp -= damage
+        self.health.damage(damage, attacker=attacker)
 
 
     def at_defeat(self):
@@ -122,28 +160,53 @@ class Character(ObjectParent, DefaultCharacter, LivingMixin):
 
     is_pc = True
 
-    strength = AttributeProperty(1)
-    dexterity = AttributeProperty(1)
-    constitution = AttributeProperty(1)
-    intelligence = AttributeProperty(1)
-    wisdom = AttributeProperty(1)
-    charisma = AttributeProperty(1)
-    luck = AttributeProperty(1)
+    # stored packed in a single Attribute if the character has a stats block,
+    # otherwise as separate Attributes (see typeclasses/stats.py)
+    strength = StatProperty()
+    dexterity = StatProperty()
+    constitution = StatProperty()
+    intelligence = StatProperty()
+    wisdom = StatProperty()
+    charisma = StatProperty()
+    luck = StatProperty()
+
+    hp_max = StatProperty()
 
-    hp = AttributeProperty(8)
-    hp_max = AttributeProperty(8)
+    level = StatProperty()
+    xp = StatProperty()
+    coins = StatProperty()
 
-    level = AttributeProperty(1)
-    xp = AttributeProperty(0)
-    coins = AttributeProperty(0)
+    charclass = StatProperty()
+    charrace = StatProperty()
 
-    charclass = AttributeProperty("Fighter")
-    charrace = AttributeProperty("Human")
+    @lazy_property
+    def stats(self):
+        return StatsHandler(self)
 
     @lazy_property
     def equipment(self):
         return EquipmentHandler(self)
 
+    def at_object_post_creation(self):
+        """
+        The Attributes given to `create_object` (like a packed stats block) are only
+        added after `at_object_creation`, so drop any handlers loaded before that.
+
+        """
+        super().at_object_post_creation()
+        for handler_name in ("stats", "health"):
+            self.__dict__.pop(handler_name, None)
+
+    @property
+    def weapon(self):
+        """The currently wielded weapon (cached by the equipment handler)"""
+        return self.equipment.weapon
+
+    @property
+    def armor(self):
+        """The current armor bonus (cached by the equipment handler)"""
+        return self.equipment.armor
+
     def at_defeat(self):
         """Characters roll on the death table"""
         if self.location.allow_death:
@@ -180,7 +243,7 @@ class Character(ObjectParent, DefaultCharacter, LivingMixin):
         if they pick up something). If it returns False, move is aborted.
 
         """
-        return self.equipment.validate_slot_usage(moved_object)
+        return self.equipment.validate_slot_usage(moved_object, source_location=source_location)
 
     def at_object_receive(self, moved_object, source_location, **kwargs):
         """
@@ -192,6 +255,16 @@ class Character(ObjectParent, DefaultCharacter, LivingMixin):
         except EquipmentError:
             logger.log_trace()
 
+    def at_batch_object_receive(self, moved_objects, source_location, **kwargs):
+        """
+        Called by the bulk spawner when many objects arrive at once.
+
+        """
+        try:
+            self.equipment.add(*moved_objects)
+        except EquipmentError:
+            logger.log_trace()
+
     def at_object_leave(self, moved_object, destination, **kwargs):
         """
         Called by Evennia when object leaves the Character.
@@ -199,5 +272,49 @@ class Character(ObjectParent, DefaultCharacter, LivingMixin):
         """
         self.equipment.remove(moved_object)
 
+    def at_carried_object_change(self, obj):
+        """
+        Called when a stat affecting our equipment (like armor or size) changes
+        on an object we carry, or its `obj_type` Tags change.
+
+        """
+        self.equipment.invalidate(recount=True)
+        self.equipment.index.invalidate(obj.id)
+
+    def at_pre_puppet(self, account, session=None, **kwargs):
+        """Load everything about us and our inventory in bulk, before any command needs it"""
+        prefetch_character(self)
+        super().at_pre_puppet(account, session=session, **kwargs)
+
+    def at_post_puppet(self, **kwargs):
+        """Start sending health changes to the client, and waking up the NPCs around us"""
+        super().at_post_puppet(**kwargs)
+        self.health.subscribe(self.send_health)
+        BEHAVIOR.add_player(self)
+        AMBIENT.character_arrived(self.location, self)
+        stamp_puppeted(self)
+
+    def at_pre_unpuppet(self, **kwargs):
+        """Stop sending health changes, and make sure HP is saved"""
+        super().at_pre_unpuppet(**kwargs)
+        self.health.unsubscribe(self.send_health)
+        BEHAVIOR.remove_player(self)
+        AMBIENT.character_left(self.location, self)
+        self.save_health()
+
+    def at_server_reload(self):
+        super().at_server_reload()
+        self.save_health()
+
+    def at_server_shutdown(self):
+        super().at_server_shutdown()
+        self.save_health()
+
+    def send_health(self, obj, event, amount, **kwargs):
+        """Health subscriber sending the new health to OOB-capable clients"""
+        self.msg(
+            health=((), {"event": event, "amount": amount, "hp": self.hp, "hp_max": self.hp_max})
+        )
+
 
 
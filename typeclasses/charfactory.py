@@ -0,0 +1,210 @@
+"""
+Character factory
+
+Chargen makes one character at a time (`TemporaryCharacterSheet.apply`), running all
+creation hooks and making a database query for every Attribute and every piece of
+starting gear. That's fine for a player, but filling a staging server with thousands
+of characters that way takes hours.
+
+    from typeclasses.charfactory import create_characters, roll_sheets
+
+    characters = create_characters(roll_sheets(10000))
+    # or, giving each of them to an account
+    characters = create_characters(roll_sheets(len(accounts)), accounts=accounts)
+
+`roll_sheets` rolls all the sheets in one go, on the random tables (see
+`typeclasses/tables.py`). `create_characters` creates the first character normally
+and then copies its database rows for all the others, like the bulk spawner (see
+`typeclasses/spawner.py`) - the characters, their Attributes (with the stats,
+description and equipment of each), their Tag links and their starting gear, using
+batched INSERTs inside a single transaction. Creation hooks are only run for the
+first character.
+
+"""
+
+import random
+
+from django.db import transaction
+from evennia.objects.models import ObjectDB
+from evennia.typeclasses.attributes import Attribute
+
+from .chargen import TemporaryCharacterSheet
+from .characters import Character
+from .equipment import EquipmentHandler
+from .spawner import _COPIED_ATTRIBUTE_FIELDS, _COPIED_FIELDS, _copy_objects
+from .stats import StatsHandler
+from .tables import TABLES
+
+ABILITIES = ("strength", "dexterity", "constitution", "intelligence", "wisdom", "charisma", "luck")
+_STATS_KEY = (StatsHandler.save_attribute, StatsHandler.save_category)
+_EQUIPMENT_KEY = (EquipmentHandler.save_attribute, "inventory")
+_DESC_KEY = ("desc", None)
+
+
+def roll_sheets(count, rng=None):
+    """
+    Roll up character sheets.
+
+    Args:
+        count (int): How many.
+        rng (random.Random or RandomStream, optional): Anything with a `random()`
+            method. Defaults to the `random` module.
+
+    Returns:
+        list: The `TemporaryCharacterSheet`s.
+
+    """
+    rand = (rng or random).random
+    names = TABLES.roll_many("chargen.name", count, rng=rng)
+    physiques = TABLES.roll_many("chargen.physique", count, rng=rng)
+    sheets = []
+    for name, physique in zip(names, physiques):
+        # abilities are the lowest of 3d6, like in TemporaryCharacterSheet
+        abilities = {
+            ability: min(int(rand() * 6), int(rand() * 6), int(rand() * 6)) + 1
+            for ability in ABILITIES
+        }
+        sheets.append(
+            TemporaryCharacterSheet(
+                name=name, physique=physique, hp_max=max(5, int(rand() * 8) + 1), **abilities
+            )
+        )
+    return sheets
+
+
+def _remap_slots(data, new_ids):
+    """Point the stored equipment slots of the template at the copies of its gear"""
+    slots = {}
+    for slotname, raw in data["slots"].items():
+        if isinstance(raw, list):
+            slots[slotname] = [new_ids.get(dbid, dbid) for dbid in raw]
+        else:
+            slots[slotname] = new_ids.get(raw, raw)
+    return {**data, "slots": slots}
+
+
+def _override_locks(lock_storage, lockstring):
+    """
+    Add the locks of `lockstring` to `lock_storage`, replacing those with the same
+    access type (like `LockHandler.add` does, without needing a handler).
+
+    """
+    locks = {}
+    for lockdef in f"{lock_storage};{lockstring}".split(";"):
+        lockdef = lockdef.strip()
+        if lockdef:
+            locks[lockdef.split(":", 1)[0].strip()] = lockdef
+    return ";".join(locks.values())
+
+
+def _copy_characters(template, sheets, accounts):
+    """
+    Make copies of the database rows of `template`, one per sheet.
+
+    Returns:
+        list: The ids of the new characters.
+
+    """
+    fields = {field: getattr(template, field) for field in _COPIED_FIELDS}
+    new_objs = ObjectDB.objects.bulk_create(
+        [ObjectDB(**{**fields, "db_key": sheet.name}) for sheet in sheets]
+    )
+    dbids = [obj.pk for obj in new_objs]
+
+    # let the accounts puppet their characters
+    linked = []
+    for obj, account in zip(new_objs, accounts):
+        if account:
+            obj.db_lock_storage = _override_locks(
+                template.db_lock_storage,
+                Character.lockstring.format(character_id=obj.pk, account_id=account.id),
+            )
+            linked.append(obj)
+    if linked:
+        ObjectDB.objects.bulk_update(linked, ["db_lock_storage"])
+
+    # each item of starting gear, copied for everyone: {template item id: [copy ids]}
+    gear_copies = {
+        item.id: _copy_objects(item, len(dbids), location_ids=dbids) for item in template.contents
+    }
+
+    # Attributes are owned by each object, so they must be copied - with the values
+    # that differ between characters filled in for each
+    template_attrs = list(template.db_attributes.all())
+    attrs = []
+    for index, sheet in enumerate(sheets):
+        new_gear_ids = {item_id: copies[index] for item_id, copies in gear_copies.items()}
+        for attr in template_attrs:
+            values = {field: getattr(attr, field) for field in _COPIED_ATTRIBUTE_FIELDS}
+            key = (attr.db_key, attr.db_category)
+            if key == _STATS_KEY:
+                values["db_value"] = sheet.make_stats_block()
+            elif key == _DESC_KEY:
+                values["db_value"] = sheet.desc
+            elif key == _EQUIPMENT_KEY:
+                values["db_value"] = _remap_slots(attr.db_value, new_gear_ids)
+            attrs.append(Attribute(**values))
+    if attrs:
+        attrs = Attribute.objects.bulk_create(attrs)
+        nattrs = len(template_attrs)
+        AttributeLink = ObjectDB.db_attributes.through
+        AttributeLink.objects.bulk_create(
+            [
+                AttributeLink(objectdb_id=dbid, attribute_id=attr.pk)
+                for index, dbid in enumerate(dbids)
+                for attr in attrs[index * nattrs : (index + 1) * nattrs]
+            ]
+        )
+
+    # Tags (including aliases and permissions) are shared, so we only need to link them
+    TagLink = ObjectDB.db_tags.through
+    tag_ids = list(TagLink.objects.filter(objectdb_id=template.id).values_list("tag_id", flat=True))
+    if tag_ids:
+        TagLink.objects.bulk_create(
+            [TagLink(objectdb_id=dbid, tag_id=tag_id) for dbid in dbids for tag_id in tag_ids]
+        )
+    return dbids
+
+
+def create_characters(sheets, accounts=None):
+    """
+    Create characters from sheets, in bulk.
+
+    Args:
+        sheets (list): `TemporaryCharacterSheet`s, like from `roll_sheets`.
+        accounts (list, optional): The account to give each character to (as with
+            chargen), or `None` for those that shouldn't have one.
+
+    Returns:
+        list: The new characters, in the order of `sheets`.
+
+    Raises:
+        ValueError: If `accounts` doesn't match `sheets`.
+
+    """
+    sheets = list(sheets)
+    accounts = list(accounts) if accounts is not None else [None] * len(sheets)
+    if len(accounts) != len(sheets):
+        raise ValueError("create_characters: need one account (or None) per sheet.")
+    if not sheets:
+        return []
+
+    # the first one is created normally, running all hooks
+    template = sheets[0].apply()
+    dbids = []
+    if len(sheets) > 1:
+        with transaction.atomic():
+            dbids = _copy_characters(template, sheets[1:], accounts[1:])
+
+    # load the copies in one query, putting them in the idmapper cache
+    objs_by_id = {obj.id: obj for obj in ObjectDB.objects.filter(id__in=dbids)}
+    characters = [template] + [objs_by_id[dbid] for dbid in dbids]
+
+    if accounts[0]:
+        template.locks.add(
+            Character.lockstring.format(character_id=template.id, account_id=accounts[0].id)
+        )
+    for character, account in zip(characters, accounts):
+        if account:
+            account.characters.add(character)
+    return characters
@@ -1,8 +1,12 @@
-from evennia import create_object, spawn, EvMenu
+from collections import Counter
+
+from evennia import create_object, EvMenu
 
 from .characters import Character
-from .random_tables import chargen_tables
 from .rules import dice
+from .spawner import bulk_spawn
+from .stats import StatsHandler, make_stats_block
+from .tables import TABLES
 
 
 _TEMP_SHEET = """
@@ -28,30 +32,37 @@ class TemporaryCharacterSheet:
     def _random_ability(self):
         return min(dice.roll("1d6"), dice.roll("1d6"), dice.roll("1d6"))
 
-    def __init__(self):
+    def __init__(self, **rolls):
+        """
+        Keyword Args:
+            Results rolled beforehand (`name`, the abilities, `physique` and `hp_max`),
+            like by `roll_sheets` in `typeclasses/charfactory.py`. The rest is rolled
+            here.
+
+        """
         self.ability_changes = 0  # how many times we tried swap abilities
 
         # name will likely be modified later
-        self.name = dice.roll_random_table("1d282", chargen_tables["name"])
+        self.name = rolls.get("name") or TABLES.roll("chargen.name")
 
         # base attribute values
-        self.strength = self._random_ability()
-        self.dexterity = self._random_ability()
-        self.constitution = self._random_ability()
-        self.intelligence = self._random_ability()
-        self.wisdom = self._random_ability()
-        self.charisma = self._random_ability()
-        self.luck = self._random_ability()
+        self.strength = rolls.get("strength") or self._random_ability()
+        self.dexterity = rolls.get("dexterity") or self._random_ability()
+        self.constitution = rolls.get("constitution") or self._random_ability()
+        self.intelligence = rolls.get("intelligence") or self._random_ability()
+        self.wisdom = rolls.get("wisdom") or self._random_ability()
+        self.charisma = rolls.get("charisma") or self._random_ability()
+        self.luck = rolls.get("luck") or self._random_ability()
 
         # physical attributes (only for rp purposes)
-        physique = dice.roll_random_table("1d20", chargen_tables["physique"])
+        physique = rolls.get("physique") or TABLES.roll("chargen.physique")
 
         self.desc = (
             f"You are {physique}"
         )
 
         #
-        self.hp_max = max(5, dice.roll("1d8"))
+        self.hp_max = rolls.get("hp_max") or max(5, dice.roll("1d8"))
         self.hp = self.hp_max
         self.xp = 0
         self.level = 1
@@ -89,41 +100,40 @@ class TemporaryCharacterSheet:
             equipment=", ".join(equipment),
         )
 
+    def make_stats_block(self):
+        """The packed stats of the character (see `typeclasses/stats.py`)"""
+        return make_stats_block(
+            strength=self.strength,
+            dexterity=self.dexterity,
+            constitution=self.constitution,
+            intelligence=self.intelligence,
+            wisdom=self.wisdom,
+            charisma=self.charisma,
+            luck=self.luck,
+            hp=self.hp,
+            hp_max=self.hp_max,
+            level=self.level,
+            xp=self.xp,
+        )
+
     def apply(self):
         # create character object with given abilities
         new_character = create_object(
             Character,
             key=self.name,
-            attrs=(
-                ("strength", self.strength),
-                ("dexterity", self.dexterity),
-                ("constitution", self.constitution),
-                ("intelligence", self.intelligence),
-                ("wisdom", self.wisdom),
-                ("charisma", self.wisdom),
-                ("luck", self.luck),
-                ("hp", self.hp),
-                ("hp_max", self.hp_max),
+            attributes=(
+                # all stats in one packed Attribute
+                (StatsHandler.save_attribute, self.make_stats_block(), StatsHandler.save_category),
                 ("desc", self.desc),
             ),
         )
-        # spawn equipment (will require prototypes created before it works)
-        if self.weapon:
-            weapon = spawn(self.weapon)
-            new_character.equipment.move(weapon)
-        if self.shield:
-            shield = spawn(self.shield)
-            new_character.equipment.move(shield)
-        if self.armor:
-            armor = spawn(self.armor)
-            new_character.equipment.move(armor)
-        if self.helmet:
-            helmet = spawn(self.helmet)
-            new_character.equipment.move(helmet)
-
-        for item in self.backpack:
-            item = spawn(item)
-            new_character.equipment.store(item)
+        # spawn all equipment in one go (will require prototypes created before it works).
+        # It all ends up in the backpack, after which we wield/wear the gear.
+        gear = [item for item in (self.weapon, self.shield, self.armor, self.helmet) if item]
+        spawn_list = [(item, 1) for item in gear] + list(Counter(self.backpack).items())
+        spawned = bulk_spawn(spawn_list, location=new_character)
+        for obj in spawned[: len(gear)]:
+            new_character.equipment.move(obj)
 
         return new_character
 
@@ -267,7 +277,7 @@ def node_apply_character(caller, raw_string, **kwargs):
 
     """
     tmp_character = kwargs["tmp_character"]
-    new_character = tmp_character.apply(caller)
+    new_character = tmp_character.apply()
     caller.characters.add(new_character)
 
     text = "Character created!"
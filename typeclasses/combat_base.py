@@ -123,8 +123,12 @@ class CombatActionAttack(CombatAction):
         target = self.target
 
         if weapon.at_pre_use(attacker, target):
-            weapon.use(
-                attacker, target, advantage=self.combathandler.has_advantage(attacker, target)
+            # the result is sent as one message, through the combathandler
+            self.result = weapon.use(
+                attacker,
+                target,
+                advantage=self.combathandler.has_advantage(attacker, target),
+                msg=self.msg,
             )
             weapon.at_post_use(attacker, target)
 
@@ -321,7 +325,14 @@ class CombatBaseHandler(DefaultScript):
         if not location:
             location = self.obj
 
-        location_objs = location.contents
+        index = getattr(location, "content_index", None)
+        if index:
+            # rooms keep their contents sorted, and a mapping ready
+            location_objs = index.receivers
+            mapping = index.mapping
+        else:
+            location_objs = location.contents
+            mapping = {locobj.key: locobj for locobj in location_objs}
 
         exclude = []
         if not broadcast and combatant:
@@ -331,7 +342,7 @@ class CombatBaseHandler(DefaultScript):
             message,
             exclude=exclude,
             from_obj=combatant,
-            mapping={locobj.key: locobj for locobj in location_objs},
+            mapping=mapping,
         )
 
     def get_combat_summary(self, combatant):
@@ -173,9 +173,47 @@ class TurnbasedCombatHandler(CombatBaseHandler):
         """
         if combatant not in self.combatants:
             self.combatants[combatant] = self.fallback_action_dict
+            self._subscribe(combatant)
             return True
         return False
 
+    def _subscribe(self, combatant):
+        """
+        Get told by the combatant's health handler when they are defeated. Someone
+        already defeated won't send the event again, so they are queued right away.
+
+        """
+        health = getattr(combatant, "health", None)
+        if health:
+            health.subscribe(self.at_combatant_health_change)
+            if health.is_defeated:
+                self._queue_defeated(combatant)
+
+    def _queue_defeated(self, combatant):
+        """Note a defeated combatant, to be removed in `check_stop_combat`"""
+        defeated = self.ndb.newly_defeated or []
+        if combatant not in defeated:
+            defeated.append(combatant)
+        self.ndb.newly_defeated = defeated
+
+    def at_combatant_health_change(self, combatant, event, amount, **kwargs):
+        """
+        Health subscriber. Defeated combatants are only noted here; they are removed
+        from combat at the end of the turn, in `check_stop_combat`.
+
+        """
+        if event == "defeated" and combatant in self.combatants:
+            self._queue_defeated(combatant)
+
+    def at_start(self, **kwargs):
+        """
+        Subscriptions (and the queue of defeated combatants) are not persistent, so
+        renew them when starting after a reload.
+
+        """
+        for combatant in self.combatants:
+            self._subscribe(combatant)
+
     def remove_combatant(self, combatant):
         """
         Remove a combatant from the battle. This removes their queue.
@@ -186,6 +224,9 @@ class TurnbasedCombatHandler(CombatBaseHandler):
 
         """
         self.combatants.pop(combatant, None)
+        health = getattr(combatant, "health", None)
+        if health:
+            health.unsubscribe(self.at_combatant_health_change)
         # clean up menu if it exists
         if combatant.ndb._evmenu:
             combatant.ndb._evmenu.close_menu()
@@ -204,7 +245,7 @@ class TurnbasedCombatHandler(CombatBaseHandler):
         Stop the combat immediately.
 
         """
-        for combatant in self.combatants:
+        for combatant in list(self.combatants):
             self.remove_combatant(combatant)
         self.stop()
         self.delete()
@@ -320,15 +361,16 @@ class TurnbasedCombatHandler(CombatBaseHandler):
     def check_stop_combat(self):
         """Check if it's time to stop combat"""
 
-        # check if anyone is defeated
-        for combatant in list(self.combatants.keys()):
-            if combatant.hp <= 0:
+        # handle anyone defeated this turn (we are told by their health handlers)
+        for combatant in self.ndb.newly_defeated or []:
+            if combatant in self.combatants:
                 # PCs roll on the death table here, NPCs die. Even if PCs survive, they
                 # are still out of the fight.
                 combatant.at_defeat()
-                self.combatants.pop(combatant)
+                self.remove_combatant(combatant)
                 self.defeated_combatants.append(combatant)
                 self.msg("|r$You() $conj(fall) to the ground, defeated.|n", combatant=combatant)
+        self.ndb.newly_defeated = []
 
         # check if anyone managed to flee
         flee_timeout = self.flee_timeout
@@ -0,0 +1,178 @@
+"""
+Containers
+
+Containers are items like bags and sacks. They go in the backpack and hold items of
+their own. Each container stores its contents (as dbrefs) in an Attribute on the
+container itself, so changing what is in one bag doesn't re-save the whole inventory
+of whoever is carrying it.
+
+The slot usage and capacity of a container roll up into the `EquipmentHandler` of
+the carrier; a container takes up its own `size` plus whatever is stored in it, and
+adds its `capacity` to the carrier's max slots.
+
+"""
+
+from evennia.utils import inherits_from, lazy_property
+
+from .enums import ObjType
+from .equipment import EquipmentError, _resolve_dbrefs, get_footprint
+from .objects import EquipmentAttributeProperty, Object, ObjectParent
+
+
+class ContainerHandler:
+    """
+    Tracks the contents of a container. The used slots are cached and stored
+    along with the contents, so they can be rolled up without loading the items.
+
+    """
+
+    save_attribute = "container_slots"
+    # bump this if changing how the contents are stored
+    save_format_version = 1
+
+    def __init__(self, obj):
+        # here obj is the container we store the handler on
+        self.obj = obj
+        self._load()
+
+    def _load(self):
+        """Load our data from an Attribute on `self.obj`"""
+        data = self.obj.attributes.get(self.save_attribute, category="inventory")
+        if data and data.get("version") == self.save_format_version:
+            self._dbrefs = list(data["items"])
+            self.used_slots = data["used"]
+        else:
+            self._dbrefs = []
+            self.used_slots = 0
+        self._items = None
+
+    def _save(self):
+        """Save our data back to the same Attribute"""
+        self.obj.attributes.add(
+            self.save_attribute,
+            {
+                "version": self.save_format_version,
+                "items": list(self._dbrefs),
+                "used": self.used_slots,
+            },
+            category="inventory",
+        )
+
+    @property
+    def items(self):
+        """The items stored in the container, resolved on first access"""
+        if self._items is None:
+            self._items = _resolve_dbrefs(self._dbrefs)
+            self._dbrefs = [obj.id for obj in self._items]
+        return self._items
+
+    def _propagate(self, delta):
+        """Tell whoever is carrying us that our footprint changed"""
+        carrier = self.obj.location
+        if not carrier or not delta:
+            return
+        handler = getattr(carrier, "equipment", None) or getattr(carrier, "storage", None)
+        if handler:
+            handler.adjust_usage(delta)
+
+    def adjust_usage(self, delta):
+        """
+        Called by containers stored inside this one when their contents change.
+
+        Args:
+            delta (int): The change in slots used.
+
+        """
+        self.used_slots += delta
+        self._save()
+        self._propagate(delta)
+
+    def validate_slot_usage(self, obj):
+        """
+        Check if obj can fit in this container, based on its size.
+
+        """
+        if not inherits_from(obj, ObjectParent):
+            # in case we mix with non-evadventure objects
+            raise EquipmentError(f"{obj.key} is not something that can be stored.")
+        if obj == self.obj:
+            return False
+        return self.used_slots + get_footprint(obj) <= (self.obj.capacity or 0)
+
+    def add(self, obj):
+        """
+        Put something in the container.
+
+        """
+        if obj.id in self._dbrefs or not self.validate_slot_usage(obj):
+            return
+        self._dbrefs.append(obj.id)
+        if self._items is not None:
+            self._items.append(obj)
+        self.adjust_usage(get_footprint(obj))
+
+    def remove(self, obj):
+        """
+        Take something out of the container.
+
+        Returns:
+            list: A list of 0 or 1 objects removed.
+
+        """
+        if obj.id not in self._dbrefs:
+            return []
+        self._dbrefs.remove(obj.id)
+        if self._items is not None and obj in self._items:
+            self._items.remove(obj)
+        self.adjust_usage(-get_footprint(obj))
+        return [obj]
+
+    def recount(self):
+        """Recalculate slot usage from scratch, for example if an item changed size"""
+        used = sum(get_footprint(obj) for obj in self.items)
+        self.adjust_usage(used - self.used_slots)
+
+    def display_contents(self):
+        """
+        Get a visual representation of the container's contents.
+
+        """
+        if not self._dbrefs:
+            return f"{self.obj.key} is empty."
+        out = [f"{item.key} [|b{item.size}|n] slot(s)" for item in self.items]
+        out.append(f"|b{self.used_slots}/{self.obj.capacity}|n slots used.")
+        return "\n".join(out)
+
+
+class Container(Object):
+    """
+    A bag, sack or other item that can hold other items.
+
+    """
+
+    obj_type = ObjType.CONTAINER
+    capacity = EquipmentAttributeProperty(10, autocreate=False)
+
+    @lazy_property
+    def storage(self):
+        return ContainerHandler(self)
+
+    def get_display_desc(self, looker, **kwargs):
+        """Show the contents along with the stats"""
+        return f"{super().get_display_desc(looker, **kwargs)}\n\n{self.storage.display_contents()}"
+
+    def at_pre_object_receive(self, moved_object, source_location, **kwargs):
+        """Abort the move if the object doesn't fit"""
+        return self.storage.validate_slot_usage(moved_object)
+
+    def at_object_receive(self, moved_object, source_location, **kwargs):
+        """Store anything put in the container"""
+        self.storage.add(moved_object)
+
+    def at_object_leave(self, moved_object, destination, **kwargs):
+        """Stop tracking anything taken out of the container"""
+        self.storage.remove(moved_object)
+
+    def at_carried_object_change(self, obj):
+        """An item inside us changed size"""
+        self.storage.recount()
@@ -0,0 +1,212 @@
+"""
+Content index
+
+A room's `contents` is a flat list, so anything wanting just the characters or just
+the exits in it has to go through everything - and messaging a room goes through
+everything for every message. In a crowded hub that adds up.
+
+The `ContentIndex` of a room (`room.content_index`) keeps its contents sorted by kind:
+
+- characters: player characters.
+- npcs: other living things.
+- exits: anything with a destination.
+- sittables: things to sit on.
+- items: everything else.
+
+It's built from `contents` when first used and then kept up to date by the room's
+`at_object_receive` and `at_object_leave` hooks. Objects moved without calling those
+(like by setting `.location` directly) are dropped from the index when it's next read,
+but objects arriving that way are only seen after `reset()`.
+
+It also keeps a ready-made `{key: obj}` mapping of the contents, for the `$You(key)`
+funcparser callables used with `msg_contents`.
+
+"""
+
+from collections import ChainMap
+from functools import lru_cache
+
+from evennia.objects.objects import DefaultObject
+
+CATEGORIES = ("characters", "npcs", "exits", "sittables", "items")
+
+
+def get_category(obj):
+    """Get the kind of object `obj` is, for the content index"""
+    if obj.destination:
+        return "exits"
+    if hasattr(obj, "is_pc"):
+        # living things have an is_pc
+        return "characters" if obj.is_pc else "npcs"
+    if hasattr(obj, "do_sit"):
+        return "sittables"
+    return "items"
+
+
+@lru_cache(maxsize=None)
+def _handles_messages(cls):
+    """If a typeclass does something of its own with messages sent to it"""
+    return cls.msg is not DefaultObject.msg
+
+
+def wants_messages(obj):
+    """If an object that isn't living should still get the messages sent to a room"""
+    return obj.has_account or _handles_messages(type(obj))
+
+
+class DisplayNames:
+    """
+    A read-only view of a `{key: obj}` mapping as `{key: display name}`, for
+    `str.format_map`. Names are only looked up for the keys actually used.
+
+    """
+
+    def __init__(self, mapping, looker):
+        self.mapping = mapping
+        self.looker = looker
+
+    def __getitem__(self, key):
+        obj = self.mapping[key]
+        return obj.get_display_name(looker=self.looker) if hasattr(obj, "get_display_name") else str(obj)
+
+
+class ContentIndex:
+    """
+    The contents of a room, by kind.
+
+    """
+
+    def __init__(self, room):
+        # here room is the room we store the index on
+        self.room = room
+        # {category: {dbid: obj}}, built on first use
+        self._index = None
+        self._mapping = None
+        # {dbid: obj} arrived before the index was built. A newly created object is
+        # received before it shows up in the room's contents, so it could be missed.
+        self._arrived = {}
+
+    def reset(self):
+        """Rebuild the index from the room's contents on next use"""
+        self._index = None
+        self._mapping = None
+        self._arrived = {}
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = {category: {} for category in CATEGORIES}
+            for obj in self.room.contents + list(self._arrived.values()):
+                self._index[get_category(obj)][obj.id] = obj
+            self._arrived = {}
+        return self._index
+
+    def add(self, obj):
+        """Called when `obj` arrives in the room"""
+        if self._index is None:
+            self._arrived[obj.id] = obj
+        else:
+            self.discard(obj)
+            self._index[get_category(obj)][obj.id] = obj
+        self._mapping = None
+
+    def discard(self, obj):
+        """Called when `obj` leaves the room"""
+        if self._index is None:
+            self._arrived.pop(obj.id, None)
+        else:
+            for objs in self._index.values():
+                objs.pop(obj.id, None)
+        self._mapping = None
+
+    def get(self, *categories):
+        """
+        Get the contents of some kinds.
+
+        Args:
+            *categories (str): Any of `CATEGORIES`.
+
+        Returns:
+            list: The objects.
+
+        """
+        room = self.room
+        found = []
+        for category in categories:
+            objs = self.index[category]
+            for dbid, obj in list(objs.items()):
+                if obj.pk and obj.location == room:
+                    found.append(obj)
+                else:
+                    # moved away without telling us, or deleted
+                    del objs[dbid]
+                    self._mapping = None
+        return found
+
+    @property
+    def characters(self):
+        return self.get("characters")
+
+    @property
+    def npcs(self):
+        return self.get("npcs")
+
+    @property
+    def exits(self):
+        return self.get("exits")
+
+    @property
+    def sittables(self):
+        return self.get("sittables")
+
+    @property
+    def items(self):
+        return self.get("items")
+
+    @property
+    def listeners(self):
+        """Everything that can be messaged meaningfully: characters and NPCs"""
+        return self.get("characters", "npcs")
+
+    @property
+    def listener_count(self):
+        """
+        The number of listeners, in O(1) - kept by `add` and `discard`. Unlike
+        `listeners`, this doesn't check for objects that left without telling us.
+
+        """
+        index = self.index
+        return len(index["characters"]) + len(index["npcs"])
+
+    @property
+    def receivers(self):
+        """
+        Everything that should get messages sent to the room: the listeners, plus
+        anything else that is puppeted or handles messages itself.
+
+        """
+        return self.listeners + [
+            obj for obj in self.get("exits", "sittables", "items") if wants_messages(obj)
+        ]
+
+    @property
+    def mapping(self):
+        """
+        `{key: obj}` for all contents, for use with the funcparser. Must not be changed
+        (see `mapping_with`).
+
+        """
+        if self._mapping is None:
+            self._mapping = {obj.key: obj for obj in self.get(*CATEGORIES)}
+        return self._mapping
+
+    def mapping_with(self, **extra):
+        """The `mapping`, with extra entries on top, without copying it"""
+        return ChainMap(extra, self.mapping)
+
+
+def notify_renamed(obj):
+    """Called when `obj` is renamed, since the mapping of its room is by key"""
+    location = obj.location
+    if location and "content_index" in location.__dict__:
+        location.content_index.add(obj)
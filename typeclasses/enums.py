@@ -53,4 +53,5 @@ class ObjType(Enum):
     GEAR = "gear"
     MAGIC = "magic"
     QUEST = "quest"
-    TREASURE = "treasure"
\ No newline at end of file
+    TREASURE = "treasure"
+    CONTAINER = "container"
\ No newline at end of file
@@ -1,6 +1,8 @@
+from evennia.objects.models import ObjectDB
 from evennia.utils import inherits_from
+from evennia.utils.utils import make_iter
 
-from .enums import WieldLocation, Ability
+from .enums import WieldLocation, Ability, ObjType
 from .objects import ObjectParent, get_bare_hands
 
 
@@ -8,50 +10,378 @@ class EquipmentError(TypeError):
     """All types of equipment-errors"""
     pass
 
+
+def is_container(obj):
+    """Check if obj is a container (like a bag) able to hold other items"""
+    return ObjType.CONTAINER in make_iter(getattr(obj, "obj_type", None))
+
+
+def get_footprint(obj):
+    """
+    Get how many slots an object takes up, including anything stored inside it.
+
+    Args:
+        obj (Object): The object to check.
+
+    Returns:
+        int: The number of slots used.
+
+    """
+    size = getattr(obj, "size", 0) or 0
+    if is_container(obj):
+        size += obj.storage.used_slots
+    return size
+
+
+def _resolve_dbref(dbid):
+    """
+    Get the object with the given id, preferring the idmapper cache over a db lookup.
+    Returns None if the object no longer exists.
+
+    """
+    if dbid is None:
+        return None
+    obj = ObjectDB.get_cached_instance(dbid)
+    if obj is None:
+        try:
+            obj = ObjectDB.objects.get_id(dbid)
+        except ObjectDB.DoesNotExist:
+            return None
+    return obj
+
+
+def _resolve_dbrefs(dbids):
+    """
+    Get the objects with the given ids, in order. Objects in the idmapper cache are
+    used as they are, all others are loaded with a single query. Objects that no
+    longer exist are left out.
+
+    """
+    found = {}
+    missing = []
+    for dbid in dbids:
+        if dbid is None:
+            continue
+        obj = ObjectDB.get_cached_instance(dbid)
+        if obj is None:
+            missing.append(dbid)
+        else:
+            found[dbid] = obj
+    if missing:
+        found.update((obj.id, obj) for obj in ObjectDB.objects.filter(id__in=missing))
+    return [found[dbid] for dbid in dbids if dbid in found]
+
+
+class LazySlots(dict):
+    """
+    The equipment slots, as used by the `EquipmentHandler`. The slots are stored as
+    dbrefs and each slot is only resolved into actual objects (through the idmapper
+    cache) the first time it is touched.
+
+    """
+
+    def __init__(self, raw_slots):
+        """
+        Args:
+            raw_slots (dict): Mapping `{WieldLocation: dbid or None}`, where the
+                `WieldLocation.BACKPACK` slot instead holds a list of dbids.
+
+        """
+        super().__init__()
+        self._raw = dict(raw_slots)
+
+    def __missing__(self, slot):
+        if slot not in self._raw:
+            raise KeyError(slot)
+        raw = self._raw.pop(slot)
+        if slot is WieldLocation.BACKPACK:
+            value = _resolve_dbrefs(raw)
+        else:
+            value = _resolve_dbref(raw)
+        self[slot] = value
+        return value
+
+    def __contains__(self, slot):
+        return super().__contains__(slot) or slot in self._raw
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return super().__len__() + len(self._raw)
+
+    def get(self, slot, default=None):
+        try:
+            return self[slot]
+        except KeyError:
+            return default
+
+    def resolve(self):
+        """Resolve all slots that were not touched yet"""
+        for slot in list(self._raw):
+            self[slot]
+
+    def keys(self):
+        return list(super().keys()) + list(self._raw)
+
+    def values(self):
+        self.resolve()
+        return super().values()
+
+    def items(self):
+        self.resolve()
+        return super().items()
+
+    def get_dbrefs(self, slot):
+        """
+        Get the dbref(s) in a slot without resolving it.
+
+        Args:
+            slot (WieldLocation): The slot to check.
+
+        Returns:
+            int, None or list: The dbid of the object in the slot (a list of dbids for
+            the backpack).
+
+        """
+        if slot in self._raw:
+            raw = self._raw[slot]
+            return list(raw) if slot is WieldLocation.BACKPACK else raw
+        value = self[slot]
+        if slot is WieldLocation.BACKPACK:
+            return [obj.id for obj in value if obj and obj.id]
+        return value.id if value else None
+
+    def serialize(self):
+        """
+        Get the compact, storable version of the slots.
+
+        Returns:
+            dict: `{slotname: dbid or None}` (a list of dbids for the backpack).
+
+        """
+        return {slot.value: self.get_dbrefs(slot) for slot in WieldLocation}
+
+
+# which `obj_type` tags make an item show up in the usable/wieldable/wearable queries
+_OBJ_TYPE_CATEGORIES = {
+    ObjType.CONSUMABLE.value: ("usable",),
+    ObjType.MAGIC.value: ("usable", "wieldable"),
+    ObjType.WEAPON.value: ("wieldable",),
+    ObjType.SHIELD.value: ("wieldable",),
+    ObjType.ARMOR.value: ("wearable",),
+    ObjType.HELMET.value: ("wearable",),
+}
+
+
+class InventoryIndex:
+    """
+    In-memory index of which backpack items are usable, wieldable or wearable. It is
+    built from the `obj_type` Tags of the items, in one query for all items not seen
+    before, so answering a query does not touch the items themselves.
+
+    """
+
+    def __init__(self):
+        # {dbid: set of categories}
+        self._index = {}
+
+    def sync(self, dbids):
+        """
+        Make sure the index covers exactly the given items. Only items not already
+        indexed are looked up.
+
+        Args:
+            dbids (list): The dbids of the items currently in the backpack.
+
+        """
+        dbids = set(dbids)
+        for dbid in set(self._index) - dbids:
+            del self._index[dbid]
+        new_dbids = dbids - set(self._index)
+        if not new_dbids:
+            return
+        for dbid in new_dbids:
+            self._index[dbid] = set()
+        tagged = ObjectDB.objects.filter(
+            id__in=new_dbids, db_tags__db_category="obj_type", db_tags__db_tagtype=None
+        ).values_list("id", "db_tags__db_key")
+        for dbid, obj_type in tagged:
+            self._index[dbid].update(_OBJ_TYPE_CATEGORIES.get(obj_type, ()))
+
+    def invalidate(self, dbid=None):
+        """
+        Force items to be re-indexed on the next sync (for example if their `obj_type`
+        Tags changed).
+
+        Args:
+            dbid (int, optional): The item to re-index. If not given, re-index everything.
+
+        """
+        if dbid is None:
+            self._index = {}
+        else:
+            self._index.pop(dbid, None)
+
+    def get(self, category):
+        """
+        Get the dbids of all indexed items of a given category.
+
+        Args:
+            category (str): One of "usable", "wieldable" or "wearable".
+
+        Returns:
+            set: The matching dbids.
+
+        """
+        return {dbid for dbid, categories in self._index.items() if category in categories}
+
+
 class EquipmentHandler:
     save_attribute = "inventory_slots"
+    # bump this if changing how the slots are stored
+    save_format_version = 1
 
     def __init__(self, obj):
         # here obj is the character we store the handler on
         self.obj = obj
+        # bumped whenever the equipment changes; derived stats are cached per version
+        self.version = 0
+        self._stats_cache = {}
+        # cached subtotals, updated incrementally as items come and go
+        self._usage = None
+        self._container_capacity = None
+        self.index = InventoryIndex()
         self._load()
 
     def _load(self):
-        """Load our data from an Attribute on `self.obj`"""
-        self.slots = self.obj.attributes.get(
+        """
+        Load our data from an Attribute on `self.obj`. We only store dbrefs, the
+        objects themselves are resolved lazily, when the slot is first used.
+
+        """
+        data = self.obj.attributes.get(self.save_attribute, category="inventory")
+        raw_slots = {slot: None for slot in WieldLocation}
+        raw_slots[WieldLocation.BACKPACK] = []
+        if data and data.get("version") == self.save_format_version:
+            for slotname, raw in data["slots"].items():
+                slot = WieldLocation(slotname)
+                raw_slots[slot] = list(raw) if slot is WieldLocation.BACKPACK else raw
+        elif data:
+            # old-style storage of the objects themselves - convert to dbrefs and
+            # store them in the new format right away
+            for slot, value in data.items():
+                if slot is WieldLocation.BACKPACK:
+                    raw_slots[slot] = [obj.id for obj in value if obj and obj.id]
+                else:
+                    raw_slots[slot] = value.id if value else None
+            self.slots = LazySlots(raw_slots)
+            self._save()
+            return
+        self.slots = LazySlots(raw_slots)
+
+    def _save(self):
+        """Save our data back to the same Attribute"""
+        self.obj.attributes.add(
             self.save_attribute,
+            {"version": self.save_format_version, "slots": self.slots.serialize()},
             category="inventory",
-            default={
-                WieldLocation.MAIN_HAND: None,
-                WieldLocation.OFF_HAND: None,
-                WieldLocation.TWO_HANDS: None,
-                WieldLocation.BODY: None,
-                WieldLocation.HEAD: None,
-                WieldLocation.BACKPACK: []
-            }
         )
+        self.invalidate()
 
-    def _save(self):
-        """Save our data back to the same Attribute"""
-        self.obj.attributes.add(self.save_attribute, self.slots, category="inventory")
+    def invalidate(self, recount=False):
+        """
+        Mark all cached derived stats (armor, weapon etc) as stale. This is called
+        automatically whenever the equipment is saved, and by equipped items when one
+        of their relevant Attributes change.
+
+        Args:
+            recount (bool): Also recount slot usage and container capacity from scratch
+                next time they are needed.
+
+        """
+        self.version += 1
+        if recount:
+            self._usage = self._container_capacity = None
+
+    def _recount(self):
+        """Recalculate the slot usage and container-capacity subtotals"""
+        usage = capacity = 0
+        for obj, slot in self.all():
+            if obj:
+                usage += get_footprint(obj)
+                if slot is WieldLocation.BACKPACK and is_container(obj):
+                    capacity += obj.capacity or 0
+        self._usage, self._container_capacity = usage, capacity
+
+    def _track(self, obj, direction=1):
+        """
+        Update the subtotals for an object entering (direction=1) or leaving
+        (direction=-1) the inventory.
+
+        """
+        if self._usage is not None:
+            self._usage += direction * get_footprint(obj)
+        if self._container_capacity is not None and is_container(obj):
+            self._container_capacity += direction * (obj.capacity or 0)
+
+    def adjust_usage(self, delta):
+        """
+        Called by containers in the backpack when their contents change.
+
+        Args:
+            delta (int): The change in slots used.
+
+        """
+        if self._usage is not None:
+            self._usage += delta
+
+    def _get_cached(self, name, getter, version=None):
+        """
+        Get a derived stat, only recomputing it if the equipment changed since last time.
+
+        Args:
+            name (str): The name of the stat to cache.
+            getter (callable): Called without arguments to (re)compute the stat.
+            version (hashable, optional): Use this version instead of `self.version`,
+                for stats also depending on other things than the equipment itself.
+
+        Returns:
+            any: The (possibly cached) value of the stat.
+
+        """
+        version = self.version if version is None else version
+        cached_version, value = self._stats_cache.get(name, (None, None))
+        if cached_version != version:
+            value = getter()
+            self._stats_cache[name] = (version, value)
+        return value
+
+    def _get_rendered(self, name, objs, render):
+        """
+        Get a cached display string. It's rebuilt when the equipment changes, or when
+        the appearance of any of `objs` changes (for example if they are renamed).
+
+        """
+        version = (self.version, tuple(getattr(obj, "appearance_version", None) for obj in objs))
+        return self._get_cached(name, render, version=version)
 
     @property
     def max_slots(self):
-        """Max amount of slots, based on CON defense (CON + 10)"""
-        return getattr(self.obj, Ability.CON.value, 1) + 20
+        """
+        Max amount of slots, based on CON defense (CON + 10), plus the capacity of any
+        containers in the backpack.
+
+        """
+        if self._container_capacity is None:
+            self._recount()
+        return getattr(self.obj, Ability.CON.value, 1) + 20 + self._container_capacity
 
     def count_slots(self):
-        """Count current slot usage"""
-        slots = self.slots
-        wield_usage = sum(
-            getattr(slotobj, "size", 0) or 0
-            for slot, slotobj in slots.items()
-            if slot is not WieldLocation.BACKPACK
-        )
-        backpack_usage = sum(
-            getattr(slotobj, "size", 0) or 0 for slotobj in slots[WieldLocation.BACKPACK]
-        )
-        return wield_usage + backpack_usage
+        """Count current slot usage, including items stored in containers"""
+        if self._usage is None:
+            self._recount()
+        return self._usage
 
     def get_current_slot(self, obj):
         """
@@ -69,26 +399,52 @@ class EquipmentHandler:
             if obj == equipment_item:
                 return slot
 
-    def validate_slot_usage(self, obj):
+    def validate_slot_usage(self, obj, source_location=None):
         """
         Check if obj can fit in equipment, based on its size.
 
+        Args:
+            obj (Object): The object to check.
+            source_location (Object, optional): Where the object is coming from. If
+                that's a container we carry, the object is already counted.
+
         """
         if not inherits_from(obj, ObjectParent):
             # in case we mix with non-evadventure objects
             raise EquipmentError(f"{obj.key} is not something that can be equipped.")
 
         size = obj.size
+        if source_location and self.is_carrying(source_location):
+            # taken out of our own bag - its slots are already used
+            size -= get_footprint(obj)
         max_slots = self.max_slots
         current_slot_usage = self.count_slots()
         return current_slot_usage + size <= max_slots
 
-    def add(self, obj):
+    def is_carrying(self, obj):
         """
-        Put something in the backpack.
+        Check if `obj` is carried by us, directly or inside a container.
+
+        """
+        location = obj.location
+        while location:
+            if location == self.obj:
+                return True
+            location = location.location
+        return False
+
+    def add(self, *objs):
         """
-        if self.validate_slot_usage(obj):
-            self.slots[WieldLocation.BACKPACK].append(obj)
+        Put something in the backpack. Several objects can be added at once, in which
+        case the equipment is only saved once. Objects that don't fit are skipped.
+        """
+        added = False
+        for obj in objs:
+            if self.validate_slot_usage(obj):
+                self.slots[WieldLocation.BACKPACK].append(obj)
+                self._track(obj)
+                added = True
+        if added:
             self._save()
 
     def remove(self, obj_or_slot):
@@ -120,7 +476,10 @@ class EquipmentHandler:
                 ret.append(obj_or_slot)
             except ValueError:
                 pass
+        ret = [obj for obj in ret if obj]
         if ret:
+            for obj in ret:
+                self._track(obj, -1)
             self._save()
         return ret
 
@@ -151,19 +510,33 @@ class EquipmentHandler:
             # it belongs in backpack, so goes back to it
             to_backpack = [obj]
         else:
-            # for others (body, head), just replace whatever's there
-            replaced = [obj]
+            # for others (body, head), replace whatever's there
+            to_backpack = [slots[use_slot]]
             slots[use_slot] = obj
 
         for to_backpack_obj in to_backpack:
             # put stuff in backpack
-            slots[use_slot].append(to_backpack_obj)
+            if to_backpack_obj:
+                slots[WieldLocation.BACKPACK].append(to_backpack_obj)
 
+        self._track(obj)
         # store new state
         self._save()
 
     @property
     def armor(self):
+        return self._get_cached("armor", self._calculate_armor)
+
+    @property
+    def weapon(self):
+        weapon = self._get_cached("weapon", self._calculate_weapon)
+        if not weapon.id:
+            # the cached weapon was deleted from under us
+            self.invalidate()
+            weapon = self._get_cached("weapon", self._calculate_weapon)
+        return weapon
+
+    def _calculate_armor(self):
         slots = self.slots
         return sum(
             (
@@ -177,8 +550,7 @@ class EquipmentHandler:
             )
         )
 
-    @property
-    def weapon(self):
+    def _calculate_weapon(self):
         # first checks two-handed wield, then one-handed; the two
         # should never appear simultaneously anyhow (checked in `move` method).
         slots = self.slots
@@ -199,6 +571,12 @@ class EquipmentHandler:
 
         """
         slots = self.slots
+        objs = [slots[slot] for slot in WieldLocation if slot is not WieldLocation.BACKPACK]
+        return self._get_rendered("loadout", objs, self._render_loadout)
+
+    def _render_loadout(self):
+        """Build the loadout string, see `display_loadout`"""
+        slots = self.slots
         weapon_str = "You are fighting with your bare fists"
         shield_str = " and have no shield."
         armor_str = "You wear no armor"
@@ -220,7 +598,7 @@ class EquipmentHandler:
         if armor:
             armor_str = f"You are wearing {armor}"
 
-        helmet = slots[WieldLocation.BODY]
+        helmet = slots[WieldLocation.HEAD]
         if helmet:
             helmet_str = f" and {helmet} on your head."
 
@@ -232,11 +610,22 @@ class EquipmentHandler:
 
         """
         backpack = self.slots[WieldLocation.BACKPACK]
+        return self._get_rendered("backpack", backpack, self._render_backpack)
+
+    def _render_backpack(self):
+        """Build the backpack string, see `display_backpack`"""
+        backpack = self.slots[WieldLocation.BACKPACK]
         if not backpack:
             return "Backpack is empty."
         out = []
         for item in backpack:
-            out.append(f"{item.key} [|b{item.size}|n] slot(s)")
+            if is_container(item):
+                out.append(
+                    f"{item.key} [|b{item.size}|n] slot(s), holding "
+                    f"|b{item.storage.used_slots}/{item.capacity}|n"
+                )
+            else:
+                out.append(f"{item.key} [|b{item.size}|n] slot(s)")
         return "\n".join(out)
 
     def display_slot_usage(self):
@@ -249,25 +638,34 @@ class EquipmentHandler:
         """
         return f"|b{self.count_slots()}/{self.max_slots}|n"
 
+    def _get_backpack_objects_by_category(self, category):
+        """
+        Get backpack items of a given category, using the inventory index.
+
+        Args:
+            category (str): One of "usable", "wieldable" or "wearable".
+
+        Returns:
+            list: The matching objects, in backpack order.
+
+        """
+        dbids = self.slots.get_dbrefs(WieldLocation.BACKPACK)
+        self.index.sync(dbids)
+        matches = self.index.get(category)
+        return _resolve_dbrefs([dbid for dbid in dbids if dbid in matches])
+
     def get_wieldable_objects_from_backpack(self):
         """
         Get all wieldable weapons (or spell runes) from backpack. This is useful in order to
         have a list to select from when swapping your wielded loadout.
 
         Returns:
-            list: A list of objects with a suitable `inventory_use_slot`. We don't check
+            list: A list of objects tagged as weapons, shields or magic. We don't check
             quality, so this may include broken items (we may want to visually show them
             in the list after all).
 
         """
-        return [
-            obj
-            for obj in self.slots[WieldLocation.BACKPACK]
-            if obj
-            and obj.id
-            and obj.inventory_use_slot
-            in (WieldLocation.MAIN_HAND, WieldLocation.TWO_HANDS, WieldLocation.OFF_HAND)
-        ]
+        return self._get_backpack_objects_by_category("wieldable")
 
     def get_wearable_objects_from_backpack(self):
         """
@@ -275,30 +673,24 @@ class EquipmentHandler:
         have a list to select from when swapping your worn loadout.
 
         Returns:
-            list: A list of objects with a suitable `inventory_use_slot`. We don't check
+            list: A list of objects tagged as armor or helmets. We don't check
             quality, so this may include broken items (we may want to visually show them
             in the list after all).
 
         """
-        return [
-            obj
-            for obj in self.slots[WieldLocation.BACKPACK]
-            if obj and obj.id and obj.inventory_use_slot in (WieldLocation.BODY, WieldLocation.HEAD)
-        ]
+        return self._get_backpack_objects_by_category("wearable")
 
     def get_usable_objects_from_backpack(self):
         """
         Get all 'usable' items (like potions) from backpack. This is useful for getting a
-        list to select from.
+        list to select from. Whether the item can actually be used right now is checked
+        by its `at_pre_use` when it is used.
 
         Returns:
-            list: A list of objects that are usable.
+            list: A list of objects tagged as consumables or magic.
 
         """
-        character = self.obj
-        return [
-            obj for obj in self.slots[WieldLocation.BACKPACK] if obj and obj.at_pre_use(character)
-        ]
+        return self._get_backpack_objects_by_category("usable")
 
     def all(self):
         """
@@ -9,7 +9,9 @@ for allowing Characters to traverse the exit to its destination.
 
 from evennia.objects.objects import DefaultExit
 
+from .instancing import CopyOnWriteMixin
 from .objects import ObjectParent
+from .worldgraph import WORLD_GRAPH
 
 
 class Exit(ObjectParent, DefaultExit):
@@ -36,6 +38,33 @@ class Exit(ObjectParent, DefaultExit):
         at_failed_traverse(traveller) - called by at_traverse if traversal failed for some reason. Will
                                         not be called if the attribute `err_traverse` is
                                         defined, in which case that will simply be echoed.
+
+    The world graph (see typeclasses/worldgraph.py) is kept up to date with every exit's
+    location, destination and key, using the `at_db_*_postsave` hooks called by Evennia
+    whenever one of those is saved (including on creation).
     """
 
-    pass
+    def at_db_location_postsave(self, new):
+        super().at_db_location_postsave(new)
+        WORLD_GRAPH.update_exit(self)
+
+    def at_db_destination_postsave(self, new):
+        WORLD_GRAPH.update_exit(self)
+
+    def at_db_key_postsave(self, new):
+        WORLD_GRAPH.update_exit(self)
+
+    def at_object_delete(self):
+        if not super().at_object_delete():
+            return False
+        WORLD_GRAPH.remove_exit(self)
+        return True
+
+
+class InstanceExit(CopyOnWriteMixin, Exit):
+    """
+    An exit of a dungeon instance, created by `INSTANCES.create_instance` (see
+    typeclasses/instancing.py). It reads the Attributes it doesn't have itself from its
+    template exit.
+
+    """
@@ -0,0 +1,187 @@
+"""
+Health
+
+The `HealthHandler` keeps the current HP of a living thing (Character or NPC) in
+memory. Changes are written to the database a few seconds later (so a flurry of
+hits in combat only means one write) and always when the character logs out or the
+server reloads or shuts down.
+
+Anyone interested in health changes can `subscribe` to be told about them, instead
+of polling `.hp`. The callback is called as
+
+    callback(obj, event, amount, **kwargs)
+
+where `event` is one of "damage", "heal" or "defeated" ("defeated" is sent whenever
+HP goes down to 0, after the "damage" event if it was caused by damage). Subscriptions are not persistent - a
+combathandler re-subscribes its combatants when it's started after a reload.
+
+The handler also tells the regeneration service (see `typeclasses/regeneration.py`)
+about HP changes, so it knows who is wounded.
+
+HP is stored in the `hp` Attribute, or in the packed stats block for characters having
+one (see `typeclasses/stats.py`). It must not be changed directly while the handler is
+in use (set `.hp` instead), since the handler would not know about it.
+
+"""
+
+from evennia.utils import logger
+from evennia.utils.utils import delay
+
+from .regeneration import REGENERATION
+
+
+class HealthHandler:
+    """
+    Tracks the HP of a living thing, persisting it lazily.
+
+    """
+
+    save_attribute = "hp"
+    # seconds to wait after a change before writing to the database
+    save_delay = 5
+
+    def __init__(self, obj):
+        # here obj is the living thing we store the handler on
+        self.obj = obj
+        self._subscribers = []
+        self._save_task = None
+        self._dirty = False
+        self._hp = self._read()
+        if self._hp is None:
+            # never set - start at full health
+            self._hp = obj.hp_max
+        REGENERATION.update(obj, self._hp, obj.hp_max)
+
+    def _stats(self):
+        """The packed stats block of the object, if it has one (see typeclasses/stats.py)"""
+        stats = getattr(self.obj, "stats", None)
+        return stats if stats and stats.packed else None
+
+    def _read(self):
+        stats = self._stats()
+        if stats:
+            return stats.get(self.save_attribute)
+        return self.obj.attributes.get(self.save_attribute)
+
+    @property
+    def hp(self):
+        return self._hp
+
+    @property
+    def is_defeated(self):
+        return self._hp <= 0
+
+    def set(self, hp, save=True):
+        """
+        Set HP directly. No "damage" or "heal" event is sent, but "defeated" is if this
+        takes HP down to 0.
+
+        Args:
+            hp (int): The new HP.
+            save (bool): Save a short while later. If `False`, the change is only saved
+                by an explicit `.save()` (or on logout, reload or shutdown).
+
+        """
+        old_hp = self._hp
+        self._set(hp, save=save)
+        if old_hp > 0 and self._hp <= 0:
+            self._notify("defeated", old_hp - self._hp)
+
+    def _set(self, hp, save=True):
+        """Change HP without sending any events"""
+        if hp != self._hp:
+            self._hp = hp
+            if save:
+                self._schedule_save()
+            else:
+                self._dirty = True
+            REGENERATION.update(self.obj, hp, self.obj.hp_max)
+
+    def damage(self, amount, **kwargs):
+        """
+        Take damage.
+
+        Args:
+            amount (int): How much HP to lose.
+            **kwargs: Passed on to subscribers, like `attacker`.
+
+        Returns:
+            int: The new HP.
+
+        """
+        was_standing = self._hp > 0
+        self._set(self._hp - amount)
+        self._notify("damage", amount, **kwargs)
+        if was_standing and self._hp <= 0:
+            self._notify("defeated", amount, **kwargs)
+        return self._hp
+
+    def heal(self, amount, save=True, **kwargs):
+        """
+        Heal, not allowing to exceed max HP.
+
+        Args:
+            amount (int): How much HP to gain at most.
+            save (bool): See `set`.
+            **kwargs: Passed on to subscribers.
+
+        Returns:
+            int: How much was actually healed.
+
+        """
+        healed = max(0, min(self.obj.hp_max - self._hp, amount))
+        if healed:
+            self._set(self._hp + healed, save=save)
+            self._notify("heal", healed, **kwargs)
+        return healed
+
+    def subscribe(self, callback):
+        """
+        Get told about health changes.
+
+        Args:
+            callback (callable): Called as `callback(obj, event, amount, **kwargs)`.
+
+        """
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        """Stop getting told about health changes"""
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def _notify(self, event, amount, **kwargs):
+        for callback in list(self._subscribers):
+            try:
+                callback(self.obj, event, amount, **kwargs)
+            except Exception:
+                # a broken subscriber should not stop the others
+                logger.log_trace(f"Error in health subscriber {callback} for {self.obj}.")
+
+    def _schedule_save(self):
+        self._dirty = True
+        if not self._save_task:
+            self._save_task = delay(self.save_delay, self._delayed_save)
+
+    def _delayed_save(self):
+        self._save_task = None
+        self.save()
+
+    def save(self):
+        """
+        Write HP to the database now, if it changed. Called automatically a short while
+        after changes, and on logout, reload and shutdown.
+
+        """
+        if self._save_task:
+            if self._save_task.active():
+                self._save_task.cancel()
+            self._save_task = None
+        if self._dirty and self.obj.id:
+            stats = self._stats()
+            if stats:
+                stats.set(self.save_attribute, self._hp)
+            else:
+                self.obj.attributes.add(self.save_attribute, self._hp)
+        self._dirty = False
@@ -0,0 +1,297 @@
+"""
+Instancing
+
+Dungeons can be instanced: every party going in gets its own copy of the rooms, so
+parties don't run into each other's fights and loot.
+
+A dungeon template is a cluster of ordinary rooms (built like any other area), all
+tagged with the name of the dungeon in the `instance_template` Tag category:
+
+    room.tags.add("crypt", category="instance_template")
+
+`INSTANCES.create_instance("crypt")` then stamps out a copy, with batched INSERTs:
+
+- a bare row for each room (an `InstanceRoom`) and for each exit out of those
+  rooms (an `InstanceExit`, with its destination moved to the copy of the room it
+  led to, if it's part of the template). Exit aliases are linked, not copied.
+- no Attributes at all. The copies are linked to their template object by a Tag
+  shared by all copies of it, and read any Attribute they don't have themselves (like
+  `desc`) from the template - copy-on-write. Only what gets changed in an instance
+  is stored for it.
+- no contents. The items of the template rooms are shown in the copies as scenery
+  (they can be looked at in the room, but not picked up or searched for). Anything
+  to fight or pick up should be spawned into the instance after creating it.
+
+All objects of an instance share a Tag in the `instance` category, with the key of
+the instance. `InstanceScript` (set up in `settings.GLOBAL_SCRIPTS`) deletes
+instances that have had no characters in them for `IDLE_TIMEOUT` seconds, along with
+anything left inside them.
+
+"""
+
+import time
+from uuid import uuid4
+
+from django.db import transaction
+from evennia.objects.models import ObjectDB
+from evennia.typeclasses.tags import Tag
+from evennia.utils.utils import lazy_property
+
+from .objects import CompleteCacheAttributeBackend, VersionedAttributeHandler
+from .scripts import Script
+from .worldgraph import WORLD_GRAPH
+
+TEMPLATE_TAG_CATEGORY = "instance_template"
+TEMPLATE_OF_TAG_CATEGORY = "instance_of"
+INSTANCE_TAG_CATEGORY = "instance"
+INSTANCE_ROOM_TYPECLASS = "typeclasses.rooms.InstanceRoom"
+INSTANCE_EXIT_TYPECLASS = "typeclasses.exits.InstanceExit"
+# seconds an instance may stay empty before it's deleted
+IDLE_TIMEOUT = 30 * 60
+# seconds between checks for idle instances
+CLEANUP_INTERVAL = 5 * 60
+
+
+class CopyOnWriteAttributeHandler(VersionedAttributeHandler):
+    """
+    An AttributeHandler reading the Attributes the object doesn't have from its
+    template object (`obj.template`). Adding an Attribute adds it to the object
+    itself, and removing it from the object reverts to the template's.
+
+    """
+
+    def get(self, key=None, default=None, category=None, **kwargs):
+        template = self.obj.template
+        if template is None or not isinstance(key, str) or self.has(key, category=category):
+            return super().get(key=key, default=default, category=category, **kwargs)
+        return template.attributes.get(key=key, default=default, category=category, **kwargs)
+
+
+class CopyOnWriteMixin:
+    """
+    Mixin for typeclasses of instance copies, making them share the Attributes of
+    their template (see `CopyOnWriteAttributeHandler`).
+
+    """
+
+    @lazy_property
+    def attributes(self):
+        return CopyOnWriteAttributeHandler(self, CompleteCacheAttributeBackend)
+
+    @lazy_property
+    def template(self):
+        """The template object this is a copy of"""
+        template_id = self.tags.get(category=TEMPLATE_OF_TAG_CATEGORY)
+        return ObjectDB.objects.filter(id=int(template_id)).first() if template_id else None
+
+    @property
+    def instance_key(self):
+        """The key of the instance this is part of"""
+        return self.tags.get(category=INSTANCE_TAG_CATEGORY)
+
+    @property
+    def appearance_version(self):
+        template = self.template
+        return (self.attributes.version, template.appearance_version if template else None)
+
+
+def _get_tags(keys, category):
+    """Get (creating if needed) the Tags with some keys in a category, as `{key: tag_id}`"""
+    tags = dict(
+        Tag.objects.filter(
+            db_key__in=keys, db_category=category, db_tagtype=None, db_model="objectdb"
+        ).values_list("db_key", "id")
+    )
+    missing = [key for key in keys if key not in tags]
+    if missing:
+        Tag.objects.bulk_create(
+            [
+                Tag(db_key=key, db_category=category, db_tagtype=None, db_model="objectdb")
+                for key in missing
+            ]
+        )
+        return _get_tags(keys, category)
+    return tags
+
+
+class InstanceManager:
+    """
+    Creates and deletes instances, and keeps track of when they were last used.
+
+    """
+
+    def __init__(self):
+        # {instance_key: time last seen with characters in it}
+        self.last_active = {}
+
+    def create_instance(self, template_key):
+        """
+        Create a new instance of a dungeon template.
+
+        Args:
+            template_key (str): The key of the template (the `instance_template` Tag
+                of its rooms).
+
+        Returns:
+            list: The rooms of the new instance, in the order of the ids of their
+                template rooms - so the first one is the copy of the template room
+                built first, which is where the instance is entered.
+
+        Raises:
+            KeyError: If there is no such template.
+
+        """
+        template_rooms = list(
+            ObjectDB.objects.get_by_tag(key=template_key, category=TEMPLATE_TAG_CATEGORY)
+            .filter(db_location__isnull=True)
+            .order_by("id")
+        )
+        if not template_rooms:
+            raise KeyError(f"No instance template {template_key}.")
+        template_exits = list(
+            ObjectDB.objects.filter(
+                db_location__in=template_rooms, db_destination__isnull=False
+            ).order_by("id")
+        )
+        instance_key = f"{template_key}-{uuid4().hex[:8]}"
+
+        with transaction.atomic():
+            rooms = ObjectDB.objects.bulk_create(
+                [
+                    ObjectDB(
+                        db_key=room.db_key,
+                        db_typeclass_path=INSTANCE_ROOM_TYPECLASS,
+                        db_lock_storage=room.db_lock_storage,
+                        db_cmdset_storage=room.db_cmdset_storage,
+                    )
+                    for room in template_rooms
+                ]
+            )
+            room_ids = {room.id: copy.pk for room, copy in zip(template_rooms, rooms)}
+            exits = ObjectDB.objects.bulk_create(
+                [
+                    ObjectDB(
+                        db_key=exit.db_key,
+                        db_typeclass_path=INSTANCE_EXIT_TYPECLASS,
+                        db_location_id=room_ids[exit.db_location_id],
+                        # exits leading out of the template still lead there
+                        db_destination_id=room_ids.get(
+                            exit.db_destination_id, exit.db_destination_id
+                        ),
+                        db_lock_storage=exit.db_lock_storage,
+                        db_cmdset_storage=exit.db_cmdset_storage,
+                    )
+                    for exit in template_exits
+                ]
+            )
+            copies = list(zip(template_rooms, rooms)) + list(zip(template_exits, exits))
+
+            TagLink = ObjectDB.db_tags.through
+            instance_tag_id = _get_tags([instance_key], INSTANCE_TAG_CATEGORY)[instance_key]
+            template_tag_ids = _get_tags(
+                [str(template.id) for template, _ in copies], TEMPLATE_OF_TAG_CATEGORY
+            )
+            alias_links = TagLink.objects.filter(
+                objectdb_id__in=[exit.id for exit in template_exits], tag__db_tagtype="alias"
+            ).values_list("objectdb_id", "tag_id")
+            exit_ids = {exit.id: copy.pk for exit, copy in zip(template_exits, exits)}
+            TagLink.objects.bulk_create(
+                [TagLink(objectdb_id=copy.pk, tag_id=instance_tag_id) for _, copy in copies]
+                + [
+                    TagLink(objectdb_id=copy.pk, tag_id=template_tag_ids[str(template.id)])
+                    for template, copy in copies
+                ]
+                + [
+                    TagLink(objectdb_id=exit_ids[exit_id], tag_id=tag_id)
+                    for exit_id, tag_id in alias_links
+                ]
+            )
+
+        # load the copies in one query, putting them in the idmapper cache
+        objs_by_id = {
+            obj.id: obj for obj in ObjectDB.objects.filter(id__in=[copy.pk for _, copy in copies])
+        }
+        for exit in exits:
+            WORLD_GRAPH.update_exit(objs_by_id[exit.pk])
+        self.last_active[instance_key] = time.time()
+        return [objs_by_id[room.pk] for room in rooms]
+
+    def get_instance_keys(self):
+        """Get the keys of all instances"""
+        return list(
+            Tag.objects.filter(
+                db_category=INSTANCE_TAG_CATEGORY, db_tagtype=None, db_model="objectdb"
+            ).values_list("db_key", flat=True)
+        )
+
+    def get_rooms(self, instance_key):
+        """Get the rooms of an instance"""
+        return list(
+            ObjectDB.objects.get_by_tag(key=instance_key, category=INSTANCE_TAG_CATEGORY).filter(
+                db_location__isnull=True
+            )
+        )
+
+    def delete_instance(self, instance_key):
+        """
+        Delete an instance and everything in it. Characters still inside are sent home.
+
+        """
+        objs = list(
+            ObjectDB.objects.get_by_tag(key=instance_key, category=INSTANCE_TAG_CATEGORY)
+        )
+        for room in objs:
+            if room.location:
+                continue
+            for obj in room.contents:
+                if obj in objs:
+                    continue
+                if obj.has_account or getattr(obj, "is_pc", False):
+                    obj.move_to(obj.home, quiet=True, move_type="teleport")
+                else:
+                    obj.delete()
+        # exits first, so the rooms are empty
+        for obj in sorted(objs, key=lambda obj: obj.location is None):
+            obj.delete()
+        Tag.objects.filter(
+            db_key=instance_key, db_category=INSTANCE_TAG_CATEGORY, db_model="objectdb"
+        ).delete()
+        self.last_active.pop(instance_key, None)
+
+    def cleanup(self):
+        """
+        Delete the instances that have been empty for `IDLE_TIMEOUT` seconds.
+
+        Returns:
+            list: The keys of the deleted instances.
+
+        """
+        now = time.time()
+        deleted = []
+        for instance_key in self.get_instance_keys():
+            if any(room.content_index.characters for room in self.get_rooms(instance_key)):
+                self.last_active[instance_key] = now
+            elif now - self.last_active.setdefault(instance_key, now) >= IDLE_TIMEOUT:
+                # (after a reload, the idle time is counted from the first check)
+                self.delete_instance(instance_key)
+                deleted.append(instance_key)
+        return deleted
+
+
+INSTANCES = InstanceManager()
+
+
+class InstanceScript(Script):
+    """
+    Global script deleting idle instances. Set up in `settings.GLOBAL_SCRIPTS`.
+
+    """
+
+    def at_script_creation(self):
+        self.key = "instance_cleanup"
+        self.desc = "Deletes idle dungeon instances"
+        self.interval = CLEANUP_INTERVAL
+        self.persistent = True
+
+    def at_repeat(self):
+        INSTANCES.cleanup()
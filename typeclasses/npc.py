@@ -1,26 +1,53 @@
+from random import choice, random
+
 from evennia import DefaultCharacter, AttributeProperty, create_object
-from .objects import _BARE_HANDS
+from evennia.utils import lazy_property
+from .objects import ObjectParent, get_bare_hands
+from .behavior import BEHAVIOR_INTERVAL
 from .characters import LivingMixin
+from .combat_turnbased import _get_combathandler
 from .enums import Ability
+from .worldgraph import WORLD_GRAPH
+from .npc_templates import NPC_TEMPLATE_TAG_CATEGORY, TemplateProperty, get_npc_template
+
 
+class NPC(LivingMixin, ObjectParent, DefaultCharacter):
+    """
+    Base class for NPCs. The stats come from the NPC's template, if it has one (see
+    typeclasses/npc_templates.py), otherwise from its own Attributes.
 
-class NPC(LivingMixin, DefaultCharacter):
-    """Base class for NPCs"""
+    """
 
     is_pc = False
-    hit_dice = AttributeProperty(default=1, autocreate=False)
-    armor = AttributeProperty(default=1, autocreate=False)  # +10 to get armor defense
-    hp_multiplier = AttributeProperty(default=4, autocreate=False)  # 4 default in Knave
-    hp = AttributeProperty(default=None, autocreate=False)  # internal tracking, use .hp property
-    morale = AttributeProperty(default=9, autocreate=False)
-    allegiance = AttributeProperty(default=Ability.ALLEGIANCE_HOSTILE, autocreate=False)
+    hit_dice = TemplateProperty(default=1)
+    armor = TemplateProperty(default=1)  # +10 to get armor defense
+    hp_multiplier = TemplateProperty(default=4)  # 4 default in Knave
+    morale = TemplateProperty(default=9)
+    allegiance = TemplateProperty(default=Ability.ALLEGIANCE_HOSTILE)
 
-    weapon = AttributeProperty(default=_BARE_HANDS, autocreate=False)  # instead of inventory
-    coins = AttributeProperty(default=1, autocreate=False)  # coin loot
+    weapon = TemplateProperty(default=get_bare_hands)  # instead of inventory
+    coins = TemplateProperty(default=1)  # coin loot
 
     is_idle = AttributeProperty(default=False, autocreate=False)
 
 
+    @lazy_property
+    def template(self):
+        """The shared template this NPC's stats come from, or None"""
+        return get_npc_template(self.tags.get(category=NPC_TEMPLATE_TAG_CATEGORY))
+
+
+    def set_template(self, template_key):
+        """
+        Make this NPC use another template (or none, if `template_key` is `None`).
+
+        """
+        self.tags.clear(category=NPC_TEMPLATE_TAG_CATEGORY)
+        if template_key:
+            self.tags.add(template_key.lower(), category=NPC_TEMPLATE_TAG_CATEGORY)
+        self.__dict__.pop("template", None)
+
+
     @property
     def strength(self):
         return self.hit_dice
@@ -58,16 +85,164 @@ class NPC(LivingMixin, DefaultCharacter):
 
     def at_object_creation(self):
         """
-        Start with max health.
+        We start with max health (see the health handler).
 
         """
-        self.hp = self.hp_max
         self.tags.add("npcs", category="group")
 
 
+    def at_object_post_creation(self):
+        """
+        The Tags given on creation (like the template) are only added after
+        `at_object_creation`, so drop anything looked up before that.
+
+        """
+        super().at_object_post_creation()
+        for handler_name in ("template", "health"):
+            self.__dict__.pop(handler_name, None)
+
+
+    def at_server_reload(self):
+        super().at_server_reload()
+        self.save_health()
+
+
+    def at_server_shutdown(self):
+        super().at_server_shutdown()
+        self.save_health()
+
+
 class Mob(NPC):
     """
     Mob(ile) NPC to be used for enemies.
 
+    While there are players nearby, the behavior scheduler (see typeclasses/behavior.py)
+    calls `at_behavior_tick` regularly. This steps a simple state machine: each state
+    has a `behavior_<state>` method doing its thing and returning the next state.
+
+    - idle: look around and decide what to do next.
+    - wander: walk off through a random exit.
+    - aggro: attack a player character, if combat is allowed here.
+    - flee: escape combat (or the room) when badly hurt.
+
+    Idle mobs (`is_idle`) don't do anything.
+
     """
 
+    # chance per tick of wandering off when there is nothing else to do
+    wander_chance = AttributeProperty(default=0.1, autocreate=False)
+    # flee when HP falls to this fraction of max HP
+    flee_threshold = 0.25
+
+
+    @property
+    def behavior_state(self):
+        return self.ndb.behavior_state or "idle"
+
+
+    def at_behavior_tick(self):
+        """Called by the behavior scheduler while players are nearby"""
+        if self.is_idle or self.hp <= 0 or not self.location:
+            return
+        state = getattr(self, f"behavior_{self.behavior_state}")
+        self.ndb.behavior_state = state() or "idle"
+
+
+    def at_behavior_catch_up(self, elapsed):
+        """
+        Called when our room becomes active again after being frozen for `elapsed`
+        seconds. Rather than replaying every tick we missed, we just may have wandered
+        off in the meantime.
+
+        """
+        self.ndb.behavior_state = "idle"
+        missed_ticks = min(int(elapsed // BEHAVIOR_INTERVAL), 100)
+        if self.is_idle or not missed_ticks:
+            return
+        if random() < 1 - (1 - self.wander_chance) ** missed_ticks:
+            self._wander(quiet=True)
+
+
+    def _get_combathandler(self):
+        """The combat we are in, if any"""
+        combathandler = self.location.ndb.combathandler
+        if combathandler and combathandler.id and self in combathandler.combatants:
+            return combathandler
+
+
+    def _get_targets(self):
+        """The player characters we could attack"""
+        return [
+            obj for obj in self.location.contents
+            if getattr(obj, "is_pc", False) and obj.hp > 0
+        ]
+
+
+    def _wander(self, quiet=False):
+        """Move through a random exit. Returns if we moved."""
+        exits = [
+            exi for exi in self.location.exits
+            if exi.destination and exi.access(self, "traverse")
+        ]
+        if exits:
+            return self.move_to(choice(exits).destination, quiet=quiet, move_type="traverse")
+        return False
+
+
+    def move_towards(self, destination, quiet=False):
+        """
+        Take one step along the shortest way to `destination` (a room). Returns if we
+        moved.
+
+        """
+        exit_id = WORLD_GRAPH.next_exit(self.location, destination)
+        for exi in self.location.exits:
+            if exi.id == exit_id and exi.access(self, "traverse"):
+                return self.move_to(exi.destination, quiet=quiet, move_type="traverse")
+        return False
+
+
+    def behavior_idle(self):
+        if self.hp <= self.hp_max * self.flee_threshold and self._get_targets():
+            return "flee"
+        if (
+            self.allegiance == Ability.ALLEGIANCE_HOSTILE
+            and self.location.allow_combat
+            and self._get_targets()
+        ):
+            return "aggro"
+        if random() < self.wander_chance:
+            return "wander"
+        return "idle"
+
+
+    def behavior_wander(self):
+        self._wander()
+        return "idle"
+
+
+    def behavior_aggro(self):
+        if self._get_combathandler():
+            # already fighting - keep at it unless it's time to run
+            return "flee" if self.hp <= self.hp_max * self.flee_threshold else "aggro"
+        targets = self._get_targets()
+        if not targets or not self.location.allow_combat:
+            return "idle"
+        target = choice(targets)
+        combathandler = _get_combathandler(self)
+        combathandler.add_combatant(self)
+        combathandler.queue_action(self, {"key": "attack", "target": target, "repeat": True})
+        combathandler.add_combatant(target)
+        target.msg(f"|r{self.get_display_name(target)} attacks you!|n")
+        combathandler.start_combat()
+        return "aggro"
+
+
+    def behavior_flee(self):
+        combathandler = self._get_combathandler()
+        if combathandler:
+            combathandler.queue_action(self, {"key": "flee", "repeat": True})
+            return "flee"
+        self._wander()
+        return "idle"
+
@@ -0,0 +1,177 @@
+"""
+NPC templates
+
+Mobs of one kind (all goblin grunts, say) share everything but their HP, so storing
+`hit_dice`, `armor`, `morale` etc as Attributes on each of them is a waste - spawning
+5000 goblins would make 5000 copies of each.
+
+Instead, an NPC can reference a shared, immutable `NPCTemplate` by key (stored as a
+Tag, which is itself shared between all objects having it). Its `TemplateProperty`
+stats then come from the template, and only per-instance state (like HP once hurt,
+or the idle flag) is stored on the NPC itself. Setting a templated stat on one NPC
+stores it as an Attribute on that NPC only, overriding the template.
+
+Templates are dicts in the modules listed in `settings.NPC_TEMPLATE_MODULES`, keyed by
+their lowercased variable name (like module prototypes), or registered from code with
+`register_npc_template`.
+
+Mass spawning goes through the bulk spawner (see `typeclasses/spawner.py`), with
+`spawn_npcs` as a shortcut.
+
+"""
+
+from django.conf import settings
+from evennia import AttributeProperty
+from evennia.utils import logger
+from evennia.utils.utils import all_from_module, make_iter
+
+NPC_TEMPLATE_TAG_CATEGORY = "npc_template"
+
+# the stats a template can hold
+TEMPLATE_FIELDS = (
+    "hit_dice",
+    "armor",
+    "hp_multiplier",
+    "morale",
+    "allegiance",
+    "weapon",
+    "coins",
+)
+
+# {key: NPCTemplate}, loaded on first use
+_NPC_TEMPLATES = None
+
+
+class NPCTemplate:
+    """
+    The shared stats of one kind of NPC. Immutable, since all NPCs of the kind see the
+    same instance.
+
+    """
+
+    def __init__(self, key, **stats):
+        unknown = set(stats) - set(TEMPLATE_FIELDS)
+        if unknown:
+            raise KeyError(f"Unknown NPC template stat(s): {', '.join(sorted(unknown))}")
+        object.__setattr__(self, "key", key)
+        object.__setattr__(self, "_stats", dict(stats))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("NPC templates are immutable.")
+
+    def __contains__(self, name):
+        return name in self._stats
+
+    def get(self, name, default=None):
+        """Get a stat of the template, or `default` if the template doesn't set it"""
+        return self._stats.get(name, default)
+
+    def __repr__(self):
+        return f"<NPCTemplate {self.key}>"
+
+
+def _load_templates():
+    """Load all templates from `settings.NPC_TEMPLATE_MODULES`"""
+    templates = {}
+    for module in make_iter(getattr(settings, "NPC_TEMPLATE_MODULES", ())):
+        for name, stats in all_from_module(module).items():
+            if isinstance(stats, dict) and not name.startswith("_"):
+                try:
+                    templates[name.lower()] = NPCTemplate(name.lower(), **stats)
+                except KeyError:
+                    logger.log_trace(f"Invalid NPC template {name} in {module}.")
+    return templates
+
+
+def _templates():
+    global _NPC_TEMPLATES
+    if _NPC_TEMPLATES is None:
+        _NPC_TEMPLATES = _load_templates()
+    return _NPC_TEMPLATES
+
+
+def register_npc_template(key, **stats):
+    """
+    Add a template (or replace one) from code.
+
+    Args:
+        key (str): The template key.
+        **stats: Stats from `TEMPLATE_FIELDS`.
+
+    Returns:
+        NPCTemplate: The new template.
+
+    Raises:
+        KeyError: For unknown stats.
+
+    """
+    template = NPCTemplate(key.lower(), **stats)
+    _templates()[template.key] = template
+    return template
+
+
+def get_npc_template(key):
+    """
+    Get a template by key.
+
+    Returns:
+        NPCTemplate or None: The template, if it exists.
+
+    """
+    return _templates().get(key.lower()) if key else None
+
+
+class TemplateProperty(AttributeProperty):
+    """
+    An NPC stat read from the NPC's template, unless the NPC has an Attribute of its
+    own for it. Setting it always stores an Attribute on the NPC. Without a template
+    this works like a normal `AttributeProperty`.
+
+    """
+
+    def __init__(self, default=None, **kwargs):
+        kwargs.setdefault("autocreate", False)
+        super().__init__(default=default, **kwargs)
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        template = instance.template
+        if template is None or self._key not in template:
+            return super().__get__(instance, owner)
+        # an Attribute on the NPC overrides the template
+        attr = instance.attributes.get(self._key, category=self._category, return_obj=True)
+        if attr:
+            return self.at_get(attr.value, instance)
+        return template.get(self._key)
+
+
+def spawn_npcs(template_key, count, location=None, key=None, typeclass="typeclasses.npc.Mob"):
+    """
+    Spawn many NPCs using a template, in bulk.
+
+    Args:
+        template_key (str): The template to use.
+        count (int): How many to spawn.
+        location (Object, optional): Where to put them.
+        key (str, optional): The name of the NPCs. Defaults to the template key.
+        typeclass (str, optional): The NPC typeclass.
+
+    Returns:
+        list: The new NPCs.
+
+    Raises:
+        KeyError: If there is no such template.
+
+    """
+    from .spawner import bulk_spawn
+
+    template = get_npc_template(template_key)
+    if not template:
+        raise KeyError(f"No NPC template {template_key}.")
+    prototype = {
+        "typeclass": typeclass,
+        "key": key or template.key,
+        "tags": [(template.key, NPC_TEMPLATE_TAG_CATEGORY)],
+    }
+    return bulk_spawn([(prototype, count)], location=location)
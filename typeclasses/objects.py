@@ -11,16 +11,176 @@ inheritance.
 
 """
 
+from itertools import count
+
 from evennia.objects.objects import DefaultObject
-from evennia import AttributeProperty, search_object, create_object
-from evennia.utils.utils import make_iter
+from evennia import AttributeProperty
+from evennia.typeclasses.attributes import AttributeHandler, ModelAttributeBackend, NickHandler
+from evennia.typeclasses.tags import AliasHandler, PermissionHandler, TagHandler
+from evennia.utils.utils import lazy_property, make_iter, to_str
 
 from . import rules
 from .rules import damage_engine
 from .utils import get_obj_stats
 from .enums import WieldLocation, ObjType, Ability
+from .contentindex import notify_renamed
+from .recycling import CONSUMABLE_POOL
+from .singletons import SINGLETONS
+
+
+class EquipmentAttributeProperty(AttributeProperty):
+    """
+    An AttributeProperty for stats that affect the derived stats of whoever is
+    carrying the object (like the `armor` of a worn helmet or the `size` of an item
+    in a bag). Changing it calls `at_carried_object_change` on the carrier, so it
+    can recompute its cached values.
+
+    """
+
+    def __set__(self, instance, value):
+        super().__set__(instance, value)
+        carrier = instance.location
+        hook = getattr(carrier, "at_carried_object_change", None) if carrier else None
+        if hook:
+            hook(instance)
+
+
+# shared by all objects, so a version number is never reused, not even when an object
+# is flushed from memory and loaded again
+_VERSIONS = count(1)
+
+
+class PrimableCacheMixin:
+    """
+    For Attribute backends and Tag handlers: lets their cache be filled from the
+    outside with entries loaded in bulk (see `typeclasses/prefetch.py`).
+
+    """
+
+    def prime(self, entries):
+        """
+        Replace the cache with a complete one, as if everything was loaded from here.
+
+        Args:
+            entries (list): All the Attributes or Tags of the object handled by this.
+
+        """
+        cache, catcache = {}, {}
+        for entry in entries:
+            category = entry.db_category.lower() if entry.db_category else None
+            cache[f"{to_str(entry.db_key).lower()}-{category}"] = entry
+            # every category we have is complete too
+            catcache[f"-{category}"] = True
+        self._cache = cache
+        self._catcache = catcache
+        self._cache_complete = True
+
+
+class CompleteCacheAttributeBackend(PrimableCacheMixin, ModelAttributeBackend):
+    """
+    An Attribute backend trusting its cache once it holds all Attributes of the object
+    (for example after a prefetch, see `typeclasses/prefetch.py`), so looking up an
+    Attribute the object doesn't have needs no query.
+
+    """
+
+    def _get_cache_key(self, key, category):
+        if self._cache_complete and "%s-%s" % (key, category) not in self._cache:
+            return []
+        return super()._get_cache_key(key, category)
+
+    def _set_cache(self, key, category, attr_obj):
+        # a complete cache stays complete when an Attribute is added or changed through it
+        complete = self._cache_complete
+        super()._set_cache(key, category, attr_obj)
+        if complete:
+            self._cache_complete = True
+            self._catcache["-%s" % category] = True
+
+    def _delete_cache(self, key, category):
+        # ... and when one is removed
+        complete = self._cache_complete
+        super()._delete_cache(key, category)
+        if complete:
+            self._cache_complete = True
+            self._catcache["-%s" % category] = True
+
+
+class VersionedAttributeHandler(AttributeHandler):
+    """
+    An AttributeHandler keeping a version number that changes whenever an Attribute
+    is added, changed or removed. Rendered descriptions are cached per version (see
+    `typeclasses/utils.py`), so they are only rebuilt when something changed.
+
+    """
+
+    def __init__(self, obj, backend_class):
+        super().__init__(obj, backend_class)
+        self.version = next(_VERSIONS)
+
+    def bump_version(self):
+        """Mark the object as changed"""
+        self.version = next(_VERSIONS)
+
+    def add(self, *args, **kwargs):
+        super().add(*args, **kwargs)
+        self.bump_version()
+
+    def batch_add(self, *args, **kwargs):
+        super().batch_add(*args, **kwargs)
+        self.bump_version()
+
+    def remove(self, *args, **kwargs):
+        super().remove(*args, **kwargs)
+        self.bump_version()
+
+    def clear(self, *args, **kwargs):
+        super().clear(*args, **kwargs)
+        self.bump_version()
+
+    def reset_cache(self):
+        super().reset_cache()
+        self.bump_version()
+
+
+class PrimableAliasHandler(PrimableCacheMixin, AliasHandler):
+    pass
+
+
+class PrimablePermissionHandler(PrimableCacheMixin, PermissionHandler):
+    pass
+
+
+class ObjTypeTagHandler(PrimableCacheMixin, TagHandler):
+    """
+    A TagHandler telling whoever is carrying the object when its `obj_type` Tags
+    change, through their `at_carried_object_change` hook, so the carrier's inventory
+    index (see `typeclasses/equipment.py`) sees the change.
+
+    """
+
+    def _notify(self, category):
+        if category is not None and category.strip().lower() != "obj_type":
+            return
+        carrier = self.obj.location
+        hook = getattr(carrier, "at_carried_object_change", None) if carrier else None
+        if hook:
+            hook(self.obj)
+
+    def add(self, key=None, category=None, data=None):
+        super().add(key=key, category=category, data=data)
+        if category is not None:
+            self._notify(category)
+
+    def remove(self, key=None, category=None):
+        super().remove(key=key, category=category)
+        if category is not None:
+            self._notify(category)
+
+    def clear(self, category=None):
+        super().clear(category=category)
+        self._notify(category)
 
-_BARE_HANDS = None
 
 class ObjectParent(DefaultObject):
     """
@@ -32,13 +192,43 @@ class ObjectParent(DefaultObject):
     take precedence.
 
     """
-    pass
+
+    @lazy_property
+    def attributes(self):
+        return VersionedAttributeHandler(self, CompleteCacheAttributeBackend)
+
+    @lazy_property
+    def nicks(self):
+        return NickHandler(self, CompleteCacheAttributeBackend)
+
+    @lazy_property
+    def tags(self):
+        return ObjTypeTagHandler(self)
+
+    @lazy_property
+    def aliases(self):
+        return PrimableAliasHandler(self)
+
+    @lazy_property
+    def permissions(self):
+        return PrimablePermissionHandler(self)
+
+    @property
+    def appearance_version(self):
+        """Changes whenever anything affecting how this object looks changes"""
+        return self.attributes.version
+
+    def at_rename(self, oldname, newname):
+        """The key is part of most descriptions"""
+        super().at_rename(oldname, newname)
+        self.attributes.bump_version()
+        notify_renamed(self)
 
 class Object(ObjectParent):
 
 
     inventory_use_slot = WieldLocation.BACKPACK
-    size = AttributeProperty(1, autocreate=False)
+    size = EquipmentAttributeProperty(1, autocreate=False)
     value = AttributeProperty(0, autocreate=False)
 
     # this can be either a single type or a list of types (for objects able to be
@@ -47,12 +237,17 @@ class Object(ObjectParent):
 
     # default evennia hooks
 
+    @classmethod
+    def get_creation_tags(cls):
+        """The Tags `at_object_creation` gives every object of this typeclass"""
+        return [(obj_type.value, "obj_type") for obj_type in make_iter(cls.obj_type)]
+
     def at_object_creation(self):
         """Called when this object is first created. We convert the .obj_type
         property to a database tag."""
 
-        for obj_type in make_iter(self.obj_type):
-            self.tags.add(self.obj_type.value, category="obj_type")
+        for key, category in self.get_creation_tags():
+            self.tags.add(key, category=category)
 
     def get_display_header(self, looker, **kwargs):
         """The top of the description"""
@@ -66,7 +261,7 @@ class Object(ObjectParent):
 
     def has_obj_type(self, objtype):
         """Check if object is of a certain type"""
-        return objtype.value in make_iter(self.obj_type)
+        return objtype in make_iter(self.obj_type)
 
     def at_pre_use(self, *args, **kwargs):
         """Called before use. If returning False, can't be used"""
@@ -266,11 +461,64 @@ class Consumable(Object, DefaultObject):
 
     def at_post_use(self, user, *args, **kwargs):
         """Called after using the item"""
-        # detract a usage, deleting the item if used up.
+        # detract a usage, recycling the item if used up.
         self.uses -= 1
         if self.uses <= 0:
             user.msg(f"{self.key} was used up.")
-            self.delete()
+            CONSUMABLE_POOL.recycle(self)
+
+
+class AttackResult:
+    """
+    The outcome of one attack with a weapon. This is built by `Weapon.use` and sent
+    to the room as a single message, but it's also returned so callers can pass it on,
+    for example to a combat log or to OOB clients (see `to_dict`).
+
+    """
+
+    def __init__(self, attacker, target, weapon, hit=False, crit=False, damage=0):
+        self.attacker = attacker
+        self.target = target
+        self.weapon = weapon
+        self.hit = hit
+        self.crit = crit
+        self.damage = damage
+
+    @property
+    def fragments(self):
+        """The parts of the attack message, using `$You()` markup"""
+        target_key = self.target.key
+        fragments = [f"$You() $conj(attack) $You({target_key}) with {self.weapon.key}."]
+        if not self.hit:
+            fragments.append(f"$You() $conj(miss) $You({target_key}).")
+        elif self.crit:
+            fragments.append(
+                f"$You() |ycritically|n $conj(hit) $You({target_key}) for |r{self.damage}|n damage!"
+            )
+        else:
+            fragments.append(f"$You() $conj(hit) $You({target_key}) for |r{self.damage}|n damage!")
+        return fragments
+
+    @property
+    def text(self):
+        return " ".join(self.fragments)
+
+    def emit(self, location):
+        """Send the result to everyone in `location`, as one message"""
+        location.msg_contents(
+            self.text, from_obj=self.attacker, mapping={self.target.key: self.target}
+        )
+
+    def to_dict(self):
+        """A machine-readable version of the result"""
+        return {
+            "attacker": self.attacker.key,
+            "target": self.target.key,
+            "weapon": self.weapon.key,
+            "hit": self.hit,
+            "crit": self.crit,
+            "damage": self.damage,
+        }
 
 
 class Weapon(Object, DefaultObject):
@@ -294,12 +542,25 @@ class Weapon(Object, DefaultObject):
         return super().at_pre_use(user, target=target, *args, **kwargs)
 
 
-    def use(self, attacker, target, *args, advantage=False, disadvantage=False, **kwargs):
-        """When a weapon is used, it attacks an opponent"""
+    def use(self, attacker, target, *args, advantage=False, disadvantage=False, msg=None,
+            **kwargs):
+        """
+        When a weapon is used, it attacks an opponent.
 
-        location = attacker.location
+        Args:
+            attacker (Object): The one attacking.
+            target (Object): The one being attacked.
+            advantage (bool): If the attacker has advantage.
+            disadvantage (bool): If the attacker has disadvantage.
+            msg (callable, optional): Called with the text of the result to send it,
+                instead of sending it to the room directly (for example to go through
+                the combathandler).
 
-        is_hit, quality, txt = rules.dice.opposed_saving_throw(
+        Returns:
+            AttackResult: The outcome of the attack.
+
+        """
+        is_hit, quality = rules.dice.opposed_saving_throw(
             attacker,
             target,
             attack_type=self.attack_type,
@@ -307,34 +568,24 @@ class Weapon(Object, DefaultObject):
             advantage=advantage,
             disadvantage=disadvantage,
         )
-
-        location.msg_contents(
-            f"$You() $conj(attack) $You({target.key}) with {self.key}: {txt}",
-            from_obj=attacker,
-            mapping={target.key: target},
-        )
+        result = AttackResult(attacker, target, self, hit=is_hit)
 
         if is_hit:
             # enemy hit, calculate damage
-            dmg = damage_engine.damage(self.damage_roll)
-
+            result.damage = damage_engine.damage(self.damage_roll)
             if quality is Ability.CRITICAL_SUCCESS:
                 # doble damage roll for critical success
-                dmg += damage_engine.damage(self.damage_roll)
-                message = (
-                    f" $You() |ycritically|n $conj(hit) $You({target.key}) for |r{dmg}|n damage!"
-                )
-            else:
-                message = f" $You() $conj(hit) $You({target.key}) for |r{dmg}|n damage!"
-
-            location.msg_contents(message, from_obj=attacker, mapping={target.key: target})
-            # call hook
-            target.at_damage(dmg, attacker=attacker)
+                result.crit = True
+                result.damage += damage_engine.damage(self.damage_roll)
 
+        if msg:
+            msg(result.text)
         else:
-            # a miss
-            message = f" $You() $conj(miss) $You({target.key})."
-            location.msg_contents(message, from_obj=attacker, mapping={target.key: target})
+            result.emit(attacker.location)
+        if is_hit:
+            # call hook
+            target.at_damage(result.damage, attacker=attacker)
+        return result
 
 
 class RuneStone(Consumable):
@@ -348,6 +599,9 @@ class RuneStone(Consumable):
 
     damage_roll = AttributeProperty("4-6", autocreate=False)
 
+    # what `uses` is reset to on rest (see typeclasses/rest.py)
+    max_uses = 1
+
     def at_post_use(self, user, *args, **kwargs):
         """Called after usage/spell was cast"""
         self.uses -= 1
@@ -356,14 +610,14 @@ class RuneStone(Consumable):
 
     def refresh(self):
         """Refresh the rune stone (normally after rest)"""
-        self.uses = 1
+        self.uses = self.max_uses
 
 
 class Armor(Object, DefaultObject):
     obj_type = ObjType.ARMOR
     inventory_use_slot = WieldLocation.BODY
 
-    armor = AttributeProperty(1, autocreate=False)
+    armor = EquipmentAttributeProperty(1, autocreate=False)
 
 
 class EvAdventureShield(Armor):
@@ -386,10 +640,5 @@ class WeaponBareHands(Weapon):
 
 
 def get_bare_hands():
-    """Get the bare hands"""
-    global _BARE_HANDS
-    if not _BARE_HANDS:
-        _BARE_HANDS = search_object("Bare hands", typeclass=WeaponBareHands).first()
-    if not _BARE_HANDS:
-        _BARE_HANDS = create_object(WeaponBareHands, key="Bare hands")
-    return _BARE_HANDS
+    """Get the bare hands (a shared singleton, loaded at server start)"""
+    return SINGLETONS.get("bare_hands")
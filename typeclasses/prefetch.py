@@ -0,0 +1,125 @@
+"""
+Prefetch
+
+Evennia loads the Attributes and Tags of an object lazily, one query at a time as
+they are first needed. Right after a character is puppeted, the first few commands
+touch dozens of them (stats, inventory, nicks, the items in the inventory and
+their stats) which is a burst of small queries.
+
+`prefetch` loads all Attributes (including nicks) and Tags (including aliases and
+permissions) of any number of objects in two queries and primes the handler caches
+with them, as if each handler had loaded everything itself (see `PrimableCacheMixin`
+in `typeclasses/objects.py`; objects not built on `ObjectParent` are skipped).
+`prefetch_character` does this for a character and everything in their inventory.
+It's called when a character is puppeted and, for recently active characters, at
+server start (see `settings.PREFETCH_RECENTLY_ACTIVE_DAYS`).
+
+"""
+
+import datetime
+from collections import defaultdict
+
+from django.conf import settings
+from evennia.objects.models import ObjectDB
+
+from .enums import WieldLocation
+from .objects import ObjectParent
+
+# the Attribute stamped on characters when puppeted, used to find recently active ones
+LAST_PUPPETED_ATTRIBUTE = ("last_puppeted", "activity")
+
+
+def prefetch(objs):
+    """
+    Load all Attributes and Tags of `objs` into their handler caches, in bulk.
+
+    Args:
+        objs (list): The objects to prefetch for.
+
+    """
+    if not getattr(settings, "TYPECLASS_AGGRESSIVE_CACHE", True):
+        # handlers don't cache anything, so there is nothing to fill
+        return
+    # only our own handlers can be primed
+    objs = {obj.id: obj for obj in objs if isinstance(obj, ObjectParent) and obj.id}
+    if not objs:
+        return
+
+    # {objid: {attrtype: [attr, ...]}}
+    attrs = defaultdict(lambda: defaultdict(list))
+    AttributeLink = ObjectDB.db_attributes.through
+    for link in AttributeLink.objects.filter(
+        objectdb_id__in=objs, attribute__db_model__iexact="objectdb"
+    ).select_related("attribute"):
+        attrs[link.objectdb_id][link.attribute.db_attrtype].append(link.attribute)
+
+    # {objid: {tagtype: [tag, ...]}}
+    tags = defaultdict(lambda: defaultdict(list))
+    TagLink = ObjectDB.db_tags.through
+    for link in TagLink.objects.filter(
+        objectdb_id__in=objs, tag__db_model="objectdb"
+    ).select_related("tag"):
+        tags[link.objectdb_id][link.tag.db_tagtype].append(link.tag)
+
+    for objid, obj in objs.items():
+        obj.attributes.backend.prime(attrs[objid][None])
+        obj.nicks.backend.prime(attrs[objid]["nick"])
+        obj.tags.prime(tags[objid][None])
+        obj.aliases.prime(tags[objid]["alias"])
+        obj.permissions.prime(tags[objid]["permission"])
+
+
+def prefetch_character(*characters):
+    """
+    Prefetch everything about one or more characters and their inventories.
+
+    Args:
+        *characters (Character): The characters to prefetch for.
+
+    """
+    prefetch(characters)
+    # the inventory is stored as dbrefs, which we can now read without a query
+    dbids = set()
+    for character in characters:
+        equipment = getattr(character, "equipment", None)
+        if equipment:
+            for slot in WieldLocation:
+                raw = equipment.slots.get_dbrefs(slot)
+                if raw:
+                    dbids.update(raw if slot is WieldLocation.BACKPACK else [raw])
+    if dbids:
+        # loading them puts them in the idmapper cache, where the equipment will look
+        prefetch(ObjectDB.objects.filter(id__in=dbids))
+
+
+def stamp_puppeted(character):
+    """Remember when `character` was last puppeted"""
+    key, category = LAST_PUPPETED_ATTRIBUTE
+    character.attributes.add(
+        key, datetime.datetime.now().isoformat(), category=category, strattr=True
+    )
+
+
+def prefetch_recently_active(days):
+    """
+    Prefetch all characters puppeted during the last `days` days. Called at server start.
+
+    Args:
+        days (int): How far back to look.
+
+    Returns:
+        int: The number of characters prefetched.
+
+    """
+    key, category = LAST_PUPPETED_ATTRIBUTE
+    cutoff = (datetime.datetime.now() - datetime.timedelta(days=days)).isoformat()
+    # the timestamp is stored as a string, which sorts in time order
+    characters = list(
+        ObjectDB.objects.filter(
+            db_attributes__db_key=key,
+            db_attributes__db_category=category,
+            db_attributes__db_strvalue__gte=cutoff,
+        )
+    )
+    prefetch_character(*characters)
+    return len(characters)
@@ -0,0 +1,323 @@
+"""
+Consumable recycling
+
+Consumables are the objects with the most churn in the game - every potion or ration
+is created, used once and deleted again, each time inserting and deleting the object
+row along with all its Attribute and Tag rows.
+
+Instead, a used-up consumable is `recycled`: it's moved off-grid (to a `None`
+location) and tagged as being in the pool. When `bulk_spawn` (see
+`typeclasses/spawner.py`) is asked for more of the same prototype, it takes objects
+from the pool and reinitializes them from the prototype, reusing their rows.
+
+Only objects spawned from a prototype (having a `from_prototype` Tag) can be recycled;
+anything else is just deleted. Each prototype's pool is capped at `MAX_POOLED`, and
+`ConsumablePoolScript` periodically trims pools that are not being drawn from.
+
+"""
+
+from collections import Counter
+
+from evennia import AttributeProperty
+from evennia.objects.models import ObjectDB
+from evennia.prototypes import prototypes as protlib
+from evennia.prototypes import spawner
+from evennia.prototypes.prototypes import PROTOTYPE_TAG_CATEGORY
+from evennia.typeclasses.attributes import Attribute
+from evennia.utils import logger
+from evennia.utils.dbserialize import to_pickle
+
+from .scripts import Script
+
+POOL_TAG = "recycled"
+POOL_TAG_CATEGORY = "pool"
+
+# max number of recycled objects kept per prototype; beyond this they are deleted
+MAX_POOLED = 100
+# the periodic cleanup trims each pool down to this
+KEEP_POOLED = 20
+
+
+def _get_autocreated_properties(typeclass):
+    """The AttributeProperties of a typeclass that are created along with the object"""
+    props = {}
+    for base in reversed(typeclass.__mro__):
+        for name, prop in vars(base).items():
+            if isinstance(prop, AttributeProperty):
+                props[name] = prop
+    return [
+        prop
+        for prop in props.values()
+        if prop._autocreate and not prop._strattr and prop.attrhandler_name == "attributes"
+    ]
+
+
+class ConsumablePool:
+    """
+    Keeps track of used-up objects waiting to be reused. The number of pooled
+    objects per prototype is kept in memory so we don't have to query the database
+    for prototypes without anything in the pool.
+
+    """
+
+    def __init__(self):
+        self._counts = None
+
+    @property
+    def counts(self):
+        """The number of pooled objects per prototype-key"""
+        if self._counts is None:
+            self.load()
+        return self._counts
+
+    def _pooled(self):
+        """All pooled objects, as a queryset"""
+        return ObjectDB.objects.filter(
+            db_tags__db_key=POOL_TAG, db_tags__db_category=POOL_TAG_CATEGORY
+        )
+
+    def load(self):
+        """
+        Count what's in the pool, using one query.
+
+        """
+        TagLink = ObjectDB.db_tags.through
+        self._counts = Counter(
+            TagLink.objects.filter(
+                objectdb_id__in=self._pooled().values("id"),
+                tag__db_category=PROTOTYPE_TAG_CATEGORY,
+            ).values_list("tag__db_key", flat=True)
+        )
+
+    def recycle(self, obj):
+        """
+        Put a used-up object in the pool, or delete it if it can't be reused.
+
+        Args:
+            obj (Object): The object to recycle.
+
+        Returns:
+            bool: If the object was pooled (`False` means it was deleted).
+
+        """
+        prototype_key = obj.tags.get(category=PROTOTYPE_TAG_CATEGORY)
+        if not prototype_key or isinstance(prototype_key, list):
+            obj.delete()
+            return False
+        if self.counts[prototype_key] >= MAX_POOLED:
+            obj.delete()
+            return False
+
+        location = obj.location
+        if location:
+            # same as a move, but without any of the messaging
+            location.at_object_leave(obj, None)
+            obj.location = None
+        obj.tags.add(POOL_TAG, category=POOL_TAG_CATEGORY)
+        self.counts[prototype_key] += 1
+        return True
+
+    def acquire(self, prototype, count, location=None, caller=None):
+        """
+        Take objects out of the pool, resetting them to the state of a newly spawned
+        object of this prototype. The objects' hooks are *not* called.
+
+        Args:
+            prototype (dict): The prototype to reinitialize the objects from.
+            count (int): How many objects we want. We may get fewer.
+            location (Object, optional): Where the objects should be put.
+            caller (Object or Account, optional): Passed on to protfuncs.
+
+        Returns:
+            list: Up to `count` objects, ready for use.
+
+        """
+        prototype_key = prototype.get("prototype_key")
+        if not (prototype_key and self.counts[prototype_key] > 0):
+            return []
+
+        objs = list(
+            self._pooled().filter(
+                id__in=ObjectDB.objects.filter(
+                    db_tags__db_key=prototype_key, db_tags__db_category=PROTOTYPE_TAG_CATEGORY
+                ).values("id")
+            )[:count]
+        )
+        if len(objs) < count:
+            # pool is empty now (the count may be off if pooled objects were deleted)
+            self.counts[prototype_key] = 0
+        else:
+            self.counts[prototype_key] -= len(objs)
+        if objs:
+            self._reinitialize(objs, prototype, location, caller)
+        return objs
+
+    def _reinitialize(self, objs, prototype, location, caller):
+        """
+        Reset pooled objects to match `prototype`, reusing their database rows. They
+        end up with the Attributes and Tags of a newly spawned object: those of the
+        prototype, plus what the typeclass sets up on creation (autocreated
+        AttributeProperties and `get_creation_tags`). Existing Attribute rows are
+        updated, and only what differs is deleted or added. No hooks are run.
+
+        """
+        prototype = protlib.homogenize_prototype(prototype)
+        if location is not None:
+            prototype = {**prototype, "location": location}
+        create_kwargs, permissions, _, aliases, _, attributes, tags, _ = spawner.spawn(
+            prototype, caller=caller, only_validate=True
+        )[0]
+        typeclass = type(objs[0])
+        dbids = [obj.id for obj in objs]
+
+        # the object rows themselves
+        fields = {
+            field: create_kwargs.get(field)
+            for field in ("db_key", "db_location", "db_home", "db_destination")
+        }
+        ObjectDB.objects.filter(id__in=dbids).update(**fields)
+
+        # reset the Attributes - existing rows are overwritten with the value of a new
+        # object, anything added during the previous life of the object is removed.
+        wanted = {
+            (prop._key, prop._category): (
+                to_pickle(prop._default() if callable(prop._default) else prop._default),
+                prop._lockstring or "",
+            )
+            for prop in _get_autocreated_properties(typeclass)
+        }
+        wanted.update(
+            {
+                (key, category): (to_pickle(value), lockstring or "")
+                for key, value, category, lockstring in attributes
+            }
+        )
+        AttributeLink = ObjectDB.db_attributes.through
+        to_update, to_delete, found = [], [], set()
+        for link in AttributeLink.objects.filter(objectdb_id__in=dbids).select_related(
+            "attribute"
+        ):
+            attr = link.attribute
+            attrkey = (attr.db_key, attr.db_category)
+            if attrkey in wanted and (link.objectdb_id, attrkey) not in found:
+                attr.db_value, attr.db_lock_storage = wanted[attrkey]
+                to_update.append(attr)
+                found.add((link.objectdb_id, attrkey))
+            else:
+                to_delete.append(attr.id)
+        if to_update:
+            Attribute.objects.bulk_update(to_update, ["db_value", "db_lock_storage"])
+        if to_delete:
+            Attribute.objects.filter(id__in=to_delete).delete()
+        missing = [
+            (dbid, attrkey) for dbid in dbids for attrkey in wanted if (dbid, attrkey) not in found
+        ]
+        if missing:
+            new_attrs = Attribute.objects.bulk_create(
+                [
+                    Attribute(
+                        db_key=key,
+                        db_category=category,
+                        db_value=wanted[(key, category)][0],
+                        db_lock_storage=wanted[(key, category)][1],
+                        db_model="objectdb",
+                    )
+                    for _, (key, category) in missing
+                ]
+            )
+            AttributeLink.objects.bulk_create(
+                [
+                    AttributeLink(objectdb_id=dbid, attribute_id=new_attr.pk)
+                    for (dbid, _), new_attr in zip(missing, new_attrs)
+                ]
+            )
+
+        # reset the Tags (including aliases and permissions). Tags are shared, so only
+        # the links that differ are deleted or added - this also takes the objects out
+        # of the pool.
+        get_creation_tags = getattr(typeclass, "get_creation_tags", None)
+        creation_tags = get_creation_tags() if get_creation_tags else []
+        wanted_tags = (
+            [(key, category, None, None) for key, category in creation_tags]
+            + [(key, category, data[0] if data else None, None) for key, category, *data in tags]
+            + [(alias, None, None, "alias") for alias in aliases]
+            + [(perm, None, None, "permission") for perm in permissions]
+        )
+        tag_ids = {
+            ObjectDB.objects.create_tag(key=key, category=category, data=data, tagtype=tagtype).id
+            for key, category, data, tagtype in wanted_tags
+        }
+        TagLink = ObjectDB.db_tags.through
+        linked, to_unlink = set(), []
+        for link_id, dbid, tag_id in TagLink.objects.filter(objectdb_id__in=dbids).values_list(
+            "id", "objectdb_id", "tag_id"
+        ):
+            if tag_id in tag_ids:
+                linked.add((dbid, tag_id))
+            else:
+                to_unlink.append(link_id)
+        if to_unlink:
+            TagLink.objects.filter(id__in=to_unlink).delete()
+        to_link = [
+            TagLink(objectdb_id=dbid, tag_id=tag_id)
+            for dbid in dbids
+            for tag_id in tag_ids
+            if (dbid, tag_id) not in linked
+        ]
+        if to_link:
+            TagLink.objects.bulk_create(to_link)
+
+        # bring the in-memory objects up to date with the database
+        for obj in objs:
+            for field, value in fields.items():
+                setattr(obj, field, value)
+            obj.attributes.reset_cache()
+            obj.tags.reset_cache()
+            obj.aliases.reset_cache()
+            obj.permissions.reset_cache()
+
+    def cleanup(self, keep=KEEP_POOLED):
+        """
+        Delete pooled objects beyond `keep` for each prototype.
+
+        Returns:
+            int: The number of objects deleted.
+
+        """
+        self.load()
+        ndeleted = 0
+        for prototype_key, count in self.counts.items():
+            if count <= keep:
+                continue
+            surplus = self._pooled().filter(
+                id__in=ObjectDB.objects.filter(
+                    db_tags__db_key=prototype_key, db_tags__db_category=PROTOTYPE_TAG_CATEGORY
+                ).values("id")
+            )[: count - keep]
+            for obj in surplus:
+                obj.delete()
+                ndeleted += 1
+        if ndeleted:
+            logger.log_info(f"Consumable pool: deleted {ndeleted} surplus object(s).")
+        self.load()
+        return ndeleted
+
+
+CONSUMABLE_POOL = ConsumablePool()
+
+
+class ConsumablePoolScript(Script):
+    """
+    Global script periodically trimming the consumable pool. Set up in
+    `settings.GLOBAL_SCRIPTS`.
+
+    """
+
+    def at_script_creation(self):
+        self.key = "consumable_pool_cleanup"
+        self.desc = "Trims the pool of recycled consumables"
+        self.interval = 60 * 60
+        self.persistent = True
+
+    def at_repeat(self):
+        CONSUMABLE_POOL.cleanup()
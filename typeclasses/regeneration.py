@@ -0,0 +1,137 @@
+"""
+Regeneration
+
+Living things slowly regain HP when out of combat. Rather than giving each of them a
+Script or ticker of their own, a single `RegenerationService` keeps an in-memory set
+of the *wounded* - those with `0 < hp < hp_max` - and heals all of them on one shared
+interval. The set is kept up to date by the health handler (see `typeclasses/health.py`)
+whenever HP changes, so anyone at full health costs nothing, and the idle load depends
+on how many are wounded, not on how many exist.
+
+Regenerated HP is not written to the database on every tick. It's saved every
+`SAVE_EVERY` ticks, when reaching full health, and (like all HP) on logout, reload and
+shutdown.
+
+The ticking is done by `RegenerationScript`, set up in `settings.GLOBAL_SCRIPTS`. It
+also remembers who was wounded over a reload.
+
+"""
+
+from evennia.objects.models import ObjectDB
+from evennia.utils import logger
+
+from .prefetch import prefetch
+from .scripts import Script
+
+# seconds between regeneration ticks
+REGEN_INTERVAL = 10
+# regenerated HP is saved every this many ticks (and when fully healed)
+SAVE_EVERY = 6
+
+
+class RegenerationService:
+    """
+    Keeps track of wounded living things and heals them a little on every tick.
+
+    """
+
+    def __init__(self):
+        # {dbid: obj}
+        self.wounded = {}
+        self.ticks = 0
+
+    def update(self, obj, hp, hp_max):
+        """
+        Called by the health handler when `obj`'s HP changed (or was first loaded).
+
+        Args:
+            obj (Object): The living thing.
+            hp (int): Its current HP.
+            hp_max (int): Its max HP.
+
+        """
+        if not obj.id:
+            return
+        # the defeated don't regenerate - that's for at_defeat to handle
+        if 0 < hp < hp_max:
+            self.wounded[obj.id] = obj
+        else:
+            self.wounded.pop(obj.id, None)
+
+    def reset(self):
+        """Forget everyone being tracked, for example between tests"""
+        self.wounded = {}
+        self.ticks = 0
+
+    def tick(self):
+        """
+        Heal everyone wounded and out of combat by their `hp_regen`.
+
+        """
+        self.ticks += 1
+        save = self.ticks % SAVE_EVERY == 0
+        # healing updates the index, so iterate over a copy
+        for dbid, obj in list(self.wounded.items()):
+            if not obj.pk:
+                # deleted since it was wounded
+                del self.wounded[dbid]
+                continue
+            location = obj.location
+            combathandler = location.ndb.combathandler if location else None
+            if combathandler and combathandler.id:
+                continue
+            try:
+                health = obj.health
+                health.heal(getattr(obj, "hp_regen", 1), save=False, regeneration=True)
+                if save or dbid not in self.wounded:
+                    health.save()
+            except Exception:
+                logger.log_trace(f"Error regenerating {obj}.")
+                self.wounded.pop(dbid, None)
+
+    def load(self, dbids):
+        """
+        Start tracking objects again after a reload, loading their HP in bulk.
+
+        Args:
+            dbids (list): The ids of the objects to track.
+
+        """
+        objs = list(ObjectDB.objects.filter(id__in=dbids))
+        prefetch(objs)
+        for obj in objs:
+            # loading the health handler registers the object if wounded
+            if hasattr(obj, "health"):
+                obj.health
+
+
+REGENERATION = RegenerationService()
+
+
+class RegenerationScript(Script):
+    """
+    Global script ticking the regeneration service. Set up in
+    `settings.GLOBAL_SCRIPTS`.
+
+    """
+
+    def at_script_creation(self):
+        self.key = "regeneration"
+        self.desc = "Regenerates the HP of the wounded"
+        self.interval = REGEN_INTERVAL
+        self.persistent = True
+
+    def at_start(self, **kwargs):
+        wounded = self.db.wounded
+        if wounded:
+            REGENERATION.load(wounded)
+            self.db.wounded = None
+
+    def at_repeat(self):
+        REGENERATION.tick()
+
+    def at_server_reload(self):
+        self.db.wounded = list(REGENERATION.wounded)
+
+    def at_server_shutdown(self):
+        self.db.wounded = list(REGENERATION.wounded)
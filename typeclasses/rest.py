@@ -0,0 +1,122 @@
+"""
+Rest
+
+Resting restores a character to full health and refreshes their rune stones (and any
+other magic items that are used up until the next rest).
+
+All refreshable items carried by the resting characters (including in bags, and bags
+in bags) are found with one query per level of nesting plus one on their "magic"
+`obj_type` Tag, and their `uses` are reset with
+one bulk update per `max_uses` value - normally just one. A whole party can rest at
+the inn without a separate Attribute write per rune stone.
+
+"""
+
+from collections import defaultdict
+
+from evennia.objects.models import ObjectDB
+from evennia.typeclasses.attributes import Attribute
+from evennia.utils.dbserialize import to_pickle
+
+from .enums import ObjType
+
+
+def get_refreshable_items(characters):
+    """
+    Get all magic items carried by any of `characters`, directly or in containers
+    (however deeply nested).
+
+    Args:
+        characters (list): The characters to check.
+
+    Returns:
+        list: The typeclassed items.
+
+    """
+    # walk down one level of containment at a time, until nothing holds anything more
+    seen = {char.id for char in characters}
+    holder_ids = list(seen)
+    carried_ids = []
+    while holder_ids:
+        holder_ids = [
+            dbid
+            for dbid in ObjectDB.objects.filter(db_location_id__in=holder_ids).values_list(
+                "id", flat=True
+            )
+            if dbid not in seen
+        ]
+        seen.update(holder_ids)
+        carried_ids.extend(holder_ids)
+    if not carried_ids:
+        return []
+    return list(
+        ObjectDB.objects.filter(
+            id__in=carried_ids,
+            db_tags__db_key=ObjType.MAGIC.value,
+            db_tags__db_category="obj_type",
+        ).distinct()
+    )
+
+
+def refresh_items(items):
+    """
+    Reset the `uses` of items to their `max_uses`, in bulk.
+
+    Args:
+        items (list): The items to refresh.
+
+    Returns:
+        int: The number of items refreshed.
+
+    """
+    by_max_uses = defaultdict(list)
+    for item in items:
+        max_uses = getattr(item, "max_uses", None)
+        if max_uses is not None:
+            by_max_uses[max_uses].append(item)
+
+    for max_uses, group in by_max_uses.items():
+        # only used items have a stored `uses` - the others already use the default.
+        # Attributes are cached in memory, so we must update the instances, not just
+        # the rows.
+        attrs = list(
+            Attribute.objects.filter(
+                objectdb__in=[item.id for item in group], db_key="uses", db_category=None
+            )
+        )
+        for attr in attrs:
+            attr.db_value = to_pickle(max_uses)
+        Attribute.objects.bulk_update(attrs, ["db_value"])
+        for item in group:
+            item.attributes.bump_version()
+    return sum(len(group) for group in by_max_uses.values())
+
+
+def rest(*characters):
+    """
+    Let one or more characters rest, healing them fully and refreshing their magic
+    items. Each character gets a single message summarizing their rest.
+
+    Args:
+        *characters (Character): The resting characters, like a party at an inn.
+
+    """
+    items = get_refreshable_items(characters)
+    refresh_items(items)
+
+    nrefreshed = defaultdict(int)
+    for item in items:
+        # items in a bag count for whoever is carrying the bag
+        carrier = item.location
+        while carrier not in characters:
+            carrier = carrier.location
+        nrefreshed[carrier] += 1
+
+    for character in characters:
+        healed = character.heal(character.hp_max, quiet=True)
+        summary = ["You rest for a while."]
+        if healed:
+            summary.append(f"You heal for {healed} HP.")
+        if nrefreshed[character]:
+            summary.append(f"{nrefreshed[character]} magic item(s) were refreshed.")
+        character.msg(" ".join(summary))
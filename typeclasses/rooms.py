@@ -4,15 +4,23 @@ Room
 Rooms are simple containers that has no location of their own.
 
 """
+from collections import ChainMap
 from copy import deepcopy
 
+from django.conf import settings
 from evennia import AttributeProperty, DefaultCharacter
 from evennia.objects.objects import DefaultRoom
-from evennia.utils import inherits_from
-from random import choice, random
+from evennia.utils import inherits_from, lazy_property, logger
+from evennia.utils.funcparser import ACTOR_STANCE_CALLABLES, FuncParser
+from evennia.utils.utils import delay, is_iter, iter_to_str, make_iter
 from evennia import TICKER_HANDLER
 
+from .ambient import AMBIENT
+from .contentindex import ContentIndex, DisplayNames
+from .instancing import CopyOnWriteMixin
 from .objects import ObjectParent
+from .utils import RenderCache
+from .worldgraph import WORLD_GRAPH
 
 
 CHAR_SYMBOL = "|w@|n"
@@ -27,6 +35,9 @@ _MAP_GRID = [
     [" ", " ", " ", " ", " "],
     [" ", " ", " ", " ", " "],
 ]
+# the rendered minimap of each room, until its exits change
+_MINIMAP_CACHE = RenderCache()
+_MSG_CONTENTS_PARSER = FuncParser(ACTOR_STANCE_CALLABLES)
 _EXIT_GRID_SHIFT = {
     "north": (0, 1, "||"),
     "east": (1, 0, "-"),
@@ -37,6 +48,25 @@ _EXIT_GRID_SHIFT = {
     "southwest": (-1, -1, "/"),
     "northwest": (-1, 1, "\\"),
 }
+# in crowd mode, more movers than this going the same way are only counted, not named
+CROWD_NAMED = 3
+
+
+def _crowd_line(kind, direction, movers, looker):
+    """
+    One line of a crowd message, like "5 people arrive from the north."
+
+    """
+    if len(movers) > CROWD_NAMED:
+        who = f"{len(movers)} people"
+    else:
+        who = iter_to_str([obj.get_display_name(looker) for obj in movers])
+    verb = kind if len(movers) > 1 else f"{kind}s"
+    if not direction:
+        return f"{who} {verb}."
+    if direction in _EXIT_GRID_SHIFT:
+        direction = f"the {direction}"
+    return f"{who} {verb} {'from' if kind == 'arrive' else 'to'} {direction}."
 
 
 
@@ -55,10 +85,171 @@ class Room(ObjectParent, DefaultRoom):
     allow_combat = AttributeProperty(False, autocreate=False)
     allow_pvp = AttributeProperty(False, autocreate=False)
     allow_death = AttributeProperty(False, autocreate=False)
+    # when the behavior scheduler stopped ticking this room (see typeclasses/behavior.py)
+    frozen_at = AttributeProperty(None, autocreate=False)
+    # overrides settings.CROWD_THRESHOLD for this room
+    crowd_threshold = AttributeProperty(None, autocreate=False)
 
     def at_object_creation(self):
         self.db.is_dark = False
 
+    @lazy_property
+    def content_index(self):
+        return ContentIndex(self)
+
+    def at_object_receive(self, moved_obj, source_location, **kwargs):
+        super().at_object_receive(moved_obj, source_location, **kwargs)
+        self.content_index.add(moved_obj)
+
+    def at_object_leave(self, moved_obj, target_location, **kwargs):
+        super().at_object_leave(moved_obj, target_location, **kwargs)
+        self.content_index.discard(moved_obj)
+
+    def msg_contents(
+        self,
+        text=None,
+        exclude=None,
+        from_obj=None,
+        mapping=None,
+        raise_funcparse_errors=False,
+        **kwargs,
+    ):
+        """
+        Like the default `msg_contents`, but only messaging characters and NPCs, and
+        other objects if puppeted or with their own `msg` (most items and exits can't
+        do anything with a message), found with the content index.
+        Display names for the `{key}` director stance are only looked up for the keys
+        actually used in the message.
+
+        Arrival and departure messages are gathered up instead when the room is
+        crowded (see `is_crowded`).
+
+        """
+        is_outcmd = text and is_iter(text)
+        inmessage = text[0] if is_outcmd else text
+        outkwargs = text[1] if is_outcmd and len(text) > 1 else {}
+        if (
+            from_obj
+            and mapping
+            and mapping.get("object") is from_obj
+            and "type" in outkwargs
+            and self.is_crowded()
+        ):
+            # an announcement from announce_move_from/to
+            exit = mapping.get("exit")
+            direction = getattr(exit, "key", None)
+            kind = "arrive" if mapping.get("destination") is self else "leave"
+            self.add_crowd_event(kind, from_obj, direction=direction)
+            return
+        you = from_obj or self
+        mapping = mapping or {}
+        if "you" not in mapping:
+            # don't change the mapping we were given, it may be shared
+            mapping = ChainMap({"you": you}, mapping)
+        receivers = self.content_index.receivers
+        if exclude:
+            exclude = make_iter(exclude)
+            receivers = [obj for obj in receivers if obj not in exclude]
+        for receiver in receivers:
+            # actor-stance replacements
+            outmessage = _MSG_CONTENTS_PARSER.parse(
+                inmessage,
+                raise_errors=raise_funcparse_errors,
+                return_string=True,
+                caller=you,
+                receiver=receiver,
+                mapping=mapping,
+            )
+            # director-stance replacements
+            outmessage = outmessage.format_map(DisplayNames(mapping, receiver))
+            receiver.msg(text=(outmessage, outkwargs), from_obj=from_obj, **kwargs)
+
+    def is_crowded(self):
+        """
+        Check if the room is in crowd mode - when it holds so many characters and NPCs
+        that sending every arrival, departure and ambient message to all of them as it
+        happens would flood them (and the server).
+
+        """
+        threshold = self.crowd_threshold
+        if threshold is None:
+            threshold = settings.CROWD_THRESHOLD
+        return bool(threshold) and self.content_index.listener_count >= threshold
+
+    def add_crowd_event(self, kind, obj=None, direction=None, text=None):
+        """
+        Gather up a message to send with the others at the end of the crowd window.
+
+        Args:
+            kind (str): One of "arrive", "leave" or "ambient".
+            obj (Object, optional): Who arrived or left.
+            direction (str, optional): The key of the exit they arrived or left by.
+            text (str, optional): The ambient message.
+
+        """
+        events = self.ndb.crowd_events
+        if events is None:
+            events = self.ndb.crowd_events = {}
+            delay(settings.CROWD_WINDOW, self.send_crowd_messages)
+        entries = events.setdefault((kind, direction), [])
+        entry = text if kind == "ambient" else obj
+        if entry not in entries:
+            entries.append(entry)
+
+    def send_crowd_messages(self):
+        """
+        Send everything gathered during the crowd window, as one message to each
+        receiver in the room (see `msg_contents`).
+
+        """
+        events = self.ndb.crowd_events
+        self.ndb.crowd_events = None
+        if not events:
+            return
+        for receiver in self.content_index.receivers:
+            lines = []
+            for (kind, direction), entries in events.items():
+                if kind == "ambient":
+                    lines.extend(entries)
+                    continue
+                # no need to tell anyone they arrived themselves
+                movers = [obj for obj in entries if obj != receiver]
+                if movers:
+                    lines.append(_crowd_line(kind, direction, movers, receiver))
+            if lines:
+                receiver.msg(text=("\n".join(lines), {"type": "crowd"}), from_obj=self)
+
+    def msg_ambient(self, text):
+        """
+        Send an ambient message (like an echo), which is gathered up with the others
+        if the room is crowded.
+
+        """
+        if self.is_crowded():
+            self.add_crowd_event("ambient", text=text)
+        else:
+            self.msg_contents(text)
+
+    def at_occupied(self, now):
+        """
+        Called by the behavior scheduler when a player comes near after the room was
+        frozen. Lets the contents catch up on the time they missed.
+
+        """
+        frozen_at = self.frozen_at
+        if frozen_at is None:
+            return
+        del self.frozen_at
+        elapsed = now - frozen_at
+        for obj in list(self.contents):
+            catch_up = getattr(obj, "at_behavior_catch_up", None)
+            if catch_up:
+                catch_up(elapsed)
+
+    def at_vacated(self, now):
+        """Called by the behavior scheduler when there are no more players near"""
+        self.frozen_at = now
+
     def get_light(self):
         return self.db.is_dark
 
@@ -78,11 +269,14 @@ class Room(ObjectParent, DefaultRoom):
         ):
             return ""
 
-        # build a map
+        return _MINIMAP_CACHE.get(self.id, WORLD_GRAPH.room_version(self), self._render_minimap)
+
+    def _render_minimap(self):
+        """Draw the mini-map from our exits"""
         map_grid = deepcopy(_MAP_GRID)
         dx0, dy0 = 2, 2
         map_grid[dy0][dx0] = CHAR_SYMBOL
-        for exi in self.exits:
+        for exi in self.content_index.exits:
             dx, dy, symbol = _EXIT_GRID_SHIFT.get(exi.key, (None, None, None))
             if symbol is None:
                 # we have a non-cardinal direction to go to - indicate this
@@ -110,21 +304,102 @@ class PvPRoom(Room):
         return "|yNon-lethal PvP combat is allowed here!|n"
 
 class EchoingRoom(Room):
-    """A room that randomly echoes messages to everyone inside it"""
+    """
+    A room that randomly echoes messages to everyone inside it. The echoes are driven
+    by the ambient scheduler (see typeclasses/ambient.py), so they only happen while
+    a player is here to hear them.
+
+    """
 
     echoes = AttributeProperty(list, autocreate=False)
     echo_rate = AttributeProperty(60 * 2, autocreate=False)
     echo_chance = AttributeProperty(0.1, autocreate=False)
+    is_echoing = AttributeProperty(False, autocreate=False)
 
-    def send_echo(self):
-        if self.echoes and random() < self.echo_chance:
-            self.msg_contents(choice(self.echoes))
+    def send_echo(self, rng=None):
+        rng = rng or AMBIENT.rng
+        if self.echoes and rng.random() < self.echo_chance:
+            self.msg_ambient(rng.choice(self.echoes))
 
     def start_echo(self):
-        TICKER_HANDLER.add(self.echo_rate, self.send_echo)
+        self.is_echoing = True
+        self._remove_ticker()
 
     def stop_echo(self):
-        TICKER_HANDLER.remove(self.echo_rate, self.send_echo)
+        self.is_echoing = False
+        self._remove_ticker()
+
+    def _remove_ticker(self):
+        """Echoing rooms used to have a ticker each - remove any left over"""
+        try:
+            TICKER_HANDLER.remove(self.echo_rate, self.send_echo)
+        except KeyError:
+            pass
+
+    def at_ambient_start(self):
+        """Someone arrived - start counting towards the next echo"""
+        self.ndb.next_echo = None
+
+    def at_ambient_tick(self, now, rng):
+        """Called by the ambient scheduler while players are here"""
+        if not self.is_echoing:
+            return
+        next_echo = self.ndb.next_echo
+        if next_echo is None:
+            self.ndb.next_echo = now + self.echo_rate
+        elif now >= next_echo:
+            self.ndb.next_echo = now + self.echo_rate
+            self.send_echo(rng)
+
+    def at_object_receive(self, moved_obj, source_location, **kwargs):
+        super().at_object_receive(moved_obj, source_location, **kwargs)
+        if moved_obj.has_account:
+            AMBIENT.character_arrived(self, moved_obj)
+
+    def at_object_leave(self, moved_obj, target_location, **kwargs):
+        super().at_object_leave(moved_obj, target_location, **kwargs)
+        if moved_obj.has_account:
+            AMBIENT.character_left(self, moved_obj)
+
+
+def migrate_echo_tickers():
+    """
+    Echoing rooms used to have a ticker each, which still fires (on top of the ambient
+    scheduler) for rooms started before the change. Turn those tickers into the
+    `is_echoing` flag and remove them. Called after server start (see
+    `server/conf/at_server_startstop.py`).
 
+    Returns:
+        int: The number of rooms migrated.
 
+    """
+    nmigrated = 0
+    for obj, callfunc, _, interval, idstring, persistent in TICKER_HANDLER.all_display():
+        if callfunc == "send_echo" and obj and inherits_from(obj, EchoingRoom):
+            obj.is_echoing = True
+            TICKER_HANDLER.remove(interval, obj.send_echo, idstring=idstring, persistent=persistent)
+            nmigrated += 1
+    if nmigrated:
+        logger.log_info(f"Moved {nmigrated} echoing room(s) from tickers to the ambient scheduler.")
+    return nmigrated
+
+
+class InstanceRoom(CopyOnWriteMixin, Room):
+    """
+    A room of a dungeon instance, created by `INSTANCES.create_instance` (see
+    typeclasses/instancing.py). It reads the Attributes it doesn't have itself (like its
+    `desc`) from its template room, and shows the template room's items as scenery.
+
+    """
 
+    def contents_get(self, exclude=None, content_type=None):
+        contents = super().contents_get(exclude=exclude, content_type=content_type)
+        template = self.template
+        if template and content_type in (None, "object"):
+            excluded = make_iter(exclude) if exclude else ()
+            contents = contents + [
+                obj
+                for obj in template.content_index.get("sittables", "items")
+                if obj not in excluded
+            ]
+        return contents
@@ -0,0 +1,88 @@
+"""
+Shared singletons
+
+Some objects are shared by everyone rather than being owned by anyone, like the
+'Bare hands' weapon used by anyone not wielding anything. Such objects are listed in
+`SINGLETON_TEMPLATES` and fetched or created once, when the server starts (see
+`server/conf/at_server_startstop.py`). After that they are available through
+`SINGLETONS.get(name)` without ever hitting the database.
+
+The objects are found again by a Tag of category "singleton", so they can be renamed
+in-game without breaking anything.
+
+"""
+
+from evennia import create_object, search_object
+from evennia.objects.models import ObjectDB
+from evennia.utils import logger
+
+# name: (typeclass, key)
+SINGLETON_TEMPLATES = {
+    "bare_hands": ("typeclasses.objects.WeaponBareHands", "Bare hands"),
+}
+
+
+class SingletonRegistry:
+    """
+    Holds the shared singleton objects, by name.
+
+    """
+
+    tag_category = "singleton"
+
+    def __init__(self, templates):
+        self.templates = templates
+        self._objects = {}
+
+    def load(self):
+        """
+        Fetch (or create) all singletons in one go. Called at server start.
+
+        """
+        found = ObjectDB.objects.filter(
+            db_tags__db_key__in=list(self.templates), db_tags__db_category=self.tag_category
+        ).values_list("id", "db_tags__db_key")
+        dbids = dict((name, dbid) for dbid, name in found)
+        objs = {obj.id: obj for obj in ObjectDB.objects.filter(id__in=dbids.values())}
+        for name in self.templates:
+            obj = objs.get(dbids.get(name))
+            self._objects[name] = obj or self._get_or_create(name)
+
+    def _get_or_create(self, name):
+        """
+        Find a singleton by its original key (it may have been created before the
+        registry existed), or create it from scratch.
+
+        """
+        typeclass, key = self.templates[name]
+        obj = search_object(key, typeclass=typeclass).first()
+        if not obj:
+            logger.log_info(f"Creating shared singleton '{name}'.")
+            obj = create_object(typeclass, key=key)
+        obj.tags.add(name, category=self.tag_category)
+        return obj
+
+    def get(self, name):
+        """
+        Get a shared singleton.
+
+        Args:
+            name (str): The name of the singleton, like "bare_hands".
+
+        Returns:
+            Object: The shared object.
+
+        Raises:
+            KeyError: If there is no singleton by this name.
+
+        """
+        obj = self._objects.get(name)
+        if not (obj and obj.id):
+            # not loaded at server start (or deleted since) - this should be rare
+            if name not in self.templates:
+                raise KeyError(f"No shared singleton named '{name}'.")
+            obj = self._objects[name] = self._get_or_create(name)
+        return obj
+
+
+SINGLETONS = SingletonRegistry(SINGLETON_TEMPLATES)
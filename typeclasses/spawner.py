@@ -0,0 +1,191 @@
+"""
+Bulk spawner
+
+Evennia's `spawn()` creates objects one at a time, with separate INSERTs for the
+object, each of its Attributes and each of its Tags. That's fine for a single sword
+but slow for dungeon resets and loot drops of hundreds of items.
+
+`bulk_spawn` instead spawns the first object of each prototype normally (running all
+creation hooks) and then copies the resulting database rows - the object, its
+Attributes and its Tag links - for the remaining instances, using batched INSERTs
+inside a single transaction.
+
+Since the copies are made from the first instance, creation hooks and protfuncs are
+only run once per prototype and batch; anything that should differ between instances
+(like a random hp roll) must be set after spawning.
+
+Before creating anything, used-up consumables of the same prototype are taken from the
+recycling pool (see `typeclasses/recycling.py`) and reset, reusing their rows.
+
+Copying rows needs a database that returns the ids of bulk-inserted rows (PostgreSQL,
+SQLite, MariaDB 10.5+). On others, like MySQL, `bulk_spawn` falls back to spawning
+every object normally.
+
+"""
+
+from django.db import connection, transaction
+from evennia import spawn
+from evennia.objects.models import ObjectDB
+from evennia.prototypes import prototypes as protlib
+from evennia.typeclasses.attributes import Attribute
+
+from .recycling import CONSUMABLE_POOL
+
+# the object fields copied from the first instance of each prototype
+_COPIED_FIELDS = (
+    "db_key",
+    "db_typeclass_path",
+    "db_location_id",
+    "db_home_id",
+    "db_destination_id",
+    "db_lock_storage",
+    "db_cmdset_storage",
+)
+_COPIED_ATTRIBUTE_FIELDS = (
+    "db_key",
+    "db_value",
+    "db_strvalue",
+    "db_category",
+    "db_lock_storage",
+    "db_model",
+    "db_attrtype",
+)
+
+
+def _copy_objects(template, count, location_ids=None):
+    """
+    Make `count` copies of the database rows of `template`.
+
+    Args:
+        template (Object): The object to copy.
+        count (int): How many copies to make.
+        location_ids (list, optional): The location dbid of each copy, if they
+            shouldn't all be where the template is.
+
+    Returns:
+        list: The ids of the new objects.
+
+    Raises:
+        RuntimeError: If the database can't return the ids of bulk-inserted rows.
+
+    """
+    if not connection.features.can_return_rows_from_bulk_insert:
+        raise RuntimeError(
+            "Copying objects needs bulk inserts returning ids, "
+            f"which {connection.vendor} does not support."
+        )
+    fields = {field: getattr(template, field) for field in _COPIED_FIELDS}
+    if location_ids is None:
+        location_ids = [fields["db_location_id"]] * count
+    new_objs = ObjectDB.objects.bulk_create(
+        [ObjectDB(**{**fields, "db_location_id": location_id}) for location_id in location_ids]
+    )
+    dbids = [obj.pk for obj in new_objs]
+
+    # Attributes are owned by each object, so they must be copied
+    template_attrs = list(template.db_attributes.all())
+    if template_attrs:
+        attr_copies = Attribute.objects.bulk_create(
+            [
+                Attribute(**{field: getattr(attr, field) for field in _COPIED_ATTRIBUTE_FIELDS})
+                for _ in dbids
+                for attr in template_attrs
+            ]
+        )
+        nattrs = len(template_attrs)
+        AttributeLink = ObjectDB.db_attributes.through
+        AttributeLink.objects.bulk_create(
+            [
+                AttributeLink(objectdb_id=dbid, attribute_id=attr.pk)
+                for iobj, dbid in enumerate(dbids)
+                for attr in attr_copies[iobj * nattrs : (iobj + 1) * nattrs]
+            ]
+        )
+
+    # Tags (including aliases and permissions) are shared, so we only need to link them
+    TagLink = ObjectDB.db_tags.through
+    tag_ids = list(TagLink.objects.filter(objectdb_id=template.id).values_list("tag_id", flat=True))
+    if tag_ids:
+        TagLink.objects.bulk_create(
+            [TagLink(objectdb_id=dbid, tag_id=tag_id) for dbid in dbids for tag_id in tag_ids]
+        )
+    return dbids
+
+
+def bulk_spawn(spawn_list, location=None, caller=None):
+    """
+    Spawn many objects from prototypes at once.
+
+    Args:
+        spawn_list (list or dict): Tuples `(prototype, count)`, or a dict
+            `{prototype: count}`. Each `prototype` is a prototype-key or a prototype dict.
+        location (Object, optional): Where to put the spawned objects. If not given, the
+            `location` of the prototype is used.
+        caller (Object or Account, optional): Passed on to protfuncs for access checks.
+
+    Returns:
+        list: The spawned, typeclassed objects, in the order of `spawn_list`.
+
+    Notes:
+        The location's `at_batch_object_receive(objs, source_location)` hook is called
+        with all the spawned objects at once, if it exists. Otherwise
+        `at_object_receive` is called for each of them.
+
+    """
+    if isinstance(spawn_list, dict):
+        spawn_list = spawn_list.items()
+
+    spawned = []
+    copied = []
+    with transaction.atomic():
+        for prototype, count in spawn_list:
+            if count < 1:
+                continue
+            if isinstance(prototype, str):
+                prototype = protlib.search_prototype(prototype, require_single=True)[0]
+            # reuse recycled objects first
+            reused = CONSUMABLE_POOL.acquire(prototype, count, location=location, caller=caller)
+            count -= len(reused)
+            spawned.append((None, [obj.id for obj in reused]))
+            copied.extend(obj.id for obj in reused)
+            if count < 1:
+                continue
+            if location is not None:
+                prototype = {**prototype, "location": location}
+            # the first one is spawned normally, running all hooks
+            template = spawn(prototype, caller=caller)[0]
+            if count < 2:
+                dbids = []
+            elif connection.features.can_return_rows_from_bulk_insert:
+                dbids = _copy_objects(template, count - 1)
+            else:
+                dbids = [obj.id for obj in spawn(*[prototype] * (count - 1), caller=caller)]
+            spawned.append((template, dbids))
+            copied.extend(dbids)
+
+    # load the copies in one query, putting them in the idmapper cache (recycled objects
+    # are already there)
+    objs_by_id = {obj.id: obj for obj in ObjectDB.objects.filter(id__in=copied)}
+    objs = []
+    for template, dbids in spawned:
+        if template:
+            objs.append(template)
+        for dbid in dbids:
+            objs.append(objs_by_id[dbid])
+
+    # let the location(s) know about their new contents. This includes the objects
+    # spawned normally, since spawn() doesn't call at_object_receive.
+    by_location = {}
+    for obj in objs:
+        if obj.location:
+            by_location.setdefault(obj.location, []).append(obj)
+    for loc, loc_objs in by_location.items():
+        for obj in loc_objs:
+            loc.contents_cache.add(obj)
+        batch_hook = getattr(loc, "at_batch_object_receive", None)
+        if batch_hook:
+            batch_hook(loc_objs, None)
+        else:
+            for obj in loc_objs:
+                loc.at_object_receive(obj, None)
+    return objs
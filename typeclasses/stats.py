@@ -0,0 +1,211 @@
+"""
+Packed stats
+
+By default each stat of a Character (`strength`, `xp`, `coins` etc) is its own
+Attribute - 14 database rows, loaded and saved one by one. A character can instead
+store all of them *packed* in a single Attribute, as a list of values in a fixed
+layout (see `STAT_FIELDS`). The stats are still accessed the same way, as
+`character.strength`, through `StatProperty` descriptors.
+
+Packing is opt-in per character: new characters made in chargen are created packed
+and old ones can be converted with `pack_stats` (or `pack_all_characters`, for
+example from the `py` command). Characters without a stats block keep using one
+Attribute per stat.
+
+"""
+
+from evennia import AttributeProperty
+from evennia.typeclasses.attributes import Attribute
+
+# (name, type, default). The order is the storage layout, so new fields must only
+# ever be added at the end.
+STAT_FIELDS = (
+    ("strength", int, 1),
+    ("dexterity", int, 1),
+    ("constitution", int, 1),
+    ("intelligence", int, 1),
+    ("wisdom", int, 1),
+    ("charisma", int, 1),
+    ("luck", int, 1),
+    ("hp", int, 8),
+    ("hp_max", int, 8),
+    ("level", int, 1),
+    ("xp", int, 0),
+    ("coins", int, 0),
+    ("charclass", str, "Fighter"),
+    ("charrace", str, "Human"),
+)
+STAT_NAMES = tuple(name for name, _, _ in STAT_FIELDS)
+STAT_TYPES = {name: typ for name, typ, _ in STAT_FIELDS}
+STAT_DEFAULTS = {name: default for name, _, default in STAT_FIELDS}
+
+
+def make_stats_block(**values):
+    """
+    Build a packed stats block, for example to pass as an Attribute to `create_object`.
+
+    Keyword Args:
+        Any stat names from `STAT_FIELDS`. Unset stats get their default.
+
+    Returns:
+        list: The block to store.
+
+    """
+    unknown = set(values) - set(STAT_NAMES)
+    if unknown:
+        raise KeyError(f"Unknown stat(s): {', '.join(sorted(unknown))}")
+    return [StatsHandler.save_format_version] + [
+        _coerce(name, values[name]) if name in values else STAT_DEFAULTS[name]
+        for name in STAT_NAMES
+    ]
+
+
+def _coerce(name, value):
+    """Make sure a stat is stored with the right type"""
+    typ = STAT_TYPES[name]
+    return value if isinstance(value, typ) else typ(value)
+
+
+class StatsHandler:
+    """
+    Gives access to the packed stats block of a character, if it has one.
+
+    """
+
+    save_attribute = "stats"
+    save_category = "stats"
+    # bump this if changing how the stats are stored (but adding fields is fine)
+    save_format_version = 1
+
+    def __init__(self, obj):
+        # here obj is the character we store the handler on
+        self.obj = obj
+        self._load()
+
+    def _load(self):
+        """Load the block, if there is one, from an Attribute on `self.obj`"""
+        data = self.obj.attributes.get(self.save_attribute, category=self.save_category)
+        self.packed = bool(data) and data[0] == self.save_format_version
+        # fields added to the layout since the block was saved get their defaults
+        self._values = dict(zip(STAT_NAMES, data[1:])) if self.packed else {}
+
+    def _save(self):
+        """Save the whole block back to the same Attribute"""
+        self.obj.attributes.add(
+            self.save_attribute,
+            [self.save_format_version] + [self.get(name) for name in STAT_NAMES],
+            category=self.save_category,
+        )
+        self.packed = True
+
+    def get(self, name):
+        """
+        Get a stat from the block.
+
+        Args:
+            name (str): The name of the stat, like "strength".
+
+        Returns:
+            any: The value of the stat.
+
+        """
+        return self._values.get(name, STAT_DEFAULTS[name])
+
+    def set(self, name, value):
+        """Set one stat and save the block"""
+        self.update(**{name: value})
+
+    def update(self, **values):
+        """
+        Set any number of stats, saving the block once.
+
+        Raises:
+            KeyError: If given an unknown stat.
+            ValueError: If a value can't be converted to the type of the stat.
+
+        """
+        unknown = set(values) - set(STAT_NAMES)
+        if unknown:
+            raise KeyError(f"Unknown stat(s): {', '.join(sorted(unknown))}")
+        self._values.update({name: _coerce(name, value) for name, value in values.items()})
+        self._save()
+
+
+class StatProperty(AttributeProperty):
+    """
+    A stat of a Character. This reads and writes the packed stats block if the
+    character has one, otherwise it works like a normal `AttributeProperty`. The
+    default comes from `STAT_FIELDS`.
+
+    """
+
+    def __init__(self, **kwargs):
+        # the default is set when we learn our name
+        kwargs.setdefault("autocreate", False)
+        super().__init__(**kwargs)
+
+    def __set_name__(self, cls, name):
+        super().__set_name__(cls, name)
+        self._default = STAT_DEFAULTS[name]
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        stats = instance.stats
+        if stats.packed:
+            return stats.get(self._key)
+        return super().__get__(instance, owner)
+
+    def __set__(self, instance, value):
+        stats = instance.stats
+        if stats.packed:
+            stats.set(self._key, value)
+        else:
+            super().__set__(instance, value)
+
+
+def pack_stats(character):
+    """
+    Convert a character from one Attribute per stat to a packed stats block. The old
+    Attributes are deleted.
+
+    Args:
+        character (Character): The character to convert.
+
+    Returns:
+        bool: If the character was converted (`False` if already packed).
+
+    """
+    if character.stats.packed:
+        return False
+    # make sure we get the latest hp
+    if hasattr(character, "save_health"):
+        character.save_health()
+
+    # one query for all the Attributes
+    attrs = {
+        attr.key: attr
+        for attr in character.attributes.all()
+        if attr.key in STAT_TYPES and attr.category is None
+    }
+    values = {name: attr.value for name, attr in attrs.items()}
+    character.attributes.add(
+        StatsHandler.save_attribute, make_stats_block(**values), category=StatsHandler.save_category
+    )
+    Attribute.objects.filter(id__in=[attr.id for attr in attrs.values()]).delete()
+    character.attributes.reset_cache()
+    character.stats._load()
+    return True
+
+
+def pack_all_characters():
+    """
+    Convert all existing characters to packed stats.
+
+    Returns:
+        int: The number of characters converted.
+
+    """
+    from .characters import Character
+
+    return sum(pack_stats(character) for character in Character.objects.all_family())
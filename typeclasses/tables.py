@@ -0,0 +1,358 @@
+"""
+Random tables
+
+Rolling on a table used to mean passing it to `dice.roll_random_table` together with a
+die to roll, like `"1d282"` for a 282-entry table - which silently gives the wrong
+odds if the two don't match, and parses the table's ranges again on every roll.
+
+The `TABLES` registry instead loads each table once, checks it and keeps a sampler
+for it, so rolling is O(1) and needs no die:
+
+    from typeclasses.tables import TABLES
+
+    TABLES.roll("chargen.physique")                 # "athletic"
+    TABLES.roll_many("chargen.name", 100)           # 100 names
+    TABLES.get("knave.reactions").lookup(7)         # what a 2d6 roll of 7 gives
+
+Tables are found by `<source>.<table>`, where the sources are given in
+`settings.RANDOM_TABLE_SOURCES` as `{source: where}`. A source can be
+
+- a JSON file holding either one table (a list) or a dict of tables by name,
+- a CSV file holding one table,
+- the python path to a module, whose list variables are its tables.
+
+Relative file paths are relative to the game dir. A source is only loaded (imported
+or parsed) when a table in it is first used. Sources holding a single table are
+rolled on by the source name alone. Changed files are picked up with
+`TABLES.reload_changed()`, or everything with `TABLES.reload()`.
+
+A table's entries are either
+
+- plain results: `["athletic", "brawny", ...]`, all equally likely.
+- die ranges: `[("1-5", "law"), ("6-15", "neutrality"), ("16-20", "chaos")]`. The
+  ranges must follow each other without gaps or overlaps, and their lengths are the
+  odds.
+- weighted results: `[{"weight": 3, "result": "goblin"}, ...]`. Weighted tables are
+  rolled with the alias method.
+
+In CSV files these are the `result` column, optionally with a `roll` (die range) or
+`weight` column.
+
+"""
+
+import csv
+import json
+import os
+import random
+
+from django.conf import settings
+from evennia.utils.utils import mod_import
+
+
+class AliasSampler:
+    """
+    Picks indices with given weights in O(1) time, using Vose's alias method.
+
+    """
+
+    def __init__(self, weights):
+        size = len(weights)
+        total = sum(weights)
+        scaled = [weight * size / total for weight in weights]
+        self.prob = [1.0] * size
+        self.alias = list(range(size))
+        small = [index for index, value in enumerate(scaled) if value < 1]
+        large = [index for index, value in enumerate(scaled) if value >= 1]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.prob[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1 - scaled[less]
+            (small if scaled[more] < 1 else large).append(more)
+        # whatever is left is (up to rounding) exactly 1 and keeps prob 1.0
+
+    def sample(self, rand):
+        """
+        Pick an index.
+
+        Args:
+            rand (float): A random number in [0, 1).
+
+        Returns:
+            int: The index.
+
+        """
+        value = rand * len(self.prob)
+        index = int(value)
+        return index if value - index < self.prob[index] else self.alias[index]
+
+
+def _parse_range(key, valrange):
+    try:
+        minval, *maxval = str(valrange).split("-", 1)
+        minval = int(minval)
+        maxval = int(maxval[0]) if maxval else minval
+    except ValueError:
+        raise ValueError(f"Random table {key}: invalid roll range {valrange!r}.")
+    if maxval < minval:
+        raise ValueError(f"Random table {key}: invalid roll range {valrange!r}.")
+    return minval, maxval
+
+
+class Table:
+    """
+    A random table, checked and ready to roll on.
+
+    """
+
+    def __init__(self, key, entries):
+        self.key = key
+        # for die-range tables: the lowest roll and the result of each possible roll
+        self.first_roll = None
+        self._by_roll = None
+        self._sampler = None
+        entries = list(entries)
+        if not entries:
+            raise ValueError(f"Random table {key} is empty.")
+
+        if all(isinstance(entry, dict) for entry in entries):
+            if not all("result" in entry for entry in entries):
+                raise ValueError(f"Random table {key}: entries need a result.")
+            if all(entry.get("roll") not in (None, "") for entry in entries):
+                entries = [(entry["roll"], entry["result"]) for entry in entries]
+            elif all(entry.get("weight") not in (None, "") for entry in entries):
+                self._init_weighted(entries)
+                return
+            else:
+                entries = [entry["result"] for entry in entries]
+
+        if all(isinstance(entry, (tuple, list)) and len(entry) == 2 for entry in entries):
+            self._init_ranges(entries)
+        elif any(isinstance(entry, (tuple, list, dict)) for entry in entries):
+            raise ValueError(f"Random table {key}: mixed kinds of entries.")
+        else:
+            self.results = entries
+
+    def _init_ranges(self, entries):
+        ranges = sorted(
+            (_parse_range(self.key, valrange) + (result,) for valrange, result in entries),
+            key=lambda entry: entry[0],
+        )
+        expected = ranges[0][0]
+        self.first_roll = expected
+        self.results = []
+        self._by_roll = []
+        weights = []
+        for minval, maxval, result in ranges:
+            if minval != expected:
+                problem = "gap" if minval > expected else "overlap"
+                raise ValueError(f"Random table {self.key}: {problem} at roll {expected}.")
+            expected = maxval + 1
+            self.results.append(result)
+            self._by_roll.extend([result] * (maxval - minval + 1))
+            weights.append(maxval - minval + 1)
+        if len(set(weights)) > 1:
+            self._sampler = AliasSampler(weights)
+
+    def _init_weighted(self, entries):
+        try:
+            weights = [float(entry["weight"]) for entry in entries]
+        except ValueError:
+            raise ValueError(f"Random table {self.key}: weights must be numbers.")
+        if any(weight <= 0 for weight in weights):
+            raise ValueError(f"Random table {self.key}: weights must be positive.")
+        self.results = [entry["result"] for entry in entries]
+        if len(set(weights)) > 1:
+            self._sampler = AliasSampler(weights)
+
+    def __len__(self):
+        return len(self.results)
+
+    def __repr__(self):
+        return f"<Table {self.key} ({len(self)} entries)>"
+
+    def roll(self, rng=None):
+        """
+        Roll on the table.
+
+        Args:
+            rng (random.Random or RandomStream, optional): Anything with a `random()`
+                method. Defaults to the `random` module.
+
+        Returns:
+            Any: The result.
+
+        """
+        rand = (rng or random).random()
+        if self._sampler:
+            return self.results[self._sampler.sample(rand)]
+        return self.results[int(rand * len(self.results))]
+
+    def roll_many(self, count, rng=None):
+        """
+        Roll on the table `count` times.
+
+        Returns:
+            list: The results.
+
+        """
+        rand = (rng or random).random
+        results = self.results
+        if self._sampler:
+            sample = self._sampler.sample
+            return [results[sample(rand())] for _ in range(count)]
+        size = len(results)
+        return [results[int(rand() * size)] for _ in range(count)]
+
+    def lookup(self, roll):
+        """
+        Get the result for a die roll made elsewhere, for die-range tables.
+
+        Raises:
+            ValueError: For rolls outside the table, or tables without die ranges.
+
+        """
+        if self._by_roll is None:
+            raise ValueError(f"Random table {self.key} has no die ranges.")
+        index = roll - self.first_roll
+        if not 0 <= index < len(self._by_roll):
+            raise ValueError(f"Random table {self.key} has no entry for roll {roll}.")
+        return self._by_roll[index]
+
+
+def _read_file(path):
+    """Read the raw tables of a JSON or CSV file, as `{name or None: entries}`"""
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as csvfile:
+            return {None: list(csv.DictReader(csvfile))}
+    with open(path, encoding="utf-8") as jsonfile:
+        data = json.load(jsonfile)
+    return data if isinstance(data, dict) else {None: data}
+
+
+class TableRegistry:
+    """
+    Loads random tables from their sources when first used.
+
+    """
+
+    def __init__(self, sources=None):
+        # {source: file path or python path}, from settings if not given
+        self._sources = sources
+        # {source: {table name or None: Table}}
+        self._loaded = {}
+        # {source: file modification time when loaded}
+        self._mtimes = {}
+
+    @property
+    def sources(self):
+        if self._sources is None:
+            self._sources = dict(settings.RANDOM_TABLE_SOURCES)
+        return self._sources
+
+    def add_source(self, name, where):
+        """
+        Add (or replace) a source of tables.
+
+        Args:
+            name (str): The source name, the first part of the keys of its tables.
+            where (str): A JSON/CSV file path or python path to a module.
+
+        """
+        self.sources[name] = where
+        self.reload(name)
+
+    def _get_path(self, where):
+        if where.endswith((".json", ".csv")):
+            return where if os.path.isabs(where) else os.path.join(settings.GAME_DIR, where)
+        return None
+
+    def _load(self, name):
+        where = self.sources[name]
+        path = self._get_path(where)
+        if path:
+            raw_tables = _read_file(path)
+            self._mtimes[name] = os.path.getmtime(path)
+        else:
+            module = mod_import(where)
+            if not module:
+                raise ImportError(f"Random table source {name}: could not import {where}.")
+            raw_tables = {
+                var: value
+                for var, value in vars(module).items()
+                if not var.startswith("_") and isinstance(value, list)
+            }
+        tables = {}
+        for table_name, entries in raw_tables.items():
+            key = f"{name}.{table_name}" if table_name else name
+            tables[table_name] = Table(key, entries)
+        self._loaded[name] = tables
+        return tables
+
+    def get(self, key):
+        """
+        Get a table.
+
+        Args:
+            key (str): `<source>.<table>`, or just `<source>` for single-table sources.
+
+        Returns:
+            Table: The table.
+
+        Raises:
+            KeyError: If there is no such table.
+            ValueError: If the table is broken.
+
+        """
+        name, _, table_name = key.partition(".")
+        tables = self._loaded.get(name)
+        if tables is None:
+            if name not in self.sources:
+                raise KeyError(f"No random table {key}.")
+            tables = self._load(name)
+        table = tables.get(table_name or None)
+        if table is None:
+            raise KeyError(f"No random table {key}.")
+        return table
+
+    def roll(self, key, rng=None):
+        """Roll on a table (see `Table.roll`)"""
+        return self.get(key).roll(rng=rng)
+
+    def roll_many(self, key, count, rng=None):
+        """Roll on a table `count` times (see `Table.roll_many`)"""
+        return self.get(key).roll_many(count, rng=rng)
+
+    def reload(self, name=None):
+        """
+        Forget loaded tables, so they are loaded again when next used.
+
+        Args:
+            name (str, optional): Only forget the tables of this source.
+
+        """
+        if name:
+            self._loaded.pop(name, None)
+            self._mtimes.pop(name, None)
+        else:
+            self._loaded = {}
+            self._mtimes = {}
+
+    def reload_changed(self):
+        """
+        Reload the file sources whose files changed since they were loaded.
+
+        Returns:
+            list: The names of the reloaded sources.
+
+        """
+        changed = []
+        for name, mtime in list(self._mtimes.items()):
+            path = self._get_path(self.sources.get(name, ""))
+            if not path or not os.path.exists(path) or os.path.getmtime(path) != mtime:
+                self.reload(name)
+                changed.append(name)
+        return changed
+
+
+TABLES = TableRegistry()
@@ -1,3 +1,5 @@
+from collections import OrderedDict
+
 _OBJ_STATS = """
 |c{key}|n
 Value: ~|y{value}|n coins{carried}
@@ -11,18 +13,51 @@ Damage roll: |w{damage_roll}|n
 """.strip()
 
 
-def get_obj_stats(obj, owner=None):
+class RenderCache:
     """
-    Get a string of stats about the object.
-
-    Args:
-        obj (Object): The object to get stats for.
-        owner (Object): The one currently owning/carrying `obj`, if any. Can be
-            used to show e.g. where they are wielding it.
-    Returns:
-        str: A nice info string to display about the object.
+    A size-limited cache of rendered text. Each entry is stored with a version and
+    is only reused while the version is the same, so callers don't need to ever
+    explicitly clear it. The least recently used entries are dropped first.
 
     """
+
+    def __init__(self, maxsize=5000):
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+
+    def get(self, key, version, render):
+        """
+        Get cached text, rendering it if needed.
+
+        Args:
+            key (hashable): What is being rendered, like `(obj.id, perspective)`.
+            version (hashable): The current version of what is being rendered.
+            render (callable): Called without arguments to render the text.
+
+        Returns:
+            str: The rendered text.
+
+        """
+        cached = self._cache.get(key)
+        if cached and cached[0] == version:
+            self._cache.move_to_end(key)
+            return cached[1]
+        text = render()
+        self._cache[key] = (version, text)
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+        return text
+
+    def clear(self):
+        self._cache.clear()
+
+
+_OBJ_STATS_CACHE = RenderCache()
+
+
+def _format_obj_stats(obj, owner=None):
+    """Build the stats string, see `get_obj_stats`"""
     return _OBJ_STATS.format(
         key=obj.key,
         value=10,
@@ -35,4 +70,30 @@ def get_obj_stats(obj, owner=None):
         attack_type_name="strength",
         defense_type_name="armor",
         damage_roll="1d6"
-    )
\ No newline at end of file
+    )
+
+
+def get_obj_stats(obj, owner=None):
+    """
+    Get a string of stats about the object.
+
+    Args:
+        obj (Object): The object to get stats for.
+        owner (Object): The one currently owning/carrying `obj`, if any. Can be
+            used to show e.g. where they are wielding it.
+    Returns:
+        str: A nice info string to display about the object.
+
+    Notes:
+        The result is cached until the `appearance_version` of the object changes.
+        Lookers only see different stats depending on whether they carry the
+        object, so everyone else shares the same cached string.
+
+    """
+    version = getattr(obj, "appearance_version", None)
+    if version is None or not obj.id:
+        return _format_obj_stats(obj, owner=owner)
+    carried = bool(owner) and obj.location == owner
+    return _OBJ_STATS_CACHE.get(
+        (obj.id, carried), version, lambda: _format_obj_stats(obj, owner=owner)
+    )
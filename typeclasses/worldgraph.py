@@ -0,0 +1,270 @@
+"""
+World graph
+
+Finding a way from one room to another means following exits, which would be a
+database lookup per room visited. Instead, `WORLD_GRAPH` keeps the exits of the
+whole world in memory as an adjacency map, loaded with one query at server start
+and updated by the `Exit` hooks whenever an exit is created, deleted, moved,
+renamed or retargeted.
+
+Rooms can be given as objects or dbids. Paths are lists of exit dbids; see
+`WorldGraph.path`.
+
+    from typeclasses.worldgraph import WORLD_GRAPH
+
+    WORLD_GRAPH.distance(here, there)     # number of steps, or None
+    WORLD_GRAPH.path(here, there)         # exits to take
+    WORLD_GRAPH.within(here, 3)           # {room_id: distance} of rooms up to 3 steps away
+
+Since all exits count as one step, searches are plain breadth-first. The results
+are memoized until the graph next changes (exits change rarely).
+
+Each room also has a version that changes whenever one of its exits does, for caching
+anything drawn from them (like the minimap in the room header).
+
+"""
+
+from collections import defaultdict, deque
+
+from evennia.objects.models import ObjectDB
+
+# max number of memoized search results kept
+MAX_MEMOIZED = 10000
+
+
+def _id(room):
+    """Rooms can be given as objects or dbids"""
+    return getattr(room, "id", room)
+
+
+class WorldGraph:
+    """
+    The exits of the world, as a directed graph between rooms.
+
+    """
+
+    def __init__(self):
+        # {exit_id: (source_id, destination_id, exit_key)}, loaded on first use
+        self._exits = None
+        # {source_id: {exit_id: destination_id}}
+        self._adjacency = defaultdict(dict)
+        self._memo = {}
+        # {room_id: version}, bumped when the room's exits change
+        self._room_versions = defaultdict(int)
+        self._loads = 0
+        self._changes = 0
+
+    def load(self):
+        """(Re)load all exits from the database"""
+        self._exits = {}
+        self._adjacency = defaultdict(dict)
+        self._memo = {}
+        self._room_versions = defaultdict(int)
+        self._loads += 1
+        for exit_id, source_id, destination_id, key in ObjectDB.objects.filter(
+            db_location__isnull=False, db_destination__isnull=False
+        ).values_list("id", "db_location_id", "db_destination_id", "db_key"):
+            self._add(exit_id, source_id, destination_id, key)
+
+    @property
+    def exits(self):
+        if self._exits is None:
+            self.load()
+        return self._exits
+
+    def _add(self, exit_id, source_id, destination_id, key):
+        self._exits[exit_id] = (source_id, destination_id, key)
+        self._adjacency[source_id][exit_id] = destination_id
+        self._room_versions[source_id] += 1
+        self._changes += 1
+
+    def _remove(self, exit_id):
+        source_id, _, _ = self._exits.pop(exit_id)
+        self._room_versions[source_id] += 1
+        self._changes += 1
+        self._adjacency[source_id].pop(exit_id, None)
+        if not self._adjacency[source_id]:
+            del self._adjacency[source_id]
+
+    def update_exit(self, exit):
+        """
+        Called when an exit was created or changed.
+
+        """
+        if self._exits is None or not exit.id:
+            # not loaded yet - we'll get it when we are
+            return
+        source, destination = exit.location, exit.destination
+        current = self._exits.get(exit.id)
+        new = (source.id, destination.id, exit.key) if source and destination else None
+        if current == new:
+            return
+        if current:
+            self._remove(exit.id)
+        if new:
+            self._add(exit.id, *new)
+        self._memo = {}
+
+    def remove_exit(self, exit):
+        """
+        Called when an exit is deleted.
+
+        """
+        if self._exits is not None and exit.id in self._exits:
+            self._remove(exit.id)
+            self._memo = {}
+
+    @property
+    def version(self):
+        """Changes whenever any exit changes"""
+        self.exits
+        return (self._loads, self._changes)
+
+    def room_version(self, room):
+        """
+        Get the version of a room's exits, which changes whenever an exit of the room is
+        added, removed, renamed or retargeted.
+
+        """
+        self.exits
+        return (self._loads, self._room_versions.get(_id(room), 0))
+
+    def exits_from(self, room):
+        """
+        Get the exits leading out of a room.
+
+        Returns:
+            dict: `{exit_id: destination_id}`.
+
+        """
+        self.exits
+        return dict(self._adjacency.get(_id(room), {}))
+
+    def exit_keys_from(self, room):
+        """
+        Get the exits leading out of a room, by key.
+
+        Returns:
+            dict: `{exit_key: destination_id}`.
+
+        """
+        return {self._exits[exit_id][2]: dest for exit_id, dest in self.exits_from(room).items()}
+
+    def get_exit(self, exit_id):
+        """
+        Get what we know about an exit.
+
+        Returns:
+            tuple or None: `(source_id, destination_id, key)`.
+
+        """
+        return self.exits.get(exit_id)
+
+    def _memoized(self, key, search):
+        try:
+            return self._memo[key]
+        except KeyError:
+            if len(self._memo) >= MAX_MEMOIZED:
+                self._memo = {}
+            result = self._memo[key] = search()
+            return result
+
+    def _bfs(self, start_id, goal_id=None, max_distance=None):
+        """
+        Breadth-first search from `start_id`.
+
+        Returns:
+            dict: `{room_id: (distance, exit_id used to get there, previous room_id)}` for
+                all rooms reached (stopping early when reaching `goal_id`).
+
+        """
+        self.exits
+        reached = {start_id: (0, None, None)}
+        queue = deque([start_id])
+        while queue:
+            room_id = queue.popleft()
+            distance = reached[room_id][0]
+            if room_id == goal_id or distance == max_distance:
+                continue
+            for exit_id, destination_id in self._adjacency.get(room_id, {}).items():
+                if destination_id not in reached:
+                    reached[destination_id] = (distance + 1, exit_id, room_id)
+                    if destination_id == goal_id:
+                        return reached
+                    queue.append(destination_id)
+        return reached
+
+    def path(self, start, goal):
+        """
+        Find the shortest way from one room to another.
+
+        Args:
+            start (Room or int): Where to start.
+            goal (Room or int): Where to go.
+
+        Returns:
+            list or None: The dbids of the exits to take, in order (empty if already at
+                the goal), or `None` if the goal can't be reached.
+
+        """
+        start_id, goal_id = _id(start), _id(goal)
+
+        def _search():
+            reached = self._bfs(start_id, goal_id=goal_id)
+            if goal_id not in reached:
+                return None
+            path = []
+            room_id = goal_id
+            while room_id != start_id:
+                _, exit_id, room_id = reached[room_id]
+                path.append(exit_id)
+            return tuple(reversed(path))
+
+        path = self._memoized(("path", start_id, goal_id), _search)
+        return None if path is None else list(path)
+
+    def next_exit(self, start, goal):
+        """
+        Get the first exit to take on the way from `start` to `goal`.
+
+        Returns:
+            int or None: The dbid of the exit, or `None` if there is none (already there
+                or no way to get there).
+
+        """
+        path = self.path(start, goal)
+        return path[0] if path else None
+
+    def distance(self, start, goal):
+        """
+        Get the number of steps between two rooms.
+
+        Returns:
+            int or None: The distance, or `None` if the goal can't be reached.
+
+        """
+        path = self.path(start, goal)
+        return None if path is None else len(path)
+
+    def within(self, start, max_distance):
+        """
+        Get all rooms reachable from `start` in at most `max_distance` steps.
+
+        Returns:
+            dict: `{room_id: distance}`, including `start` itself at distance 0.
+
+        """
+        start_id = _id(start)
+
+        def _search():
+            return {
+                room_id: distance
+                for room_id, (distance, _, _) in self._bfs(
+                    start_id, max_distance=max_distance
+                ).items()
+            }
+
+        return dict(self._memoized(("within", start_id, max_distance), _search))
+
+
+WORLD_GRAPH = WorldGraph()
@@ -0,0 +1,145 @@
+"""
+Zone map
+
+The minimap in the room header only shows the exits of the current room. The zone map
+shows a larger area around the viewer (see the `map` command).
+
+Rooms are given grid coordinates once, by walking the compass exits ("north",
+"southwest" etc) of the world graph (see `typeclasses/worldgraph.py`) outwards from
+the first room a map is asked for. All rooms reached this way make up a *zone layout*,
+which also holds the pre-drawn tiles of the map - a symbol for every room and for
+every link between rooms, keyed by position. Drawing a map is then just picking the
+tiles of a window around the viewer out of a dict.
+
+Layouts are kept until any exit changes. A room that would end up on a spot already
+taken by another room (the exits don't describe a flat grid) is left off the map.
+
+"""
+
+from collections import deque
+
+from .rooms import _EXIT_GRID_SHIFT, CHAR_SYMBOL, LINK_COLOR, ROOM_SYMBOL
+from .worldgraph import WORLD_GRAPH
+
+# the default width and height of the map, in tiles (rooms are every other tile)
+DEFAULT_MAP_SIZE = 21
+
+
+class ZoneLayout:
+    """
+    The rooms connected by compass exits to a root room, laid out on a grid.
+
+    """
+
+    def __init__(self, root_id):
+        self.root_id = root_id
+        # {room_id: (x, y)}
+        self.coords = {}
+        # {(x, y): symbol}. Rooms are at even tile positions, links between them.
+        self.tiles = {}
+        self._layout()
+
+    def _layout(self):
+        coords = {self.root_id: (0, 0)}
+        taken = {(0, 0)}
+        queue = deque([self.root_id])
+        while queue:
+            room_id = queue.popleft()
+            x, y = coords[room_id]
+            for key, destination_id in WORLD_GRAPH.exit_keys_from(room_id).items():
+                dx, dy, symbol = _EXIT_GRID_SHIFT.get(key, (None, None, None))
+                if symbol is None:
+                    continue
+                self.tiles.setdefault((2 * x + dx, 2 * y + dy), f"{LINK_COLOR}{symbol}|n")
+                if destination_id in coords:
+                    continue
+                position = (x + dx, y + dy)
+                if position in taken:
+                    # there is already a room there - this one doesn't fit the grid
+                    continue
+                coords[destination_id] = position
+                taken.add(position)
+                queue.append(destination_id)
+        for x, y in coords.values():
+            self.tiles[(2 * x, 2 * y)] = ROOM_SYMBOL
+        self.coords = coords
+
+    def render(self, room_id, size=DEFAULT_MAP_SIZE):
+        """
+        Draw the map around a room.
+
+        Args:
+            room_id (int): The room to center on (marked as where the viewer is).
+            size (int): The width and height of the map, in tiles.
+
+        Returns:
+            str: The map.
+
+        """
+        x0, y0 = self.coords[room_id]
+        x0, y0 = 2 * x0, 2 * y0
+        half = size // 2
+        tiles = self.tiles
+        lines = []
+        # y grows northwards, but lines are printed top-down
+        for y in range(y0 + half, y0 - half - 1, -1):
+            lines.append(
+                "".join(
+                    CHAR_SYMBOL if (x, y) == (x0, y0) else tiles.get((x, y), " ")
+                    for x in range(x0 - half, x0 + half + 1)
+                )
+            )
+        return "\n".join(lines)
+
+
+class ZoneMaps:
+    """
+    Keeps the zone layouts, rebuilding them lazily after any exit has changed.
+
+    """
+
+    def __init__(self):
+        # {room_id: ZoneLayout}, each layout listed for all of its rooms
+        self._layouts = {}
+        self._version = None
+
+    def get_layout(self, room):
+        """
+        Get the layout a room is part of, laying it out if needed.
+
+        Args:
+            room (Room or int): The room.
+
+        Returns:
+            ZoneLayout: The layout.
+
+        """
+        version = WORLD_GRAPH.version
+        if version != self._version:
+            self._layouts = {}
+            self._version = version
+        room_id = getattr(room, "id", room)
+        layout = self._layouts.get(room_id)
+        if not layout:
+            layout = ZoneLayout(room_id)
+            for layout_room_id in layout.coords:
+                self._layouts[layout_room_id] = layout
+        return layout
+
+    def render(self, room, size=DEFAULT_MAP_SIZE):
+        """
+        Draw the map around a room.
+
+        Args:
+            room (Room or int): The room to center on.
+            size (int): The width and height of the map, in tiles.
+
+        Returns:
+            str: The map.
+
+        """
+        room_id = getattr(room, "id", room)
+        return self.get_layout(room_id).render(room_id, size=size)
+
+
+ZONE_MAPS = ZoneMaps()
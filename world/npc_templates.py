@@ -0,0 +1,28 @@
+"""
+NPC templates
+
+Shared stats for kinds of NPCs (see `typeclasses/npc_templates.py`). Each dict in
+this module is a template, keyed by its variable name in lowercase. Possible stats
+are `hit_dice`, `armor`, `hp_multiplier`, `morale`, `allegiance`, `weapon` and
+`coins`; anything not given uses the NPC's default.
+
+Spawn NPCs using a template with
+
+    from typeclasses.npc_templates import spawn_npcs
+    spawn_npcs("goblin", 50, location=here)
+
+"""
+
+GOBLIN = {
+    "hit_dice": 1,
+    "armor": 1,
+    "morale": 7,
+    "coins": 2,
+}
+
+GOBLIN_CHIEF = {
+    "hit_dice": 3,
+    "armor": 3,
+    "morale": 10,
+    "coins": 20,
+}
@@ -1,7 +1,10 @@
 from evennia import create_object
 from evennia.utils.test_resources import EvenniaTest
 
-from typeclasses.npc import NPC
+from typeclasses.behavior import BEHAVIOR
+from typeclasses.characters import Character
+from typeclasses.npc import NPC, Mob
+from typeclasses.npc_templates import spawn_npcs
 
 
 class Zombie(EvenniaTest):
@@ -16,4 +19,48 @@ class Zombie(EvenniaTest):
         self.assertEqual(npc.hp_multiplier, 4)
         self.assertEqual(npc.hp, 16)
         self.assertEqual(npc.strength, 4)
-        self.assertEqual(npc.charisma, 4)
\ No newline at end of file
+        self.assertEqual(npc.charisma, 4)
+
+class Goblins(EvenniaTest):
+
+    def test_npc_template(self):
+        goblins = spawn_npcs("goblin", 5, location=self.room1)
+
+        self.assertEqual(len(goblins), 5)
+        goblin = goblins[-1]
+        self.assertEqual(goblin.template.key, "goblin")
+        self.assertEqual(goblin.morale, 7)
+        self.assertEqual(goblin.hp_multiplier, 4)  # not in the template
+        self.assertEqual(goblin.hp, 4)
+        # nothing is stored per goblin
+        self.assertFalse(goblin.attributes.all())
+
+        # an override only affects this goblin
+        goblin.morale = 12
+        self.assertEqual(goblin.morale, 12)
+        self.assertEqual(goblins[0].morale, 7)
+
+
+class Aggro(EvenniaTest):
+
+    def tearDown(self):
+        BEHAVIOR._players = None
+        BEHAVIOR.active_rooms = {}
+        super().tearDown()
+
+    def test_mob_behavior(self):
+        self.room1.allow_combat = True
+        character = create_object(Character, key="Hero", location=self.room1)
+        mob = create_object(Mob, key="goblin", location=self.room1)
+        BEHAVIOR._players = {character.id: character}
+
+        BEHAVIOR.tick()
+        self.assertEqual(mob.behavior_state, "aggro")
+        BEHAVIOR.tick()
+        self.assertIn(mob, self.room1.ndb.combathandler.combatants)
+        self.room1.ndb.combathandler.stop_combat()
+
+        # with nobody around, the room is frozen
+        character.location = self.room2
+        BEHAVIOR.tick()
+        self.assertIsNotNone(self.room1.frozen_at)